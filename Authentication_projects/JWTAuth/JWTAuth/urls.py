@@ -16,7 +16,13 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenVerifyView
+from api import views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('gettoken/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('refreshtoken/', views.RevocableTokenRefreshView.as_view(), name='token_refresh'),
+    path('verifytoken/', TokenVerifyView.as_view(), name='token_verify'),
+    path('revoketoken/', views.RevokeTokenView.as_view(), name='token_revoke'),
 ]
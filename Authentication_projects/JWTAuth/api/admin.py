@@ -0,0 +1,7 @@
+from django.contrib import admin
+from .models import RevokedToken
+
+# Register your models here.
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ['id', 'jti', 'expires_at', 'revoked_at']
@@ -0,0 +1,14 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .revocation import revoked_tokens
+
+
+# Same as JWTAuthentication, but rejects tokens whose jti has been revoked.
+# The check is served from memory, no DB query per request.
+class RevocableJWTAuthentication(JWTAuthentication):
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if revoked_tokens.is_revoked(validated_token.get(api_settings.JTI_CLAIM)):
+            raise InvalidToken('Token has been revoked')
+        return validated_token
@@ -0,0 +1,14 @@
+from django.db import models
+
+# Create your models here.
+
+# Local table of revoked tokens. The source of truth for every worker;
+# api.revocation keeps an in-memory copy of the rows that are still alive.
+class RevokedToken(models.Model):
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    # indexed for the incremental sync, which reads the recent rows
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti
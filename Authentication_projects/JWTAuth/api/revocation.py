@@ -0,0 +1,167 @@
+# In-memory JWT revocation set
+#
+# Checking the RevokedToken table on every request would put a DB query back
+# into every "stateless" JWT request. Instead each worker keeps:
+#   1. a bloom filter  -> answers "definitely not revoked" for almost every token
+#   2. an exact dict   -> jti -> expiry timestamp, only consulted on a bloom hit
+# Both are refreshed from the table every SYNC_INTERVAL seconds. A bloom filter
+# has no false negatives, so a revoked jti that has been synced is always caught.
+#
+# A sync reads every row revoked in the last SYNC_LOOKBACK seconds, not just
+# ids above the highest one seen: rows become visible in commit order, not
+# id order, so a row with a lower id can show up after a higher one was
+# already read. The lookback only has to be longer than the slowest revoke
+# transaction (plus clock skew between servers).
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+DEFAULTS = {
+    'SYNC_INTERVAL': 5,         # seconds between incremental syncs from the table
+    'SYNC_LOOKBACK': 60,        # seconds of recent revocations each sync re-reads
+    'REBUILD_INTERVAL': 300,    # seconds between full rebuilds (drops expired jtis)
+    'CAPACITY': 100000,         # expected number of live revoked tokens
+    'ERROR_RATE': 0.001,        # bloom filter false positive rate
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'JWT_REVOCATION', {}).get(name, DEFAULTS[name])
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        # m = -n * ln(p) / ln(2)^2 bits, k = m / n * ln(2) hash functions
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # double hashing: one blake2b digest gives both base hashes
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        for pos in self._positions(item):
+            if not self.bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class RevocationSet:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (bloom filter, jti -> expiry), replaced as a whole by rebuild() so
+        # is_revoked() never sees a half-filled one
+        self._state = None
+        self._synced_at = None
+        self._next_sync = 0
+        self._next_rebuild = 0
+
+    def _new_bloom(self, count):
+        # keep room for growth until the next rebuild
+        return BloomFilter(max(get_setting('CAPACITY'), count * 2), get_setting('ERROR_RATE'))
+
+    def _add(self, jti, exp):
+        bloom, expiry = self._state
+        bloom.add(jti)
+        expiry[jti] = exp
+
+    def rebuild(self):
+        # full reload: the only way to forget expired jtis, bloom filters can't delete
+        from .models import RevokedToken
+        started = timezone.now()
+        rows = list(
+            RevokedToken.objects.filter(expires_at__gt=started).values_list('jti', 'expires_at')
+        )
+        bloom = self._new_bloom(len(rows))
+        expiry = {}
+        for jti, expires_at in rows:
+            bloom.add(jti)
+            expiry[jti] = expires_at.timestamp()
+        now = time.monotonic()
+        with self._lock:
+            if self._state is not None:
+                # revoked here while the rows were read, not in them yet
+                cutoff = time.time()
+                for jti, exp in self._state[1].items():
+                    if exp > cutoff and jti not in expiry:
+                        bloom.add(jti)
+                        expiry[jti] = exp
+            self._state = (bloom, expiry)
+            self._synced_at = started
+            self._next_sync = now + get_setting('SYNC_INTERVAL')
+            self._next_rebuild = now + get_setting('REBUILD_INTERVAL')
+
+    def sync(self):
+        # incremental: rows revoked since shortly before the last sync; the
+        # ones already seen are added again, which changes nothing
+        from .models import RevokedToken
+        started = timezone.now()
+        since = self._synced_at - timedelta(seconds=get_setting('SYNC_LOOKBACK'))
+        rows = RevokedToken.objects.filter(revoked_at__gte=since).values_list('jti', 'expires_at')
+        rows = [(jti, expires_at.timestamp()) for jti, expires_at in rows]
+        with self._lock:
+            for jti, exp in rows:
+                self._add(jti, exp)
+            self._synced_at = started
+            self._next_sync = time.monotonic() + get_setting('SYNC_INTERVAL')
+
+    def _claim(self, attr, interval):
+        # the first thread to see a sync or rebuild due moves the deadline on
+        # and does it; the others keep using the current set meanwhile
+        with self._lock:
+            now = time.monotonic()
+            if now < getattr(self, attr):
+                return False
+            setattr(self, attr, now + interval)
+            return True
+
+    def maybe_sync(self):
+        now = time.monotonic()
+        if now >= self._next_rebuild:
+            if self._claim('_next_rebuild', get_setting('REBUILD_INTERVAL')):
+                self.rebuild()
+        elif self._state is not None and now >= self._next_sync:
+            if self._claim('_next_sync', get_setting('SYNC_INTERVAL')):
+                self.sync()
+        if self._state is None:
+            # the first load is still running in another thread; don't answer
+            # without the table
+            self.rebuild()
+
+    def revoke(self, jti, expires_at):
+        # write to the table for the other workers, update this worker right away
+        from .models import RevokedToken
+        RevokedToken.objects.get_or_create(jti=jti, defaults={'expires_at': expires_at})
+        self.maybe_sync()
+        with self._lock:
+            self._add(jti, expires_at.timestamp())
+
+    def is_revoked(self, jti):
+        self.maybe_sync()
+        bloom, expiry = self._state
+        if jti is None or jti not in bloom:
+            return False
+        exp = expiry.get(jti)
+        # an expired token is rejected by simplejwt anyway, no need to keep it
+        return exp is not None and exp > time.time()
+
+    def __len__(self):
+        return len(self._state[1]) if self._state is not None else 0
+
+
+# one instance per worker process
+revoked_tokens = RevocationSet()
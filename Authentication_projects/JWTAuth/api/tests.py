@@ -0,0 +1,133 @@
+import threading
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from .models import RevokedToken
+from .revocation import BloomFilter, RevocationSet, revoked_tokens
+
+# Create your tests here.
+
+class BloomFilterTests(TestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        items = [str(uuid.uuid4()) for _ in range(1000)]
+        for item in items:
+            bloom.add(item)
+        self.assertTrue(all(item in bloom for item in items))
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter(1000, 0.01)
+        for _ in range(1000):
+            bloom.add(str(uuid.uuid4()))
+        hits = sum(str(uuid.uuid4()) in bloom for _ in range(10000))
+        # 1% expected; leave room for chance
+        self.assertLess(hits, 300)
+
+
+class RevocationSetTests(TestCase):
+    def setUp(self):
+        self.revoked = RevocationSet()
+        self.expires = timezone.now() + timedelta(hours=1)
+
+    def test_revoke(self):
+        self.revoked.revoke('a', self.expires)
+        self.assertTrue(self.revoked.is_revoked('a'))
+        self.assertFalse(self.revoked.is_revoked('b'))
+        self.assertFalse(self.revoked.is_revoked(None))
+        self.assertTrue(RevokedToken.objects.filter(jti='a').exists())
+
+    def test_rebuild_reads_table_and_drops_expired(self):
+        RevokedToken.objects.create(jti='live', expires_at=self.expires)
+        RevokedToken.objects.create(jti='old', expires_at=timezone.now() - timedelta(seconds=1))
+        self.revoked.rebuild()
+        self.assertTrue(self.revoked.is_revoked('live'))
+        self.assertFalse(self.revoked.is_revoked('old'))
+        self.assertEqual(len(self.revoked), 1)
+
+    def test_sync_picks_up_rows_from_other_workers(self):
+        self.revoked.rebuild()
+        RevokedToken.objects.create(jti='other', expires_at=self.expires)
+        self.revoked.sync()
+        self.assertTrue(self.revoked.is_revoked('other'))
+
+    def test_sync_sees_rows_committed_out_of_id_order(self):
+        # a revoke whose transaction got a lower id but committed after a
+        # higher id had been synced
+        RevokedToken.objects.create(id=10, jti='first', expires_at=self.expires)
+        self.revoked.rebuild()
+        RevokedToken.objects.create(id=5, jti='late', expires_at=self.expires)
+        self.revoked.sync()
+        self.assertTrue(self.revoked.is_revoked('late'))
+
+    def rebuild_with(self, during):
+        # runs during() after the rebuild has read the table, before it swaps
+        new_bloom = self.revoked._new_bloom
+
+        def hooked(count):
+            during()
+            return new_bloom(count)
+
+        with mock.patch.object(self.revoked, '_new_bloom', hooked):
+            self.revoked.rebuild()
+
+    def test_rebuild_keeps_serving_old_set_until_swap(self):
+        RevokedToken.objects.create(jti='live', expires_at=self.expires)
+        self.revoked.rebuild()
+        seen = []
+        self.rebuild_with(lambda: seen.append(self.revoked.is_revoked('live')))
+        self.assertEqual(seen, [True])
+        self.assertTrue(self.revoked.is_revoked('live'))
+
+    def test_rebuild_keeps_jtis_revoked_meanwhile(self):
+        self.revoked.rebuild()
+        self.rebuild_with(lambda: self.revoked._add('meanwhile', self.expires.timestamp()))
+        self.assertTrue(self.revoked.is_revoked('meanwhile'))
+
+    def test_one_thread_rebuilds_when_due(self):
+        self.revoked.rebuild()
+        self.revoked._next_rebuild = 0
+        calls = []
+
+        def slow_rebuild():
+            calls.append(1)
+            time.sleep(0.05)
+
+        with mock.patch.object(self.revoked, 'rebuild', slow_rebuild):
+            threads = [threading.Thread(target=self.revoked.maybe_sync) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(calls), 1)
+
+
+class RevokeTokenViewTests(TestCase):
+    def setUp(self):
+        User.objects.create_user('alice', password='secret')
+        tokens = self.client.post('/gettoken/', {'username': 'alice', 'password': 'secret'}).json()
+        self.access = tokens['access']
+        self.refresh = tokens['refresh']
+        revoked_tokens.rebuild()
+
+    def revoke(self, data=None):
+        return self.client.post('/revoketoken/', data or {}, content_type='application/json',
+                                headers={'Authorization': 'Bearer ' + self.access})
+
+    def test_revoked_access_token_is_rejected(self):
+        self.assertEqual(self.revoke().status_code, 200)
+        self.assertEqual(self.revoke().status_code, 401)
+
+    def test_revoked_refresh_token_cannot_refresh(self):
+        self.assertEqual(self.revoke({'refresh': self.refresh}).status_code, 200)
+        response = self.client.post('/refreshtoken/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, 401)
+
+    def test_bad_refresh_token_revokes_nothing(self):
+        self.assertEqual(self.revoke({'refresh': 'garbage'}).status_code, 400)
+        self.assertEqual(RevokedToken.objects.count(), 0)
+        # the access token still works
+        self.assertEqual(self.revoke().status_code, 200)
@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from rest_framework import status
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.views import TokenRefreshView
+from .revocation import revoked_tokens
+from .serializers import RevocableTokenRefreshSerializer
+
+# Create your views here.
+
+def revoke(token):
+    exp = datetime.fromtimestamp(token['exp'], tz=timezone.utc)
+    revoked_tokens.revoke(token[api_settings.JTI_CLAIM], exp)
+
+
+# POST /revoketoken/ with the access token in the Authorization header.
+# Optionally send {"refresh": "..."} to revoke the refresh token as well.
+class RevokeTokenView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, format=None):
+        # parse the refresh token first: a bad one must not leave the access
+        # token revoked behind a 400
+        refresh = request.data.get('refresh')
+        if refresh is not None:
+            try:
+                refresh = RefreshToken(refresh)
+            except TokenError as e:
+                return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        revoke(request.auth)
+        if refresh is not None:
+            revoke(refresh)
+        return Response({'msg': 'Token revoked'}, status=status.HTTP_200_OK)
+
+
+class RevocableTokenRefreshView(TokenRefreshView):
+    serializer_class = RevocableTokenRefreshSerializer
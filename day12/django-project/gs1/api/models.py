@@ -2,8 +2,9 @@ from django.db import models
 
 # Create your models here.
 class Student(models.Model):
-    name = models.CharField(max_length=100)
-    roll = models.IntegerField()
+    # indexed for the admin search (drf_perf/large_table.py)
+    name = models.CharField(max_length=100, db_index=True)
+    roll = models.IntegerField(db_index=True)
     city = models.CharField(max_length=100)
     def __str__(self):
         return f"{self.name}, {self.roll}, {self.city}"
\ No newline at end of file
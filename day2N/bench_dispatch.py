@@ -0,0 +1,213 @@
+# Benchmark: the same Student GET in every API style in day2N
+#
+#   class_based              django View + JSONParser / JSONRenderer by hand
+#   function_based_api       @api_view
+#   class_based_api_view     APIView
+#   generic_api_view_mixins  GenericAPIView + mixins
+#   project1                 concrete generics (ListCreateAPIView, ...)
+#   model_view_set           ModelViewSet + router
+#
+# Each variant runs in its own interpreter (one settings module per process)
+# against a fresh SQLite file, so the database is the same for all of them
+# whatever the project's settings say. The middleware is Django's default
+# startapp list for every variant, unless --project-middleware is given (then
+# each project keeps its own, e.g. model_view_set's metrics / compression).
+# Data comes from serializer_prac's seed_students.student_rows(), so every
+# variant sees the same rows.
+#
+# For each dataset size it drives list and detail GETs through the test
+# client and reports req/s, p50 / p99 latency and the peak memory allocated
+# while handling one request (tracemalloc, measured in a separate pass).
+#
+#   python bench_dispatch.py
+#   python bench_dispatch.py --sizes 10,1000 --requests 1000 --json out.json
+#   python bench_dispatch.py --variants function_based_api,model_view_set
+import argparse
+import importlib.util
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SEED_MODULE = os.path.join(HERE, '..', 'serializer_prac', 'api', 'management', 'commands', 'seed_students.py')
+
+# name -> (list path, detail path); class_based takes the id in a json body
+VARIANTS = {
+    'class_based': ('/studentapi/', None),
+    'function_based_api': ('/studentapi/', '/studentapi/%d'),
+    'class_based_api_view': ('/studentapi/', '/studentapi/%d'),
+    'generic_api_view_mixins': ('/studentapi/', '/studentapi/%d'),
+    'project1': ('/studentapi/', '/studentapi/%d'),
+    'model_view_set': ('/studentapi/', '/studentapi/%d/'),
+}
+
+DEFAULT_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(int(len(sorted_values) * p / 100), len(sorted_values) - 1)]
+
+
+def setup_variant(variant, db_path, project_middleware):
+    project = os.path.join(HERE, variant)
+    sys.path.insert(0, project)
+    os.chdir(project)
+    os.environ['DJANGO_SETTINGS_MODULE'] = '%s.settings' % variant
+
+    from django.conf import settings
+    settings.DATABASES = {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': db_path}}
+    settings.DATABASE_ROUTERS = []
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['testserver']
+    if not project_middleware:
+        settings.MIDDLEWARE = DEFAULT_MIDDLEWARE
+
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', run_syncdb=True, verbosity=0)
+
+
+def load_seeder():
+    spec = importlib.util.spec_from_file_location('seed_students', SEED_MODULE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def child(args):
+    tmp = tempfile.mkdtemp()
+    try:
+        run_child(args, os.path.join(tmp, 'bench.sqlite3'))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def run_child(args, db_path):
+    setup_variant(args.child, db_path, args.project_middleware)
+
+    from django.test import Client
+    from api.models import Student
+    seeder = load_seeder()
+
+    list_path, detail_path = VARIANTS[args.child]
+    client = Client()
+    rng = random.Random(args.seed)
+
+    def request_list():
+        if detail_path is None:
+            return client.generic('GET', list_path, '{}', content_type='application/json')
+        return client.get(list_path, HTTP_ACCEPT='application/json')
+
+    def request_detail(pk):
+        if detail_path is None:
+            return client.generic('GET', list_path, json.dumps({'id': pk}), content_type='application/json')
+        return client.get(detail_path % pk, HTTP_ACCEPT='application/json')
+
+    results = []
+    for size in args.sizes:
+        Student.objects.all().delete()
+        Student.objects.bulk_create(Student(name=name, roll=roll, city=city)
+                                    for name, roll, city in seeder.student_rows(size, args.seed))
+        ids = list(Student.objects.values_list('id', flat=True))
+
+        for kind in ('list', 'detail'):
+            if kind == 'list':
+                calls = [request_list] * args.requests
+            else:
+                calls = [lambda pk=rng.choice(ids): request_detail(pk) for _ in range(args.requests)]
+
+            for call in calls[:args.warmup]:
+                response = call()
+                if response.status_code != 200:
+                    raise SystemExit('%s %s: HTTP %d' % (args.child, kind, response.status_code))
+
+            latencies = []
+            start = time.perf_counter()
+            for call in calls:
+                t = time.perf_counter()
+                call()
+                latencies.append(time.perf_counter() - t)
+            elapsed = time.perf_counter() - start
+            latencies.sort()
+
+            # separate pass: tracemalloc slows everything down
+            peaks = []
+            tracemalloc.start()
+            for call in calls[:args.alloc_requests]:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                call()
+                peaks.append(tracemalloc.get_traced_memory()[1] - base)
+            tracemalloc.stop()
+
+            results.append({
+                'variant': args.child, 'size': size, 'kind': kind,
+                'rps': len(calls) / elapsed,
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'alloc_kib': sum(peaks) / len(peaks) / 1024 if peaks else 0,
+            })
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--variants', default=','.join(VARIANTS))
+    parser.add_argument('--sizes', default='10,100,1000', help='students in the table, comma separated')
+    parser.add_argument('--requests', type=int, default=500, help='timed requests per variant / size / kind')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--alloc-requests', type=int, default=50, help='requests measured under tracemalloc')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--project-middleware', action='store_true', help="keep each project's own MIDDLEWARE")
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.sizes = [int(s) for s in args.sizes.split(',')]
+
+    if args.child:
+        return child(args)
+
+    variants = [v.strip() for v in args.variants.split(',')]
+    for v in variants:
+        if v not in VARIANTS:
+            parser.error('unknown variant %r, choose from %s' % (v, ', '.join(VARIANTS)))
+
+    passthrough = ['--sizes', ','.join(map(str, args.sizes)), '--requests', str(args.requests),
+                   '--warmup', str(args.warmup), '--alloc-requests', str(args.alloc_requests),
+                   '--seed', str(args.seed)] + (['--project-middleware'] if args.project_middleware else [])
+
+    results = []
+    print('%-24s %6s %-6s %10s %9s %9s %11s' % ('variant', 'rows', 'kind', 'req/s', 'p50 ms', 'p99 ms', 'alloc KiB'))
+    for variant in variants:
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', variant] + passthrough,
+                             capture_output=True, text=True)
+        if out.returncode != 0:
+            print('%-24s failed: %s' % (variant, (out.stderr.strip().splitlines() or ['?'])[-1]))
+            continue
+        for r in json.loads(out.stdout.strip().splitlines()[-1]):
+            results.append(r)
+            print('%-24s %6d %-6s %10.0f %9.2f %9.2f %11.1f' % (
+                r['variant'], r['size'], r['kind'], r['rps'], r['p50_ms'], r['p99_ms'], r['alloc_kib']))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
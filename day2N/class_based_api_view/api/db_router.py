@@ -0,0 +1,167 @@
+# Read-replica routing
+#
+# Reads made while handling GET / HEAD / OPTIONS requests go to one of the
+# DATABASE_REPLICAS, everything else goes to 'default' (the primary).
+# ReplicaRoutingMiddleware decides per request, ReplicaRouter is the
+# DATABASE_ROUTERS entry that applies the decision to every query.
+#
+# Read-your-writes: after a write request the client gets a cookie and a
+# header saying "read from the primary until <timestamp>" for
+# REPLICA_STICKY_SECONDS, so it doesn't read stale data from a replica that
+# hasn't caught up yet. Browsers send the cookie back automatically, API
+# clients can echo the header.
+#
+# Within a request, a write also sends the rest of that request's reads to
+# the primary. A streamed body (csv / ndjson lists, file downloads) runs its
+# queries after the view has returned, so the middleware wraps it to run in
+# the request's scope too.
+#
+# Outside a request (shell, management commands, workers) everything goes to
+# the primary. Code that can live with replica lag opts in with
+#
+#   with primary_scope(primary=False):   # replicas until the first write
+#       ...
+import contextlib
+import contextvars
+import itertools
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+STICKY_COOKIE = 'db_primary_until'
+STICKY_HEADER = 'X-DB-Primary-Until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# {'primary': bool} for the current request / primary_scope(), None outside
+# one. A dict rather than the flag itself so a write can flip it for the
+# rest of the scope without a ContextVar.set() that nothing resets.
+routing = contextvars.ContextVar('replica_routing', default=None)
+
+
+@contextlib.contextmanager
+def primary_scope(primary=True):
+    state = {'primary': primary}
+    token = routing.set(state)
+    try:
+        yield state
+    finally:
+        routing.reset(token)
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class ReplicaSelector:
+    # round_robin: take turns
+    # least_lag:   replica with the smallest replication lag, re-measured
+    #              every REPLICA_LAG_CHECK_INTERVAL seconds
+    def __init__(self):
+        self._counter = itertools.count()
+        self._lags = {}
+        self._lags_checked = 0
+        self._lock = threading.Lock()
+
+    def measure_lag(self, alias):
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            return 0.0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)'
+            )
+            return float(cursor.fetchone()[0])
+
+    def lags(self):
+        interval = getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5)
+        with self._lock:
+            if time.monotonic() - self._lags_checked >= interval:
+                for alias in get_replicas():
+                    try:
+                        self._lags[alias] = self.measure_lag(alias)
+                    except Exception:
+                        # unreachable replica: never pick it
+                        self._lags[alias] = math.inf
+                self._lags_checked = time.monotonic()
+            return dict(self._lags)
+
+    def select(self):
+        replicas = get_replicas()
+        if not replicas:
+            return 'default'
+        if getattr(settings, 'REPLICA_SELECTION', 'round_robin') == 'least_lag':
+            max_lag = getattr(settings, 'REPLICA_MAX_LAG', 30)
+            lags = self.lags()
+            alias = min(replicas, key=lambda a: lags.get(a, math.inf))
+            if lags.get(alias, math.inf) > max_lag:
+                return 'default'
+            return alias
+        return replicas[next(self._counter) % len(replicas)]
+
+
+selector = ReplicaSelector()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = routing.get()
+        if state is None or state['primary']:
+            return 'default'
+        return selector.select()
+
+    def db_for_write(self, model, **hints):
+        # anything read later in the same request must see this write
+        state = routing.get()
+        if state is not None:
+            state['primary'] = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+
+def scoped(chunks, state):
+    # each chunk is produced with the request's routing state in place;
+    # set / reset around next() because a generator can't hold a context
+    # across its yields
+    chunks = iter(chunks)
+    while True:
+        token = routing.set(state)
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            return
+        finally:
+            routing.reset(token)
+        yield chunk
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def sticky_until(self, request):
+        value = request.COOKIES.get(STICKY_COOKIE) or request.headers.get(STICKY_HEADER)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def __call__(self, request):
+        write = request.method not in SAFE_METHODS
+        primary = write or self.sticky_until(request) > time.time()
+        with primary_scope(primary) as state:
+            response = self.get_response(request)
+        if response.streaming and not response.is_async:
+            response.streaming_content = scoped(response.streaming_content, state)
+
+        if write:
+            window = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+            until = '%.3f' % (time.time() + window)
+            response.set_cookie(STICKY_COOKIE, until, max_age=math.ceil(window), httponly=True, samesite='Lax')
+            response[STICKY_HEADER] = until
+        return response
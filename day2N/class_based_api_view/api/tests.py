@@ -1,3 +1,171 @@
-from django.test import TestCase
+import base64
+import glob
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+from django.contrib.auth.models import User
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from .models import Student
+from .db_router import primary_scope, selector, ReplicaRoutingMiddleware, STICKY_COOKIE, STICKY_HEADER
+from drf_perf.msgpack_renderers import packb, unpackb
+from .profiling import compact_stacks, profiling_state, prune
 
 # Create your tests here.
+
+# The test databases are two separate SQLite files (see settings.py), so a row
+# written to the primary is not visible on the replica. That makes it easy to
+# see where each read went.
+class ReplicaRoutingTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        Student.objects.using('default').create(name='primary', roll=1, city='karachi')
+        Student.objects.using('replica').create(name='replica', roll=2, city='lahore')
+
+    def names(self, response):
+        return [s['name'] for s in response.json()]
+
+    def test_get_reads_from_replica(self):
+        response = self.client.get('/studentapi/')
+        self.assertEqual(self.names(response), ['replica'])
+
+    def test_post_writes_to_primary_and_sets_sticky_marker(self):
+        response = self.client.post('/studentapi/', {'name': 'new', 'roll': 3, 'city': 'quetta'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Student.objects.using('default').filter(name='new').exists())
+        self.assertFalse(Student.objects.using('replica').filter(name='new').exists())
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertGreater(float(response[STICKY_HEADER]), time.time())
+
+    def test_reads_stick_to_primary_after_write(self):
+        self.client.post('/studentapi/', {'name': 'new', 'roll': 3, 'city': 'quetta'},
+                         content_type='application/json')
+        # the test client sends the cookie back
+        response = self.client.get('/studentapi/')
+        self.assertEqual(self.names(response), ['primary', 'new'])
+
+    def test_sticky_header(self):
+        until = '%.3f' % (time.time() + 5)
+        response = self.client.get('/studentapi/', headers={STICKY_HEADER: until})
+        self.assertEqual(self.names(response), ['primary'])
+
+    def test_expired_sticky_marker_reads_from_replica(self):
+        self.client.cookies[STICKY_COOKIE] = '%.3f' % (time.time() - 1)
+        response = self.client.get('/studentapi/')
+        self.assertEqual(self.names(response), ['replica'])
+
+    @override_settings(DATABASE_REPLICAS=['replica', 'default'])
+    def test_round_robin(self):
+        picked = {selector.select() for _ in range(4)}
+        self.assertEqual(picked, {'replica', 'default'})
+
+    @override_settings(REPLICA_SELECTION='least_lag', REPLICA_MAX_LAG=10, REPLICA_LAG_CHECK_INTERVAL=0)
+    def test_least_lag_falls_back_to_primary(self):
+        with mock.patch.object(selector, 'measure_lag', return_value=60):
+            self.assertEqual(selector.select(), 'default')
+        with mock.patch.object(selector, 'measure_lag', return_value=1):
+            self.assertEqual(selector.select(), 'replica')
+
+    def test_reads_outside_request_use_primary(self):
+        # shell, management commands: no replica lag unless asked for
+        self.assertEqual(list(Student.objects.values_list('name', flat=True)), ['primary'])
+
+    def test_primary_scope_reads_own_writes(self):
+        with primary_scope(primary=False):
+            self.assertEqual(list(Student.objects.values_list('name', flat=True)), ['replica'])
+            Student.objects.create(name='script', roll=4, city='multan')
+            self.assertEqual(list(Student.objects.values_list('name', flat=True)), ['primary', 'script'])
+        # and nothing stays pinned after the scope
+        with primary_scope(primary=False):
+            self.assertEqual(list(Student.objects.values_list('name', flat=True)), ['replica'])
+
+    def streamed_names(self, request):
+        # a streaming view: the query only runs while the body is consumed
+        def view(request):
+            names = (s.name + '\n' for s in Student.objects.iterator())
+            return StreamingHttpResponse(names)
+        response = ReplicaRoutingMiddleware(view)(request)
+        return b''.join(response.streaming_content).decode().split()
+
+    def test_streamed_body_reads_from_replica(self):
+        self.assertEqual(self.streamed_names(RequestFactory().get('/')), ['replica'])
+
+    def test_streamed_body_sticks_to_primary(self):
+        request = RequestFactory().get('/', headers={STICKY_HEADER: '%.3f' % (time.time() + 5)})
+        self.assertEqual(self.streamed_names(request), ['primary'])
+
+
+class MessagePackTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def test_post_and_get_msgpack(self):
+        response = self.client.post('/studentapi/', packb({'name': 'bin', 'roll': 7, 'city': 'karachi'}),
+                                    content_type='application/msgpack', headers={'Accept': 'application/msgpack'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(unpackb(response.content), {'msg': 'data created'})
+
+        response = self.client.get('/studentapi/', headers={'Accept': 'application/msgpack'})
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual([s['name'] for s in unpackb(response.content)], ['bin'])
+
+    def test_pure_python_codec_round_trip(self):
+        data = [{'id': 1, 'name': 'x' * 40, 'roll': -300, 'city': None, 'ok': True, 'avg': 1.5}]
+        self.assertEqual(unpackb(packb(data)), data)
+
+
+class ProfilingTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        overridden = self.settings(DEBUG=False, PROFILING={'DIR': self.dir, 'MAX_FILES': 200, 'MAX_STACKS_BYTES': 1000})
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        # only the header triggers a profile
+        profiling_state.set({'enabled': True, 'mode': 'cprofile', 'sample_every': 10 ** 9})
+        self.addCleanup(profiling_state.set, {'enabled': False})
+
+    def profiles(self):
+        return glob.glob(os.path.join(self.dir, '*.prof'))
+
+    def test_header_ignored_for_anonymous(self):
+        self.client.get('/studentapi/', headers={'X-Profile': '1'})
+        self.assertEqual(self.profiles(), [])
+
+    def test_header_honoured_for_basic_auth_staff(self):
+        # not a session login: only DRF's authenticators know this user
+        # (a GET reads from the replica)
+        for alias in ('default', 'replica'):
+            User.objects.db_manager(alias).create_user('staff', password='pw', is_staff=True)
+        credentials = base64.b64encode(b'staff:pw').decode()
+        self.client.get('/studentapi/', headers={'X-Profile': '1', 'Authorization': 'Basic ' + credentials})
+        self.assertEqual(len(self.profiles()), 1)
+
+    def test_prune_skips_files_removed_meanwhile(self):
+        for i in range(3):
+            open(os.path.join(self.dir, '%d.prof' % i), 'w').close()
+        getmtime = os.path.getmtime
+
+        def vanished(path):
+            if path.endswith('1.prof'):
+                raise FileNotFoundError(path)
+            return getmtime(path)
+        with mock.patch('os.path.getmtime', vanished):
+            prune(self.dir, 1)
+        self.assertEqual(len(self.profiles()), 2)
+
+    def test_stack_files_are_compacted(self):
+        path = os.path.join(self.dir, 'stacks-1.collapsed')
+        with open(path, 'w') as f:
+            for i in range(200):
+                f.write('main;handler;query %d\n' % 1)
+                f.write('main;rare%d 1\n' % i)
+        compact_stacks(path, 500)
+        self.assertLessEqual(os.path.getsize(path), 500)
+        with open(path) as f:
+            self.assertEqual(f.readline(), 'main;handler;query 200\n')
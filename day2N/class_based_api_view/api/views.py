@@ -5,9 +5,15 @@ from .serializer import StudentSerializer
 from .models import Student
 from rest_framework.views import APIView
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer, BrowsableAPIRenderer
+from rest_framework.parsers import JSONParser, FormParser, MultiPartParser
+from drf_perf.msgpack_renderers import BINARY_RENDERERS, BINARY_PARSERS
 # Create your views here.
 
 class StudentAPI(APIView):
+    renderer_classes = [JSONRenderer, BrowsableAPIRenderer] + BINARY_RENDERERS
+    parser_classes = [JSONParser, FormParser, MultiPartParser] + BINARY_PARSERS
+
     def get(self, request, pk=None,  format=None):
         id = pk
         if id is not None:
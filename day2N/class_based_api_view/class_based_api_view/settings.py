@@ -10,11 +10,17 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# the shared drf_perf package lives at the repo root
+sys.path.append(str(BASE_DIR.parent.parent))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -42,11 +48,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'drf_perf.metrics.MetricsMiddleware',
+    'api.db_router.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -78,9 +87,24 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'TEST': {'NAME': BASE_DIR / 'test_primary.sqlite3'},
+    },
+    # read replica. In development it is the same file as the primary, in
+    # production point it (and any others in DATABASE_REPLICAS) at the replicas.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {'NAME': BASE_DIR / 'test_replica.sqlite3'},
+    },
 }
 
+# Safe-method reads go to a replica, see api/db_router.py
+DATABASE_ROUTERS = ['api.db_router.ReplicaRouter']
+DATABASE_REPLICAS = ['replica']
+REPLICA_SELECTION = 'round_robin'   # or 'least_lag'
+REPLICA_MAX_LAG = 30                # seconds, least_lag falls back to the primary above this
+REPLICA_STICKY_SECONDS = 5          # reads stay on the primary this long after a write
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -122,3 +146,20 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Per-view request counters and latency histograms, see drf_perf/metrics.py
+METRICS = {
+    'DIR': os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'class_based_api_view_metrics')),
+    'BUCKETS': [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+    'MAX_SERIES': 1024,
+    # who may GET /metrics besides staff users (the scraper)
+    'ALLOWED_NETWORKS': os.environ.get('METRICS_ALLOWED_NETWORKS', '127.0.0.1/32,::1/128').split(','),
+}
+
+# Opt-in profiling, switched on and off at /profiling/ (see api/profiling.py)
+PROFILING = {
+    'DIR': os.environ.get('PROFILING_DIR', os.path.join(tempfile.gettempdir(), 'class_based_api_view_profiles')),
+    'HEADER': 'X-Profile',
+    'INTERVAL': 0.001,
+    'MAX_FILES': 200,
+}
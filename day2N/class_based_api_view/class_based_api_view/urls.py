@@ -1,8 +1,12 @@
 from django.contrib import admin
 from django.urls import path
 from api import views
+from drf_perf.metrics import metrics
+from api.profiling import profiling
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics),
+    path('profiling/', profiling),
     path('studentapi/', views.StudentAPI.as_view()),
     path('studentapi/<int:pk>', views.StudentAPI.as_view()),
 ]
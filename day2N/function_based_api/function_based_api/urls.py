@@ -17,8 +17,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 from api import views
+from drf_perf.metrics import metrics
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics),
     path('studentapi/', views.hello_world),
     path('studentapi/<int:pk>', views.hello_world),
 ]
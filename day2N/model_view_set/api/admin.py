@@ -1,7 +1,29 @@
 from django.contrib import admin
-from .models import Student
+from .models import Student, SlowQuery
 
 # Register your models here.
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
-    fields = ['id', 'name', 'roll', 'city']
\ No newline at end of file
+    fields = ['id', 'name', 'roll', 'city']
+
+
+# slow query report, filled in by api/slow_queries.py
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ['short_sql', 'alias', 'view', 'count', 'avg_ms', 'max_ms', 'total_ms', 'last_seen']
+    list_filter = ['alias', 'view']
+    search_fields = ['sql', 'view']
+    ordering = ['-total_ms']
+    readonly_fields = ['fingerprint', 'alias', 'sql', 'params', 'view', 'stack', 'plan',
+                       'count', 'total_ms', 'max_ms', 'first_seen', 'last_seen']
+
+    @admin.display(description='sql')
+    def short_sql(self, obj):
+        return obj.sql[:120]
+
+    @admin.display(description='avg ms')
+    def avg_ms(self, obj):
+        return round(obj.total_ms / obj.count, 1) if obj.count else 0
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,174 @@
+# Response compression
+#
+# Like django.middleware.gzip.GZipMiddleware, plus:
+#   - brotli ('br') and zstd when the `brotli` / `zstandard` packages are
+#     installed, picked from the client's Accept-Encoding
+#   - a size threshold, small bodies are sent as they are
+#   - a compression level per encoding
+#   - StreamingHttpResponse chunks (the csv / ndjson exports) are compressed
+#     and flushed one by one instead of buffering the whole body
+#
+# Only the API's own content types are compressed. HTML (the admin, the
+# browsable API, anything carrying a CSRF token) is sent as it is: a secret
+# compressed together with text the attacker controls leaks through the
+# response length (BREACH), and unlike GZipMiddleware, which pads its gzip
+# output against that, nothing masks the length of brotli / zstd here.
+#
+# COMPRESSION = {
+#     'MIN_SIZE': 1024,
+#     'ENCODINGS': ['zstd', 'br', 'gzip'],   # server preference order
+#     'LEVELS': {'gzip': 6, 'br': 4, 'zstd': 3},
+#     'CONTENT_TYPES': ['application/json', 'application/msgpack', ...],
+# }
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULTS = {
+    'MIN_SIZE': 1024,
+    'ENCODINGS': ['zstd', 'br', 'gzip'],
+    'LEVELS': {'gzip': 6, 'br': 4, 'zstd': 3},
+    'CONTENT_TYPES': ['application/json', 'application/msgpack', 'application/cbor',
+                      'text/csv', 'application/x-ndjson'],
+}
+
+accept_encoding_re = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def get_setting(name):
+    return getattr(settings, 'COMPRESSION', {}).get(name, DEFAULTS[name])
+
+
+class GzipCompressor:
+    encoding = 'gzip'
+
+    def __init__(self, level):
+        # wbits=31: zlib stream with a gzip header and trailer
+        self.obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data, flush=True):
+        # sync flush so the client gets every chunk as soon as it is produced
+        out = self.obj.compress(data)
+        return out + self.obj.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self):
+        return self.obj.flush()
+
+
+class BrotliCompressor:
+    encoding = 'br'
+
+    def __init__(self, level):
+        self.obj = brotli.Compressor(quality=level)
+
+    def compress(self, data, flush=True):
+        out = self.obj.process(data)
+        return out + self.obj.flush() if flush else out
+
+    def finish(self):
+        return self.obj.finish()
+
+
+class ZstdCompressor:
+    encoding = 'zstd'
+
+    def __init__(self, level):
+        self.obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data, flush=True):
+        out = self.obj.compress(data)
+        return out + self.obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK) if flush else out
+
+    def finish(self):
+        return self.obj.flush()
+
+
+COMPRESSORS = {'gzip': GzipCompressor}
+if brotli is not None:
+    COMPRESSORS['br'] = BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS['zstd'] = ZstdCompressor
+
+
+def compress_bytes(encoding, data, level=None):
+    if level is None:
+        level = get_setting('LEVELS')[encoding]
+    compressor = COMPRESSORS[encoding](level)
+    return compressor.compress(data, flush=False) + compressor.finish()
+
+
+def compress_stream(encoding, chunks, level=None):
+    if level is None:
+        level = get_setting('LEVELS')[encoding]
+    compressor = COMPRESSORS[encoding](level)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def choose_encoding(accept_encoding):
+    # the first encoding in server order that the client accepts with q > 0
+    accepted = {}
+    for match in accept_encoding_re.finditer(accept_encoding):
+        name, q = match.group(1).lower(), match.group(2)
+        try:
+            accepted[name] = float(q) if q is not None else 1.0
+        except ValueError:
+            continue
+    for encoding in get_setting('ENCODINGS'):
+        if encoding in COMPRESSORS and accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        # the body may differ by Accept-Encoding even when we send it as is
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        if response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in get_setting('CONTENT_TYPES'):
+            return response
+        if not response.streaming and len(response.content) < get_setting('MIN_SIZE'):
+            return response
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(encoding, response.streaming_content)
+            # length is unknown until the stream is done
+            del response['Content-Length']
+        else:
+            compressed = compress_bytes(encoding, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # the body changed, so a strong ETag no longer matches it byte for byte
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from api.models import SlowQuery
+
+
+# Report of the queries captured by api/slow_queries.py, worst total time first.
+#
+#   python manage.py slow_queries
+#   python manage.py slow_queries --limit 5 --plans
+#   python manage.py slow_queries --clear
+class Command(BaseCommand):
+    help = 'Show captured slow queries with their EXPLAIN plans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--order', choices=['total', 'max', 'count'], default='total')
+        parser.add_argument('--plans', action='store_true', help='also print plan and stack')
+        parser.add_argument('--clear', action='store_true', help='delete everything captured so far')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write('deleted %d slow queries' % deleted)
+            return
+
+        order = {'total': '-total_ms', 'max': '-max_ms', 'count': '-count'}[options['order']]
+        entries = SlowQuery.objects.order_by(order)[:options['limit']]
+        if not entries:
+            self.stdout.write('no slow queries captured')
+            return
+
+        self.stdout.write('%8s %10s %10s %10s  %-10s %s' % ('count', 'avg ms', 'max ms', 'total ms', 'alias', 'view'))
+        for entry in entries:
+            self.stdout.write('%8d %10.1f %10.1f %10.1f  %-10s %s' % (
+                entry.count, entry.total_ms / entry.count if entry.count else 0,
+                entry.max_ms, entry.total_ms, entry.alias, entry.view))
+            self.stdout.write('    ' + entry.sql)
+            if options['plans']:
+                if entry.plan:
+                    self.stdout.write('    plan:')
+                    for line in entry.plan.splitlines():
+                        self.stdout.write('      ' + line)
+                if entry.stack:
+                    self.stdout.write('    stack:')
+                    for line in entry.stack.splitlines():
+                        self.stdout.write('      ' + line)
+            self.stdout.write('')
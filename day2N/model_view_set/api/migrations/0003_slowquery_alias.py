@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_slowquery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='slowquery',
+            name='alias',
+            field=models.CharField(default='default', max_length=100),
+        ),
+    ]
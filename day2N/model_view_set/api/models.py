@@ -6,3 +6,23 @@ class Student(models.Model):
     name = models.CharField(max_length=50)
     roll = models.IntegerField()
     city = models.CharField(max_length=50)
+
+
+# One row per normalized query shape, filled in by api/slow_queries.py
+class SlowQuery(models.Model):
+    fingerprint = models.CharField(max_length=40, unique=True)
+    # database the query ran on: 'default' or one of the read replicas
+    alias = models.CharField(max_length=100, default='default')
+    sql = models.TextField()
+    params = models.TextField(blank=True)
+    view = models.CharField(max_length=200, blank=True)
+    stack = models.TextField(blank=True)
+    plan = models.TextField(blank=True)
+    count = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.sql[:80]
@@ -0,0 +1,59 @@
+# Production renderer profile
+#
+# API_PROFILE = 'production' (env var, see settings.py):
+#   - only the machine formats are registered (json, csv, ndjson, msgpack,
+#     cbor). BrowsableAPIRenderer is never imported by our code, so its
+#     templates, forms and the HTML rendering of every response are skipped.
+#     Browsers sending "text/html,...,*/*" simply get JSON.
+#   - CachedContentNegotiation remembers which renderer each Accept header
+#     (+ ?format=) picked, so the header is parsed once per distinct value
+#     instead of once per request.
+#
+# API_PROFILE = 'development' (default) keeps the browsable API.
+from django.conf import settings
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import JSONRenderer
+
+from drf_perf.msgpack_renderers import BINARY_RENDERERS
+
+from .renderers import CSVStreamingRenderer, NDJSONStreamingRenderer
+
+
+def browsable_api_enabled():
+    return getattr(settings, 'API_BROWSABLE', True)
+
+
+def student_renderer_classes():
+    renderers = [JSONRenderer, CSVStreamingRenderer, NDJSONStreamingRenderer] + BINARY_RENDERERS
+    if browsable_api_enabled():
+        # imported only when the profile asks for it
+        from rest_framework.renderers import BrowsableAPIRenderer
+        renderers.insert(1, BrowsableAPIRenderer)
+    return renderers
+
+
+class CachedContentNegotiation(DefaultContentNegotiation):
+    # distinct Accept headers seen in practice are a handful; the cap only
+    # stops a client sending random headers from growing the dict forever
+    max_cache_entries = 512
+
+    cache = {}
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        format = format_suffix or request.query_params.get(self.settings.URL_FORMAT_OVERRIDE)
+        key = (
+            tuple(type(renderer) for renderer in renderers),
+            format,
+            request.META.get('HTTP_ACCEPT', '*/*'),
+        )
+        hit = self.cache.get(key)
+        if hit is not None:
+            index, media_type = hit
+            return renderers[index], media_type
+
+        # NotAcceptable / Http404 are raised as usual and not cached
+        renderer, media_type = super().select_renderer(request, renderers, format_suffix)
+        if len(self.cache) < self.max_cache_entries:
+            index = next(i for i, r in enumerate(renderers) if r is renderer)
+            self.cache[key] = (index, media_type)
+        return renderer, media_type
@@ -0,0 +1,315 @@
+# Opt-in request profiling
+#
+# Off until a staff user turns it on, no restart needed:
+#
+#   POST /profiling/ action=start mode=cprofile sample_every=50
+#   POST /profiling/ action=stop
+#   POST /profiling/ action=clear
+#   GET  /profiling/                       status + list of profile files
+#   GET  /profiling/?download=<file>       one file
+#   GET  /profiling/?download=collapsed    all stack samples merged into one
+#                                          collapsed-stack file (flamegraph.pl,
+#                                          speedscope, ...)
+#
+# The on/off state lives in a small json file in PROFILING['DIR'] so every
+# worker process sees it (re-read at most once a second).
+#
+# While on, 1 in `sample_every` requests is profiled, plus every request that
+# sends the PROFILING['HEADER'] header, if it comes from a staff user (or
+# DEBUG is on): anyone else could make the server profile at will. Staff
+# means a session login, or a token / JWT / basic login that one of
+# REST_FRAMEWORK's DEFAULT_AUTHENTICATION_CLASSES accepts (run here, before
+# the view, only for requests that send the header). Two modes:
+#   cprofile  cProfile for the whole request, one <pid>-<n>-<view>.prof per
+#             request (python -m pstats, snakeviz)
+#   sampler   a thread records the request thread's stack every INTERVAL
+#             seconds; stacks are appended to stacks-<pid>.collapsed as
+#             "outer;inner;leaf count" lines. A file over MAX_STACKS_BYTES
+#             is compacted: repeated stacks merged into one line, then the
+#             rarest ones dropped until it's under half the limit
+#
+# PROFILING = {
+#     'DIR': '/tmp/model_view_set_profiles',
+#     'HEADER': 'X-Profile',
+#     'INTERVAL': 0.001,
+#     'MAX_FILES': 200,      # oldest .prof files are removed beyond this
+#     'MAX_STACKS_BYTES': 20 * 1024 * 1024,   # per stacks-<pid>.collapsed
+# }
+import cProfile
+import collections
+import glob
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.views.decorators.http import require_http_methods
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from drf_perf.metrics import view_name
+
+DEFAULTS = {
+    'DIR': os.path.join(tempfile.gettempdir(), 'django_profiles'),
+    'HEADER': 'X-Profile',
+    'INTERVAL': 0.001,
+    'MAX_FILES': 200,
+    'MAX_STACKS_BYTES': 20 * 1024 * 1024,
+}
+MODES = ('cprofile', 'sampler')
+STATE_FILE = 'profiling.json'
+
+
+def get_setting(name):
+    return getattr(settings, 'PROFILING', {}).get(name, DEFAULTS[name])
+
+
+def profile_dir():
+    directory = get_setting('DIR')
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+class ProfilingState:
+    # shared on/off switch, cached per process for `ttl` seconds
+    ttl = 1.0
+
+    def __init__(self):
+        self.state = {'enabled': False}
+        self.checked = 0
+
+    def path(self):
+        return os.path.join(profile_dir(), STATE_FILE)
+
+    def get(self):
+        now = time.monotonic()
+        if now - self.checked > self.ttl:
+            try:
+                with open(self.path()) as f:
+                    self.state = json.load(f)
+            except (OSError, ValueError):
+                self.state = {'enabled': False}
+            self.checked = now
+        return self.state
+
+    def set(self, state):
+        tmp = self.path() + '.%d' % os.getpid()
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path())
+        self.state = state
+        self.checked = time.monotonic()
+
+
+profiling_state = ProfilingState()
+
+
+def frame_stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append('%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler(threading.Thread):
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[frame_stack(frame)] += 1
+
+    def stop(self):
+        self.done.set()
+        self.join()
+        return self.stacks
+
+
+_counter = itertools.count(1)
+_write_lock = threading.Lock()
+_profile_lock = threading.Lock()
+
+
+def remove(path):
+    # another worker may have removed it already
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def prune(directory, keep):
+    files = []
+    for path in glob.glob(os.path.join(directory, '*.prof')):
+        try:
+            files.append((os.path.getmtime(path), path))
+        except OSError:
+            # removed by another worker since the glob
+            pass
+    files.sort()
+    for _, path in files[:max(len(files) - keep, 0)]:
+        remove(path)
+
+
+def api_user_is_staff(request):
+    # token / JWT / basic users are only known once DRF authenticates in the
+    # view. Session users are already in request.user, and the session
+    # authenticator would also check CSRF, so it's skipped
+    drf_request = Request(request)
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        if issubclass(authentication_class, SessionAuthentication):
+            continue
+        try:
+            result = authentication_class().authenticate(drf_request)
+        except APIException:
+            return False
+        if result is not None:
+            return result[0].is_staff
+    return False
+
+
+def may_force(request):
+    if settings.DEBUG:
+        return True
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_staff:
+        return True
+    return api_user_is_staff(request)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = profiling_state.get()
+        if not state.get('enabled'):
+            return self.get_response(request)
+        n = next(_counter)
+        forced = request.headers.get(get_setting('HEADER')) and may_force(request)
+        if not forced and n % max(state.get('sample_every', 100), 1):
+            return self.get_response(request)
+
+        if state.get('mode') == 'sampler':
+            sampler = StackSampler(threading.get_ident(), get_setting('INTERVAL'))
+            sampler.start()
+            try:
+                return self.get_response(request)
+            finally:
+                self.save_stacks(sampler.stop())
+
+        # one cProfile at a time per process (python 3.12+ refuses a second
+        # one); concurrent requests are simply not profiled
+        if not _profile_lock.acquire(blocking=False):
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(self.get_response, request)
+        finally:
+            _profile_lock.release()
+            directory = profile_dir()
+            name = '%d-%d-%s.prof' % (os.getpid(), n, view_name(request).replace('/', '_'))
+            profiler.dump_stats(os.path.join(directory, name))
+            prune(directory, get_setting('MAX_FILES'))
+
+    def save_stacks(self, stacks):
+        if not stacks:
+            return
+        path = os.path.join(profile_dir(), 'stacks-%d.collapsed' % os.getpid())
+        with _write_lock:
+            with open(path, 'a') as f:
+                for stack, count in stacks.items():
+                    f.write('%s %d\n' % (stack, count))
+                size = f.tell()
+            if size > get_setting('MAX_STACKS_BYTES'):
+                compact_stacks(path, get_setting('MAX_STACKS_BYTES') // 2)
+
+
+def read_stacks(path, totals):
+    try:
+        with open(path) as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack and count.isdigit():
+                    totals[stack] += int(count)
+    except OSError:
+        pass
+    return totals
+
+
+def compact_stacks(path, max_bytes):
+    # only this process writes its file, so no cross-process locking
+    lines = []
+    size = 0
+    for item in read_stacks(path, collections.Counter()).most_common():
+        line = '%s %d\n' % item
+        size += len(line.encode())
+        if size > max_bytes:
+            break
+        lines.append(line)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        f.writelines(lines)
+    os.replace(tmp, path)
+
+
+def merged_stacks(directory):
+    totals = collections.Counter()
+    for path in glob.glob(os.path.join(directory, 'stacks-*.collapsed')):
+        read_stacks(path, totals)
+    return ''.join('%s %d\n' % item for item in totals.most_common())
+
+
+@staff_member_required
+@require_http_methods(['GET', 'POST'])
+def profiling(request):
+    directory = profile_dir()
+
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        if action == 'start':
+            mode = request.POST.get('mode', 'cprofile')
+            if mode not in MODES:
+                return JsonResponse({'error': 'mode must be one of %s' % ', '.join(MODES)}, status=400)
+            try:
+                sample_every = max(int(request.POST.get('sample_every', 100)), 1)
+            except ValueError:
+                return JsonResponse({'error': 'sample_every must be an integer'}, status=400)
+            profiling_state.set({'enabled': True, 'mode': mode, 'sample_every': sample_every})
+        elif action == 'stop':
+            profiling_state.set({'enabled': False})
+        elif action == 'clear':
+            for path in glob.glob(os.path.join(directory, '*.prof')) + glob.glob(os.path.join(directory, '*.collapsed')):
+                remove(path)
+        else:
+            return JsonResponse({'error': 'action must be start, stop or clear'}, status=400)
+
+    download = request.GET.get('download')
+    if download == 'collapsed':
+        response = HttpResponse(merged_stacks(directory), content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="stacks.collapsed"'
+        return response
+    if download:
+        # only names from our own listing, never a path from the client
+        if download not in os.listdir(directory) or download == STATE_FILE:
+            raise Http404('No such profile')
+        return FileResponse(open(os.path.join(directory, download), 'rb'), as_attachment=True, filename=download)
+
+    files = sorted(name for name in os.listdir(directory) if name.endswith(('.prof', '.collapsed')))
+    return JsonResponse({'state': profiling_state.get(), 'files': files})
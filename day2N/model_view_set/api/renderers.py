@@ -0,0 +1,69 @@
+# Streaming export renderers
+#
+# Picked through normal content negotiation:
+#   GET /studentapi/?format=csv      or  Accept: text/csv
+#   GET /studentapi/?format=ndjson   or  Accept: application/x-ndjson
+#
+# render() works like any DRF renderer (used for retrieve, errors, ...).
+# StreamingListMixin.list() calls render_stream() instead, which turns an
+# iterator of rows into an iterator of encoded chunks, so the list is never
+# built in memory.
+import csv
+import io
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+class StreamingRenderer(BaseRenderer):
+    charset = 'utf-8'
+    # rows encoded per yielded chunk, keeps the number of tiny writes down
+    rows_per_chunk = 500
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0]) if rows and isinstance(rows[0], dict) else []
+        return b''.join(self.render_stream(rows, fields))
+
+    def render_stream(self, rows, fields):
+        raise NotImplementedError('.render_stream() must be overridden')
+
+
+class CSVStreamingRenderer(StreamingRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def render_stream(self, rows, fields):
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+            if count % self.rows_per_chunk == 0:
+                yield buf.getvalue().encode(self.charset)
+                buf.seek(0)
+                buf.truncate()
+        if buf.tell():
+            yield buf.getvalue().encode(self.charset)
+
+
+class NDJSONStreamingRenderer(StreamingRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render_stream(self, rows, fields):
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        lines = []
+        for row in rows:
+            lines.append(encoder.encode(row))
+            if len(lines) == self.rows_per_chunk:
+                lines.append('')
+                yield '\n'.join(lines).encode(self.charset)
+                lines = []
+        if lines:
+            lines.append('')
+            yield '\n'.join(lines).encode(self.charset)
@@ -0,0 +1,189 @@
+# Per-phase latency breakdown
+#
+# ServerTimingMiddleware picks a sample of requests and ServerTimingMixin
+# (on the viewset) times the DRF phases of those requests:
+#
+#   connect    waiting for the db connection (ConnectionTimingMiddleware)
+#   auth       perform_authentication()
+#   db         every SQL query run by the handler (queryset evaluation,
+#              get_object(), save(), ...) on any database alias (primary
+#              and read replicas), via execute_wrapper
+#   serialize  the handler minus db: serializer.data, is_valid(), ...
+#   render     renderer.render()
+#              (csv / ndjson exports stream after the view returns, so their
+#              rows show up only in total)
+#   total      the whole request, as seen by the outermost middleware
+#
+# and sends them back as
+#
+#   Server-Timing: auth;dur=0.051, db;dur=2.310, serialize;dur=0.840, ...
+#
+# (shown in the browser devtools Timing tab) and/or one json log line on the
+# "api.server_timing" logger. Requests that are not sampled only pay for one
+# random() call.
+#
+# SERVER_TIMING = {
+#     'SAMPLE_RATE': 0.1,     # 0..1, share of requests that are timed
+#     'HEADER': True,         # send the Server-Timing header
+#     'LOG': False,           # log a json line per timed request
+#     'FORCE_HEADER': 'X-Server-Timing',  # request header that forces timing
+# }
+#
+# The Server-Timing header only goes to staff users (or everyone when DEBUG
+# is on), whether the request was sampled or forced with FORCE_HEADER: it
+# says how long the database and the serializers take, which is nobody
+# else's business. The user is known only once the request has run
+# (AuthenticationMiddleware and DRF authentication are inside this
+# middleware), so a forced request is timed and its timings are dropped if
+# it didn't come from staff. Sampled requests are still logged for all.
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'SAMPLE_RATE': 0.1,
+    'HEADER': True,
+    'LOG': False,
+    'FORCE_HEADER': 'X-Server-Timing',
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'SERVER_TIMING', {}).get(name, DEFAULTS[name])
+
+
+class Timings:
+    def __init__(self):
+        self.phases = {}
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0) + seconds * 1000
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def header(self):
+        return ', '.join('%s;dur=%.3f' % (name, ms) for name, ms in self.phases.items())
+
+
+def get_timings(request):
+    # works with both the django request and the DRF Request wrapping it
+    return getattr(getattr(request, '_request', request), 'server_timing', None)
+
+
+class ServerTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def sampled(self):
+        rate = get_setting('SAMPLE_RATE')
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def forced(self, request):
+        force_header = get_setting('FORCE_HEADER')
+        return bool(force_header and request.headers.get(force_header))
+
+    def staff(self, request):
+        # DRF copies the user it authenticated onto the django request
+        user = getattr(request, 'user', None)
+        return settings.DEBUG or (user is not None and user.is_staff)
+
+    def __call__(self, request):
+        sampled = self.sampled()
+        forced = not sampled and self.forced(request)
+        if not sampled and not forced:
+            return self.get_response(request)
+
+        timings = request.server_timing = Timings()
+        start = time.perf_counter()
+        response = self.get_response(request)
+        total = time.perf_counter() - start
+        staff = self.staff(request)
+        if forced and not staff:
+            return response
+
+        connect_ms = getattr(request, 'db_connect_ms', None)
+        if connect_ms is not None:
+            timings.phases = {'connect': connect_ms, **timings.phases}
+        timings.add('total', total)
+
+        if get_setting('HEADER') and staff:
+            response['Server-Timing'] = timings.header()
+        if get_setting('LOG'):
+            match = request.resolver_match
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': match.view_name if match else None,
+                'status': response.status_code,
+                'phases': {name: round(ms, 3) for name, ms in timings.phases.items()},
+            }))
+        return response
+
+
+class ServerTimingMixin:
+    def perform_authentication(self, request):
+        timings = get_timings(request)
+        if timings is None:
+            return super().perform_authentication(request)
+        with timings.phase('auth'):
+            super().perform_authentication(request)
+
+    def handle_request(self, timings, handler, request, *args, **kwargs):
+        db = [0]
+
+        def time_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                db[0] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(time_query))
+                return handler(request, *args, **kwargs)
+        finally:
+            # also when the handler raises (404, validation errors)
+            elapsed = time.perf_counter() - start
+            timings.add('db', db[0])
+            timings.add('serialize', elapsed - db[0])
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        timings = get_timings(request)
+        if timings is None:
+            return
+        # dispatch() looks the handler up after initial(), so wrap it here
+        method = request.method.lower()
+        if method in self.http_method_names:
+            handler = getattr(self, method, None)
+            if handler is not None:
+                def timed(request, *args, **kwargs):
+                    return self.handle_request(timings, handler, request, *args, **kwargs)
+                setattr(self, method, timed)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        timings = get_timings(request)
+        # Django would render it a little later anyway; doing it here lets us
+        # time the renderer on its own
+        if timings is not None and isinstance(response, Response):
+            with timings.phase('render'):
+                response.render()
+        return response
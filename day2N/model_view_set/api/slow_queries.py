@@ -0,0 +1,194 @@
+# Slow query capture
+#
+# SlowQueryMiddleware wraps every request in execute_wrapper() on every
+# database alias (the primary and the read replicas), including a streamed
+# body (csv / ndjson lists) whose queries run after the view has returned.
+# A query slower than SLOW_QUERIES['THRESHOLD_MS'] is handed to a background
+# thread together with the alias it ran on, the view it came from and the
+# project frames of the stack that ran it. That thread:
+#   - normalizes the SQL into a fingerprint (literals and IN lists folded), so
+#     "roll = 5" and "roll = 7" count as the same query; the same query on
+#     another alias is another entry, since its plan and timings differ
+#   - runs EXPLAIN (PostgreSQL) / EXPLAIN QUERY PLAN (SQLite) the first time a
+#     SELECT with that fingerprint shows up
+#   - adds it to the SlowQuery row for the fingerprint (count, total, max)
+# so the request itself only pays for a timer and, when slow, a queue put.
+#
+# Report: the SlowQuery page in the admin, or
+#   python manage.py slow_queries [--limit 20] [--clear]
+#
+# SLOW_QUERIES = {
+#     'THRESHOLD_MS': 100,
+#     'EXPLAIN': True,
+#     'MAX_PENDING': 1000,   # queued captures; more are dropped
+#     'STACK_DEPTH': 10,     # project frames kept per capture
+# }
+import contextlib
+import hashlib
+import logging
+import queue
+import re
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from drf_perf.metrics import view_name
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'THRESHOLD_MS': 100,
+    'EXPLAIN': True,
+    'MAX_PENDING': 1000,
+    'STACK_DEPTH': 10,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'SLOW_QUERIES', {}).get(name, DEFAULTS[name])
+
+
+string_re = re.compile(r"'(?:[^']|'')*'")
+number_re = re.compile(r'\b\d+(?:\.\d+)?\b')
+in_list_re = re.compile(r'\bIN\s*\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)', re.IGNORECASE)
+space_re = re.compile(r'\s+')
+
+
+def normalize(sql):
+    sql = string_re.sub('?', sql)
+    sql = number_re.sub('?', sql)
+    sql = in_list_re.sub('IN (...)', sql)
+    return space_re.sub(' ', sql).strip()
+
+
+def fingerprint(sql, alias='default'):
+    # the primary keeps the fingerprints it had before replicas were recorded
+    key = normalize(sql) if alias == 'default' else '%s\0%s' % (alias, normalize(sql))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def project_stack(depth):
+    # our own frames only: django / DRF / site-packages tell us nothing new,
+    # neither do the middleware __call__s the request passed through
+    frames = [f for f in traceback.extract_stack()[:-3]
+              if 'site-packages' not in f.filename and 'slow_queries.py' not in f.filename
+              and f.name != '__call__']
+    return ''.join(traceback.format_list(frames[-depth:]))
+
+
+def explain(alias, sql, params):
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return ''
+    connection = connections[alias]
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        return '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+
+
+class SlowQueryRecorder:
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, capture):
+        if self.queue.qsize() >= get_setting('MAX_PENDING'):
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='slow-queries', daemon=True)
+                self.thread.start()
+        self.queue.put(capture)
+
+    def run(self):
+        while True:
+            capture = self.queue.get()
+            try:
+                self.save(capture)
+            except Exception:
+                logger.exception('could not record slow query')
+                # drop a connection left broken by the failure
+                connections.close_all()
+
+    def save(self, capture):
+        from .models import SlowQuery
+
+        # get_or_create + F() updates: safe when several workers record the
+        # same fingerprint at once
+        entry, _ = SlowQuery.objects.get_or_create(fingerprint=fingerprint(capture['sql'], capture['alias']),
+                                                   defaults={'sql': capture['sql'], 'alias': capture['alias']})
+        ms = capture['ms']
+        fields = {
+            'sql': capture['sql'],
+            'params': repr(capture['params'])[:1000],
+            'view': capture['view'],
+            'stack': capture['stack'],
+            'count': F('count') + 1,
+            'total_ms': F('total_ms') + ms,
+            'max_ms': Greatest('max_ms', Value(ms, output_field=FloatField())),
+            'last_seen': timezone.now(),
+        }
+        if not entry.plan and get_setting('EXPLAIN') and not capture['many']:
+            try:
+                fields['plan'] = explain(capture['alias'], capture['sql'], capture['params'])
+            except Exception as exc:
+                fields['plan'] = 'EXPLAIN failed: %s' % exc
+        SlowQuery.objects.filter(pk=entry.pk).update(**fields)
+
+
+recorder = SlowQueryRecorder()
+
+
+class SlowQueryMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @contextlib.contextmanager
+    def wrapped(self, capture):
+        with contextlib.ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(capture))
+            yield
+
+    def stream(self, chunks, capture):
+        chunks = iter(chunks)
+        while True:
+            with self.wrapped(capture):
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    return
+            yield chunk
+
+    def __call__(self, request):
+        threshold = get_setting('THRESHOLD_MS')
+
+        def capture(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                ms = (time.perf_counter() - start) * 1000
+                if ms >= threshold:
+                    recorder.submit({
+                        'alias': context['connection'].alias,
+                        'sql': sql,
+                        'params': None if many else params,
+                        'many': many,
+                        'ms': ms,
+                        'view': view_name(request),
+                        'stack': project_stack(get_setting('STACK_DEPTH')),
+                    })
+
+        with self.wrapped(capture):
+            response = self.get_response(request)
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.stream(response.streaming_content, capture)
+        return response
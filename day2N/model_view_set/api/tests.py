@@ -1,3 +1,286 @@
-from django.test import TestCase
+import csv
+import glob
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zlib
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from drf_perf import metrics
+from drf_perf.msgpack_renderers import CBOR_AVAILABLE, packb, unpackb
+from .models import Student
+from .db_router import selector
+from .negotiation import CachedContentNegotiation
+from .profiling import profiling_state
+from .views import StudentModelViewSet
+from .slow_queries import fingerprint, recorder
 
 # Create your tests here.
+
+# No replicas in the test settings, so these watch whether the router asks the
+# selector for one (replica read) or answers 'default' itself (primary read).
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        Student.objects.create(name='amir', roll=1, city='karachi')
+
+    def read_ndjson(self):
+        with mock.patch.object(selector, 'select', return_value='default') as select:
+            response = self.client.get('/studentapi/?format=ndjson')
+            # the rows are read here, after the middleware has returned
+            body = b''.join(response.streaming_content)
+        return body, select
+
+    def test_streamed_list_reads_from_replica(self):
+        body, select = self.read_ndjson()
+        self.assertIn(b'amir', body)
+        self.assertTrue(select.called)
+
+    def test_streamed_list_sticks_to_primary_after_write(self):
+        response = self.client.post('/studentapi/', {'name': 'new', 'roll': 2, 'city': 'quetta'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        # the test client sends the sticky cookie back
+        body, select = self.read_ndjson()
+        self.assertIn(b'new', body)
+        self.assertFalse(select.called)
+
+
+@override_settings(SLOW_QUERIES={'THRESHOLD_MS': 0, 'STACK_DEPTH': 5})
+class SlowQueryTests(TestCase):
+    def setUp(self):
+        Student.objects.create(name='amir', roll=1, city='karachi')
+
+    def captured(self, *args, **kwargs):
+        with mock.patch.object(recorder, 'submit') as submit:
+            response = self.client.get(*args, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return [call.args[0] for call in submit.call_args_list]
+
+    def student_queries(self, captures):
+        return [c for c in captures if 'api_student' in c['sql']]
+
+    def test_captures_view_and_alias(self):
+        captures = self.student_queries(self.captured('/studentapi/'))
+        self.assertEqual(len(captures), 1)
+        self.assertEqual(captures[0]['view'], 'StudentModelViewSet-list')
+        self.assertEqual(captures[0]['alias'], 'default')
+
+    def test_captures_streamed_body(self):
+        # the ndjson list runs its query while the body is sent
+        captures = self.student_queries(self.captured('/studentapi/?format=ndjson'))
+        self.assertEqual(len(captures), 1)
+
+    def test_fingerprint_per_alias(self):
+        sql = 'SELECT * FROM api_student WHERE roll = 5'
+        self.assertEqual(fingerprint(sql), fingerprint(sql.replace('5', '7')))
+        self.assertNotEqual(fingerprint(sql), fingerprint(sql, 'replica1'))
+
+
+@override_settings(SERVER_TIMING={'SAMPLE_RATE': 1})
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        Student.objects.create(name='amir', roll=1, city='karachi')
+
+    def test_sampled_request_hides_header_from_anonymous(self):
+        response = self.client.get('/studentapi/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+
+    def test_staff_gets_header_with_db_phase(self):
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        response = self.client.get('/studentapi/')
+        phases = dict(part.split(';dur=') for part in response['Server-Timing'].split(', '))
+        self.assertIn('db', phases)
+        self.assertGreater(float(phases['db']), 0)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        overridden = override_settings(METRICS={'DIR': self.dir})
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        # a fresh file for this process, in self.dir
+        patcher = mock.patch.object(metrics, '_file_pid', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def scrape(self, **extra):
+        return self.client.get('/metrics', **extra)
+
+    def test_counts_requests_per_view(self):
+        self.client.get('/studentapi/')
+        self.client.get('/studentapi/')
+        response = self.scrape()
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'http_requests_total{view="StudentModelViewSet-list",status="200"} 2')
+
+    def test_allowed_networks_are_stripped(self):
+        with override_settings(METRICS={'DIR': self.dir, 'ALLOWED_NETWORKS': [' 10.0.0.0/8 ', '']}):
+            self.assertEqual(self.scrape(REMOTE_ADDR='10.1.2.3').status_code, 200)
+            self.assertEqual(self.scrape().status_code, 403)
+
+    def test_malformed_network_is_a_config_error(self):
+        with override_settings(METRICS={'ALLOWED_NETWORKS': ['10.0.0/8x']}):
+            with self.assertRaises(ImproperlyConfigured):
+                metrics.allowed_networks()
+
+    def test_dead_worker_files_are_merged(self):
+        for n in range(2):
+            # files left by workers that have exited
+            child = subprocess.Popen([sys.executable, '-c', 'pass'])
+            child.wait()
+            path = os.path.join(self.dir, 'metrics-%d-0a.db' % child.pid)
+            metrics.MetricsFile(path, metrics.DEFAULTS['BUCKETS'], 8).observe('gone', 200, 0.01)
+        self.client.get('/studentapi/')
+        names = [os.path.basename(p) for p in glob.glob(os.path.join(self.dir, 'metrics-*.db'))]
+        self.assertEqual(len(names), 2)
+        self.assertIn(metrics.AGGREGATE, names)
+        self.assertContains(self.scrape(), 'http_requests_total{view="gone",status="200"} 2')
+
+
+class CompressionTests(TestCase):
+    def setUp(self):
+        Student.objects.bulk_create(Student(name='student %d' % n, roll=n, city='karachi') for n in range(100))
+
+    def test_json_is_compressed(self):
+        response = self.client.get('/studentapi/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'student 99', zlib.decompress(response.content, 31))
+
+    def test_streamed_csv_is_compressed(self):
+        response = self.client.get('/studentapi/?format=csv', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'student 99', zlib.decompress(b''.join(response.streaming_content), 31))
+
+    def test_html_is_not_compressed(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+        response = self.client.get('/admin/api/student/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class StreamingRendererTests(TestCase):
+    def setUp(self):
+        for roll in range(1, 4):
+            Student.objects.create(name='s%d' % roll, roll=roll, city='lahore')
+
+    def body(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_list(self):
+        response = self.client.get('/studentapi/?format=csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="student.csv"')
+        rows = list(csv.DictReader(io.StringIO(self.body(response))))
+        self.assertEqual([row['name'] for row in rows], ['s1', 's2', 's3'])
+        self.assertEqual(rows[0]['city'], 'lahore')
+
+    def test_ndjson_list(self):
+        response = self.client.get('/studentapi/', headers={'Accept': 'application/x-ndjson'})
+        lines = self.body(response).splitlines()
+        self.assertEqual([json.loads(line)['roll'] for line in lines], [1, 2, 3])
+
+    def test_csv_detail_is_not_streamed(self):
+        student = Student.objects.get(roll=2)
+        response = self.client.get('/studentapi/%d/?format=csv' % student.pk)
+        self.assertFalse(response.streaming)
+        self.assertEqual(list(csv.DictReader(io.StringIO(response.content.decode())))[0]['name'], 's2')
+
+
+class NegotiationTests(TestCase):
+    def setUp(self):
+        Student.objects.create(name='bin', roll=1, city='multan')
+
+    def test_msgpack_response(self):
+        response = self.client.get('/studentapi/', headers={'Accept': 'application/msgpack'})
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual([s['name'] for s in unpackb(response.content)], ['bin'])
+
+    def test_msgpack_request_body(self):
+        response = self.client.post('/studentapi/', packb({'name': 'packed', 'roll': 2, 'city': 'sukkur'}),
+                                    content_type='application/msgpack')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Student.objects.filter(name='packed').exists())
+
+    def test_cbor_response(self):
+        if not CBOR_AVAILABLE:
+            self.skipTest('cbor2 is not installed')
+        import cbor2
+        response = self.client.get('/studentapi/?format=cbor')
+        self.assertEqual(response['Content-Type'], 'application/cbor')
+        self.assertEqual(cbor2.loads(response.content)[0]['city'], 'multan')
+
+    def test_unknown_format_is_not_acceptable(self):
+        self.assertEqual(self.client.get('/studentapi/', headers={'Accept': 'image/png'}).status_code, 406)
+
+    def test_cached_negotiation_picks_same_renderer(self):
+        negotiation = CachedContentNegotiation()
+        negotiation.cache = {}
+        renderers = [cls() for cls in StudentModelViewSet.renderer_classes]
+        for accept in ('application/msgpack', 'application/msgpack', 'text/csv'):
+            request = Request(APIRequestFactory().get('/studentapi/', HTTP_ACCEPT=accept))
+            renderer, media_type = negotiation.select_renderer(request, renderers)
+            self.assertEqual(renderer.media_type, accept)
+        self.assertEqual(len(negotiation.cache), 2)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        overridden = override_settings(DEBUG=False, PROFILING={'DIR': self.dir, 'MAX_FILES': 200})
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        # only the header triggers a profile
+        profiling_state.set({'enabled': True, 'mode': 'cprofile', 'sample_every': 10 ** 9})
+        self.addCleanup(profiling_state.set, {'enabled': False})
+
+    def profiles(self):
+        return glob.glob(os.path.join(self.dir, '*.prof'))
+
+    def test_header_ignored_for_anonymous(self):
+        self.client.get('/studentapi/', headers={'X-Profile': '1'})
+        self.assertEqual(self.profiles(), [])
+
+    def test_header_honoured_for_staff(self):
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        self.client.get('/studentapi/', headers={'X-Profile': '1'})
+        self.assertEqual(len(self.profiles()), 1)
+
+
+class BulkEndpointTests(TestCase):
+    def post(self, data):
+        return self.client.post('/studentapi/bulk/', data, content_type='application/json')
+
+    def test_valid_rows_created_invalid_reported(self):
+        response = self.post([{'name': 'a', 'roll': 1, 'city': 'x'}, {'name': 'b', 'roll': 'two', 'city': 'y'},
+                              {'name': 'c', 'roll': 3, 'city': 'z'}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual(list(response.json()['errors']), ['1'])
+        self.assertEqual(sorted(Student.objects.values_list('name', flat=True)), ['a', 'c'])
+
+    def test_nothing_valid_is_a_400(self):
+        response = self.post([{'name': 'b'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['created'], 0)
+
+    def test_not_a_list(self):
+        self.assertEqual(self.post({'name': 'a', 'roll': 1, 'city': 'x'}).status_code, 400)
+
+    def test_too_many_rows(self):
+        with mock.patch.object(StudentModelViewSet, 'bulk_max_rows', 2):
+            response = self.post([{'name': 'a', 'roll': n, 'city': 'x'} for n in range(3)])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Student.objects.exists())
@@ -1,7 +1,69 @@
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from .models import Student
 from .serializer import StudentSerializer
-from rest_framework import viewsets
+from .renderers import StreamingRenderer
+from drf_perf.msgpack_renderers import BINARY_PARSERS
+from .negotiation import student_renderer_classes
+from .server_timing import ServerTimingMixin
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.parsers import JSONParser, FormParser, MultiPartParser
 
-class StudentModelViewSet(viewsets.ModelViewSet):
+
+# list() for the csv / ndjson formats: rows are read with a server-side cursor
+# and serialized one at a time as the response is sent
+class StreamingListMixin:
+    stream_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, StreamingRenderer):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # one serializer for every row instead of a ListSerializer over all of them
+        serializer = self.get_serializer()
+        rows = (serializer.to_representation(obj) for obj in queryset.iterator(chunk_size=self.stream_chunk_size))
+        response = StreamingHttpResponse(
+            renderer.render_stream(rows, list(serializer.fields)),
+            content_type='%s; charset=%s' % (renderer.media_type, renderer.charset),
+        )
+        response['Content-Disposition'] = 'attachment; filename="%s.%s"' % (
+            queryset.model._meta.model_name, renderer.format,
+        )
+        return response
+
+
+class StudentModelViewSet(ServerTimingMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = Student.objects.all()
-    serializer_class = StudentSerializer
\ No newline at end of file
+    serializer_class = StudentSerializer
+    # json, csv, ndjson, msgpack, cbor (+ the browsable API outside production)
+    renderer_classes = student_renderer_classes()
+    parser_classes = [JSONParser, FormParser, MultiPartParser] + BINARY_PARSERS
+
+    # POST /studentapi/bulk/ with a json list of students (bulk import): the
+    # valid ones go in with one bulk_create, the invalid ones come back with
+    # their position in the list
+    bulk_max_rows = 5000
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        if not isinstance(request.data, list):
+            return Response({'detail': 'Expected a list of students.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > self.bulk_max_rows:
+            return Response({'detail': 'At most %d students per request.' % self.bulk_max_rows},
+                            status=status.HTTP_400_BAD_REQUEST)
+        valid, errors = [], {}
+        for i, row in enumerate(request.data):
+            serializer = self.get_serializer(data=row)
+            if serializer.is_valid():
+                valid.append(Student(**serializer.validated_data))
+            else:
+                errors[i] = serializer.errors
+        with transaction.atomic():
+            Student.objects.bulk_create(valid, batch_size=1000)
+        # nothing valid: a 400, so a client checking the status doesn't take it for a success
+        return Response({'created': len(valid), 'errors': errors},
+                        status=status.HTTP_201_CREATED if valid else status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,58 @@
+# Benchmark: CPU time vs bytes saved for each encoding and level
+#
+# Renders N Student rows as JSON (no database needed) and compresses the body
+# in one go and as a stream of 500-row chunks, the way CompressionMiddleware
+# does for normal and streaming responses.
+#
+#   python bench_compression.py
+#   python bench_compression.py --rows 200000
+import argparse
+import os
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'model_view_set.settings')
+import django
+django.setup()
+
+from rest_framework.renderers import JSONRenderer
+from api.models import Student
+from api.serializer import StudentSerializer
+from api.compression import COMPRESSORS, compress_bytes, compress_stream
+
+LEVELS = {'gzip': [1, 6, 9], 'br': [1, 4, 11], 'zstd': [1, 3, 19]}
+CHUNK_ROWS = 500
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    students = [Student(id=i, name='student %d' % i, roll=1000 + i, city='karachi') for i in range(args.rows)]
+    data = StudentSerializer(students, many=True).data
+    body = JSONRenderer().render(data)
+    chunks = [JSONRenderer().render(data[i:i + CHUNK_ROWS]) for i in range(0, len(data), CHUNK_ROWS)]
+
+    print('%d rows, %d bytes of JSON' % (args.rows, len(body)))
+    print('%-6s %5s %12s %8s %10s %14s %10s' % (
+        'enc', 'level', 'bytes', 'ratio', 'ms', 'stream bytes', 'stream ms'))
+    for encoding, levels in LEVELS.items():
+        if encoding not in COMPRESSORS:
+            print('%-6s not installed' % encoding)
+            continue
+        for level in levels:
+            start = time.perf_counter()
+            compressed = compress_bytes(encoding, body, level)
+            one_shot = time.perf_counter() - start
+
+            start = time.perf_counter()
+            streamed = sum(len(c) for c in compress_stream(encoding, chunks, level))
+            stream = time.perf_counter() - start
+
+            print('%-6s %5d %12d %8.2f %10.1f %14d %10.1f' % (
+                encoding, level, len(compressed), len(body) / len(compressed),
+                one_shot * 1000, streamed, stream * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# Benchmark: JSON vs MessagePack vs CBOR for a large Student list
+#
+# Serializes N unsaved Student rows with StudentSerializer (no database
+# needed), then times render() and parse() for each format and prints the
+# payload size.
+#
+#   python bench_msgpack.py
+#   python bench_msgpack.py --rows 100000 --repeat 3
+import argparse
+import io
+import os
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'model_view_set.settings')
+import django
+django.setup()
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from api.models import Student
+from api.serializer import StudentSerializer
+from drf_perf import msgpack_renderers
+from drf_perf.msgpack_renderers import MessagePackRenderer, MessagePackParser, CBORRenderer, CBORParser, packb, unpackb
+
+
+class PurePythonMessagePackRenderer(MessagePackRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return packb(data)
+
+
+class PurePythonMessagePackParser(MessagePackParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        return unpackb(stream.read())
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    students = [Student(id=i, name='student %d' % i, roll=1000 + i, city='karachi') for i in range(args.rows)]
+    data = StudentSerializer(students, many=True).data
+
+    formats = [('json', JSONRenderer, JSONParser)]
+    if msgpack_renderers.msgpack is not None:
+        formats.append(('msgpack (C)', MessagePackRenderer, MessagePackParser))
+    formats.append(('msgpack (pure)', PurePythonMessagePackRenderer, PurePythonMessagePackParser))
+    if msgpack_renderers.CBOR_AVAILABLE:
+        formats.append(('cbor', CBORRenderer, CBORParser))
+
+    print('%d rows, best of %d' % (args.rows, args.repeat))
+    print('%-16s %12s %12s %12s' % ('format', 'bytes', 'encode ms', 'decode ms'))
+    for name, renderer_class, parser_class in formats:
+        renderer, parser = renderer_class(), parser_class()
+        encode, payload = best_of(args.repeat, lambda: renderer.render(data))
+        decode, _ = best_of(args.repeat, lambda: parser.parse(io.BytesIO(payload)))
+        print('%-16s %12d %12.2f %12.2f' % (name, len(payload), encode * 1000, decode * 1000))
+
+
+if __name__ == '__main__':
+    main()
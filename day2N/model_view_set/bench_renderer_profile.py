@@ -0,0 +1,109 @@
+# Benchmark: development vs production renderer profile (API_PROFILE)
+#
+# For each profile a fresh interpreter is started so settings are read the way
+# a worker reads them:
+#   - startup: django.setup() + loading the urlconf + building the viewset,
+#     best of --starts runs, plus how many modules ended up imported
+#   - per request: GET /studentapi/ through the whole DRF dispatch (no
+#     middleware, no database: the queryset is a list of unsaved rows) for the
+#     Accept headers a browser, curl and an API client send
+#
+#   python bench_renderer_profile.py
+#   python bench_renderer_profile.py --requests 5000 --rows 50
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ACCEPTS = {
+    'browser': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'curl': '*/*',
+    'api client': 'application/json',
+}
+
+
+def child_startup():
+    start = time.perf_counter()
+    import django
+    django.setup()
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    from api.views import StudentModelViewSet
+    StudentModelViewSet.as_view({'get': 'list'})
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'seconds': elapsed,
+        'modules': len(sys.modules),
+        'template_modules': len([m for m in sys.modules if m.startswith('django.template')]),
+    }))
+
+
+def child_requests(requests, rows):
+    import django
+    django.setup()
+    from rest_framework.test import APIRequestFactory
+    from api.models import Student
+    from api.views import StudentModelViewSet
+
+    students = [Student(id=i, name='student %d' % i, roll=1000 + i, city='karachi') for i in range(rows)]
+
+    class BenchViewSet(StudentModelViewSet):
+        def get_queryset(self):
+            return students
+
+    view = BenchViewSet.as_view({'get': 'list'})
+    factory = APIRequestFactory()
+    result = {}
+    for client, accept in ACCEPTS.items():
+        request = factory.get('/studentapi/', HTTP_ACCEPT=accept)
+        response = view(request)
+        response.render()
+        content_type = response['Content-Type']
+        start = time.perf_counter()
+        for _ in range(requests):
+            view(factory.get('/studentapi/', HTTP_ACCEPT=accept)).render()
+        result[client] = {'us': (time.perf_counter() - start) / requests * 1e6, 'type': content_type}
+    print(json.dumps(result))
+
+
+def run_child(profile, *args):
+    env = dict(os.environ, API_PROFILE=profile, DJANGO_SETTINGS_MODULE='model_view_set.settings')
+    out = subprocess.run([sys.executable, __file__] + list(args), env=env, check=True,
+                         capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--rows', type=int, default=20)
+    parser.add_argument('--starts', type=int, default=5)
+    parser.add_argument('--child', choices=['startup', 'requests'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == 'startup':
+        return child_startup()
+    if args.child == 'requests':
+        return child_requests(args.requests, args.rows)
+
+    profiles = ['development', 'production']
+    print('startup (django.setup + urlconf + viewset), best of %d' % args.starts)
+    print('%-12s %10s %9s %18s' % ('profile', 'ms', 'modules', 'django.template.*'))
+    for profile in profiles:
+        runs = [run_child(profile, '--child', 'startup') for _ in range(args.starts)]
+        best = min(runs, key=lambda r: r['seconds'])
+        print('%-12s %10.1f %9d %18d' % (profile, best['seconds'] * 1000, best['modules'], best['template_modules']))
+
+    print()
+    print('GET /studentapi/ (%d rows), %d requests per client' % (args.rows, args.requests))
+    print('%-12s %-11s %10s  %s' % ('profile', 'client', 'us/req', 'rendered as'))
+    for profile in profiles:
+        result = run_child(profile, '--child', 'requests', '--requests', str(args.requests), '--rows', str(args.rows))
+        for client, r in result.items():
+            print('%-12s %-11s %10.1f  %s' % (profile, client, r['us'], r['type']))
+
+
+if __name__ == '__main__':
+    main()
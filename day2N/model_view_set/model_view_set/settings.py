@@ -10,11 +10,17 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# the shared drf_perf package lives at the repo root
+sys.path.append(str(BASE_DIR.parent.parent))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -42,11 +48,22 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.db_router.ReplicaRoutingMiddleware',
+    'drf_perf.metrics.MetricsMiddleware',
+    'api.server_timing.ServerTimingMiddleware',
+    'drf_perf.db_instrumentation.ConnectionTimingMiddleware',
+    'api.slow_queries.SlowQueryMiddleware',
+    'api.compression.CompressionMiddleware',
+    # ETag on every non-streaming response and 304 for a matching
+    # If-None-Match (StudentClient's cache); before compression in the
+    # response phase, so the tag is computed on the uncompressed body
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -81,6 +98,10 @@ WSGI_APPLICATION = 'model_view_set.wsgi.application'
 #     }
 # }
 
+# Connection reuse (DB_CONN_MAX_AGE, DB_POOL, DB_POOL_SIZE), see drf_perf/db_instrumentation.py
+DB_POOL = os.environ.get('DB_POOL') == '1'
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 4))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -88,10 +109,29 @@ DATABASES = {
         'USER': 'postgres',
         'PASSWORD': '123',
         'HOST': 'localhost',
-        'PORT': '5432'
+        'PORT': '5432',
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': not DB_POOL,
+        'OPTIONS': {
+            'pool': {'min_size': 1, 'max_size': DB_POOL_SIZE, 'timeout': 10},
+        } if DB_POOL else {},
     }
 }
 
+# Read replicas: DB_REPLICA_HOSTS=replica1,replica2 adds one connection per
+# host (same database / user as default). Safe-method reads (list, retrieve)
+# go to them, see api/db_router.py; with none set everything uses default.
+DATABASE_REPLICAS = []
+for i, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    alias = 'replica%d' % (i + 1)
+    DATABASES[alias] = dict(DATABASES['default'], HOST=host.strip(), OPTIONS=dict(DATABASES['default']['OPTIONS']))
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['api.db_router.ReplicaRouter']
+REPLICA_SELECTION = os.environ.get('REPLICA_SELECTION', 'round_robin')   # or 'least_lag'
+REPLICA_MAX_LAG = 30                # seconds, least_lag falls back to the primary above this
+REPLICA_STICKY_SECONDS = 5          # reads stay on the primary this long after a write
+
 
 
 
@@ -135,3 +175,71 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Response compression, see api/compression.py
+COMPRESSION = {
+    'MIN_SIZE': 1024,
+    'ENCODINGS': ['zstd', 'br', 'gzip'],
+    'LEVELS': {'gzip': 6, 'br': 4, 'zstd': 3},
+    # no text/html, see api/compression.py
+    'CONTENT_TYPES': ['application/json', 'application/msgpack', 'application/cbor',
+                      'text/csv', 'application/x-ndjson'],
+}
+
+# Renderer profile, see api/negotiation.py
+#   API_PROFILE=production  -> no browsable API, cached content negotiation
+API_PROFILE = os.environ.get('API_PROFILE', 'development')
+API_BROWSABLE = API_PROFILE != 'production'
+
+REST_FRAMEWORK = {
+    # used by views that don't set renderer_classes (e.g. the router's api root)
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+    ] + (['rest_framework.renderers.BrowsableAPIRenderer'] if API_BROWSABLE else []),
+}
+if not API_BROWSABLE:
+    REST_FRAMEWORK['DEFAULT_CONTENT_NEGOTIATION_CLASS'] = 'api.negotiation.CachedContentNegotiation'
+
+# Per-phase Server-Timing header / log line, see api/server_timing.py
+SERVER_TIMING = {
+    'SAMPLE_RATE': float(os.environ.get('SERVER_TIMING_SAMPLE_RATE', 0.1)),
+    'HEADER': True,
+    'LOG': False,
+    'FORCE_HEADER': 'X-Server-Timing',
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.server_timing': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+# Per-view request counters and latency histograms, see drf_perf/metrics.py
+METRICS = {
+    'DIR': os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'model_view_set_metrics')),
+    'BUCKETS': [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+    'MAX_SERIES': 1024,
+    # who may GET /metrics besides staff users (the scraper)
+    'ALLOWED_NETWORKS': os.environ.get('METRICS_ALLOWED_NETWORKS', '127.0.0.1/32,::1/128').split(','),
+}
+
+# Opt-in profiling, switched on and off at /profiling/ (see api/profiling.py)
+PROFILING = {
+    'DIR': os.environ.get('PROFILING_DIR', os.path.join(tempfile.gettempdir(), 'model_view_set_profiles')),
+    'HEADER': 'X-Profile',
+    'INTERVAL': 0.001,
+    'MAX_FILES': 200,
+}
+
+# Slow query capture with EXPLAIN plans, see api/slow_queries.py
+SLOW_QUERIES = {
+    'THRESHOLD_MS': float(os.environ.get('SLOW_QUERY_MS', 100)),
+    'EXPLAIN': True,
+    'MAX_PENDING': 1000,
+    'STACK_DEPTH': 10,
+}
@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from api import views
+from drf_perf.metrics import metrics
+from api.profiling import profiling
 from rest_framework.routers import DefaultRouter
 
 # creating router project
@@ -11,7 +14,12 @@ router.register('studentapi', views.StudentModelViewSet, basename='student')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics),
+    path('profiling/', profiling),
     path('', include(router.urls)),
-    path('auth/', include('rest_framework.urls', namespace='rest_framework'))
 ]
 
+# login / logout pages are only used by the browsable API
+if settings.API_BROWSABLE:
+    urlpatterns.append(path('auth/', include('rest_framework.urls', namespace='rest_framework')))
+
@@ -0,0 +1,80 @@
+# Benchmark: request latency with and without connection reuse
+#
+# Needs the local Postgres from settings.py (django_connection_db) with the
+# migrations applied. Each mode runs in its own process, because the
+# connection settings are read once at startup:
+#
+#   per-request  DB_CONN_MAX_AGE=0   new TCP + auth connection for every request
+#   persistent   DB_CONN_MAX_AGE=600 one connection per worker, health checked
+#   pool         DB_POOL=1           psycopg pool checkout (needs psycopg[pool])
+#
+#   python bench_connections.py
+#   python bench_connections.py --requests 2000 --path /studentapi/1
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+MODES = {
+    'per-request': {'DB_CONN_MAX_AGE': '0'},
+    'persistent': {'DB_CONN_MAX_AGE': '600'},
+    'pool': {'DB_POOL': '1'},
+}
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def child(path, count):
+    # runs inside the per-mode process
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'postgres_connect_test.settings')
+    import django
+    django.setup()
+    from django.test import Client
+
+    client = Client(HTTP_HOST='127.0.0.1')
+    client.get(path)  # warm up imports, url resolver, first connection
+    latencies, connect_times = [], []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = client.get(path)
+        latencies.append((time.perf_counter() - start) * 1000)
+        connect_times.append(float(response['X-DB-Connect-Time']))
+    print(json.dumps({'latencies': latencies, 'connect_times': connect_times}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--path', default='/studentapi/')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.path, args.requests)
+
+    print('%d x GET %s' % (args.requests, args.path))
+    print('%-12s %10s %10s %10s %14s' % ('mode', 'p50 ms', 'p99 ms', 'mean ms', 'connect ms'))
+    for mode, env in MODES.items():
+        result = subprocess.run(
+            [sys.executable, __file__, '--child', '--requests', str(args.requests), '--path', args.path],
+            env={**os.environ, **env}, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            print('%-12s failed: %s' % (mode, result.stderr.strip().splitlines()[-1]))
+            continue
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        latencies = data['latencies']
+        print('%-12s %10.2f %10.2f %10.2f %14.3f' % (
+            mode, percentile(latencies, 50), percentile(latencies, 99),
+            statistics.mean(latencies), statistics.mean(data['connect_times']),
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -10,11 +10,16 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# the shared drf_perf package lives at the repo root
+sys.path.append(str(BASE_DIR.parent.parent))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -42,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'drf_perf.db_instrumentation.ConnectionTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,6 +93,10 @@ WSGI_APPLICATION = 'postgres_connect_test.wsgi.application'
 #     }
 # }
 
+# Connection reuse (DB_CONN_MAX_AGE, DB_POOL, DB_POOL_SIZE), see drf_perf/db_instrumentation.py
+DB_POOL = os.environ.get('DB_POOL') == '1'
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 4))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -94,7 +104,12 @@ DATABASES = {
         'USER': 'postgres',
         'PASSWORD': '123',
         'HOST': 'localhost',
-        'PORT': '5432'
+        'PORT': '5432',
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': not DB_POOL,
+        'OPTIONS': {
+            'pool': {'min_size': 1, 'max_size': DB_POOL_SIZE, 'timeout': 10},
+        } if DB_POOL else {},
     }
 }
 
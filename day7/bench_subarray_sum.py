@@ -0,0 +1,97 @@
+# Benchmark: the old nested-loop scan from my-prog.py vs subarray_sum.py
+#
+# Worst case for both: numbers in [-100, 100] and a k that no subarray sums
+# to, so everything is scanned. The old scan is only run while its estimated
+# time (n^3 growth from the last size it ran at) stays under --budget.
+#
+#   python bench_subarray_sum.py
+#   python bench_subarray_sum.py --sizes 1000,10000 --queries 20
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from subarray_sum import PrefixIndex, count, find_all, find_first, read_numbers
+
+MISSING = 10 ** 12
+
+
+def old_scan(nums, k):
+    # my-prog.py before subarray_sum.py
+    for i in range(len(nums)):
+        for j in range(i, len(nums) + 1):
+            if sum(nums[i:j]) == k:
+                return nums[i:j]
+    return None
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def check(rng):
+    # every match against a brute force over all (i, j) on small inputs
+    for _ in range(300):
+        nums = [rng.randint(-5, 5) for _ in range(rng.randint(0, 30))]
+        k = rng.randint(-8, 8)
+        expected = [(i, j) for j in range(1, len(nums) + 1) for i in range(j) if sum(nums[i:j]) == k]
+        index = PrefixIndex(nums)
+        assert list(find_all(nums, k)) == expected
+        assert sorted(index.all(k), key=lambda m: (m[1], m[0])) == expected
+        assert count(nums, k) == index.count(k) == len(expected)
+        first = find_first(nums, k)
+        assert first == index.first(k) == (expected[0] if expected else None)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1000,10000,100000,1000000,10000000')
+    parser.add_argument('--queries', type=int, default=10, help='k values for the many-queries row')
+    parser.add_argument('--budget', type=float, default=30, help='seconds allowed for one old-scan run')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    check(rng)
+    print('matches agree with brute force on 300 random inputs\n')
+
+    print('%10s %12s %10s %10s %10s %14s %14s' % ('n', 'old scan s', 'first s', 'stream s', 'index s',
+                                                  '%dx first s' % args.queries, '%dx index s' % args.queries))
+    old_at = None
+    for n in [int(s) for s in args.sizes.split(',')]:
+        nums = [rng.randint(-100, 100) for _ in range(n)]
+
+        if old_at is None or old_at[1] * (n / old_at[0]) ** 3 <= args.budget:
+            old, result = timed(old_scan, nums, MISSING)
+            assert result is None
+            old_at = (n, old)
+            old_cell = '%12.3f' % old
+        else:
+            old_cell = '%12s' % ('~%.0e' % (old_at[1] * (n / old_at[0]) ** 3))
+
+        first, result = timed(find_first, nums, MISSING)
+        assert result is None
+
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write(' '.join(map(str, nums)))
+        try:
+            with open(f.name) as numbers:
+                stream, _ = timed(find_first, read_numbers(numbers), MISSING)
+        finally:
+            os.remove(f.name)
+
+        build, index = timed(PrefixIndex, nums)
+        ks = [MISSING + q for q in range(args.queries)]
+        queries, _ = timed(lambda: [index.first(k) for k in ks])
+        rescans, _ = timed(lambda: [find_first(nums, k) for k in ks])
+
+        print('%10d %s %10.3f %10.3f %10.3f %14.3f %14.3f' % (n, old_cell, first, stream, build, rescans, queries))
+    print('\n~: estimated, not run. stream: reading the numbers from a file as well.'
+          '\nNx first: find_first per k; Nx index: one PrefixIndex (built in "index s") queried per k')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,15 @@
-k = int(input().strip())
-nums = list(map(int, input().strip().split()))
+import sys
 
-stop = False
-for i in range(len(nums)):
-    for j in range(i, len(nums)+1):
-        if sum(nums[i:j]) == k:
-            print(nums[i:j])
-            stop = True
-            break
-    if stop:
-        break
+from subarray_sum import find_first, read_numbers
+
+# was: sum(nums[i:j]) for every i, j until one equals k, O(n^3). Prefix sums
+# do it in one pass, negatives included (subarray_sum.py)
+k = int(sys.stdin.readline().strip())
+nums = []
+match = find_first((nums.append(n) or n for n in read_numbers(sys.stdin)), k)
+if match:
+    i, j = match
+    print(nums[i:j])
 
 
 # i = 0
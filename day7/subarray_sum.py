@@ -0,0 +1,159 @@
+# Contiguous subarray with sum k, in O(n)
+#
+# sum(nums[i:j]) == P[j] - P[i] with P the prefix sums (P[0] = 0), so a
+# subarray ending at j sums to k exactly when P[j] - k is an earlier prefix
+# sum. One pass with a dict of the prefix sums seen so far finds it: no
+# nested loops, no slices, and negative numbers are fine (the two pointer
+# version only works when every number is >= 0).
+#
+#   find_first(nums, k)   first subarray to end, as (i, j): nums[i:j]
+#                         (the earliest start for that end). nums can be
+#                         any iterable, e.g. read_numbers(sys.stdin); it's
+#                         read only up to the match
+#   find_all(nums, k)     every (i, j), one pass, O(n + matches)
+#   count(nums, k)        number of matches, O(n)
+#   PrefixIndex(nums)     prefix sums + positions built once, then
+#                         .first(k) / .all(k) / .count(k) for many k
+#
+# Subarrays are never empty, so k = 0 needs an actual run summing to 0.
+#
+#   python subarray_sum.py 5 < numbers.txt
+#   python subarray_sum.py 5 7 -3 --all < numbers.txt
+import argparse
+import sys
+from bisect import bisect_left
+from itertools import accumulate
+
+
+def read_numbers(f, size=1 << 16):
+    # whitespace separated ints from a file, a block at a time
+    tail = ''
+    while True:
+        block = f.read(size)
+        if not block:
+            break
+        parts = (tail + block).split()
+        # the last token may go on in the next block
+        tail = '' if block[-1].isspace() else parts.pop()
+        for part in parts:
+            yield int(part)
+    if tail:
+        yield int(tail)
+
+
+def find_first(nums, k):
+    seen = {0: 0}
+    total = 0
+    for j, n in enumerate(nums, 1):
+        total += n
+        i = seen.get(total - k)
+        if i is not None:
+            return i, j
+        seen.setdefault(total, j)
+    return None
+
+
+def find_all(nums, k):
+    positions = {0: [0]}
+    total = 0
+    for j, n in enumerate(nums, 1):
+        total += n
+        for i in positions.get(total - k, ()):
+            yield i, j
+        positions.setdefault(total, []).append(j)
+
+
+def count(nums, k):
+    seen = {0: 1}
+    total = 0
+    found = 0
+    for n in nums:
+        total += n
+        found += seen.get(total - k, 0)
+        seen[total] = seen.get(total, 0) + 1
+    return found
+
+
+class PrefixIndex:
+    def __init__(self, nums):
+        self.prefix = [0]
+        self.prefix.extend(accumulate(nums))
+        # prefix sum -> the indices where it occurs, ascending
+        self.positions = {}
+        for i, p in enumerate(self.prefix):
+            self.positions.setdefault(p, []).append(i)
+
+    def __len__(self):
+        return len(self.prefix) - 1
+
+    def first(self, k):
+        positions = self.positions
+        for j, p in enumerate(self.prefix):
+            starts = positions.get(p - k)
+            if starts is not None and starts[0] < j:
+                return starts[0], j
+        return None
+
+    def all(self, k):
+        positions = self.positions
+        for j, p in enumerate(self.prefix):
+            starts = positions.get(p - k)
+            if starts is not None:
+                for i in starts[:bisect_left(starts, j)]:
+                    yield i, j
+
+    def count(self, k):
+        positions = self.positions
+        found = 0
+        for j, p in enumerate(self.prefix):
+            starts = positions.get(p - k)
+            if starts is not None:
+                found += bisect_left(starts, j)
+        return found
+
+    def total(self, i, j):
+        return self.prefix[j] - self.prefix[i]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('k', type=int, nargs='+')
+    parser.add_argument('--all', action='store_true', help='every matching subarray, not just the first')
+    parser.add_argument('--count', action='store_true', help='only the number of matches')
+    parser.add_argument('--indexes', action='store_true', help='print i j instead of the subarray')
+    args = parser.parse_args()
+
+    def show(nums, match):
+        i, j = match
+        print('%d %d' % (i, j) if args.indexes else nums[i:j])
+
+    if len(args.k) == 1 and not args.all and not args.count:
+        # one query: stop reading at the match
+        nums = []
+        match = find_first((nums.append(n) or n for n in read_numbers(sys.stdin)), args.k[0])
+        if match:
+            show(nums, match)
+        else:
+            print('not present')
+        return
+
+    nums = list(read_numbers(sys.stdin))
+    index = PrefixIndex(nums)
+    for k in args.k:
+        if len(args.k) > 1:
+            print('k = %d' % k)
+        if args.count:
+            print(index.count(k))
+        elif args.all:
+            for match in index.all(k):
+                show(nums, match)
+        else:
+            match = index.first(k)
+            if match:
+                show(nums, match)
+            else:
+                print('not present')
+
+
+if __name__ == '__main__':
+    main()
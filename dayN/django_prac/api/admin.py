@@ -1,6 +1,11 @@
 from django.contrib import admin
+from drf_perf.export import ExportCsvMixin
+from drf_perf.large_table import LargeTableAdminMixin
 from .models import Student
 # Register your models here.
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
-    list_display = ['id', 'name', 'roll', 'city']
\ No newline at end of file
+class StudentAdmin(LargeTableAdminMixin, ExportCsvMixin, admin.ModelAdmin):
+    list_display = ['id', 'name', 'roll', 'city']
+    # both indexed, see models.py
+    prefix_search_fields = ['name']
+    exact_search_fields = ['roll']
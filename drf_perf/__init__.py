@@ -0,0 +1,4 @@
+# Helpers shared by the projects in this repo (admin for big tables, csv
+# export, metrics, db connection timing, msgpack/cbor renderers). Each
+# project's settings.py puts the repo root on sys.path; add 'drf_perf' to
+# INSTALLED_APPS where its templates are needed.
@@ -0,0 +1,80 @@
+# Database connection reuse, and what it costs each request
+#
+# The PostgreSQL projects (model_view_set, postgres_connect_test, token1,
+# token2, custom_auth) read these from the environment in settings.py:
+#
+#   DB_CONN_MAX_AGE  seconds a connection stays open and is reused by the
+#                    following requests of the same worker thread (default
+#                    600); CONN_HEALTH_CHECKS replaces it if the server
+#                    dropped it in between. 0 gives back Django's
+#                    connect-per-request behaviour.
+#   DB_POOL=1        psycopg's in-process pool instead (needs psycopg[pool]),
+#   DB_POOL_SIZE     connections per worker process (default 4). Django
+#                    can't do both at once, so CONN_MAX_AGE is 0 then.
+#
+# ConnectionTimingMiddleware below shows what the choice costs per request.
+import contextvars
+import logging
+import time
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# {'connect_ms': float, 'new': int} for the current request, None outside one
+current = contextvars.ContextVar('db_connect_timing', default=None)
+
+
+def timed(method, new=False):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            state = current.get()
+            if state is not None:
+                state['connect_ms'] += (time.perf_counter() - start) * 1000
+                state['new'] += new
+    return wrapper
+
+
+def instrument(connection):
+    # once per connection object (one per alias per thread). Wraps the two
+    # steps Django runs before the first query that needs a connection, so
+    # only requests that actually use the database pay for one
+    if not getattr(connection, 'connect_timed', False):
+        connection.connect = timed(connection.connect, new=True)
+        connection.close_if_health_check_failed = timed(connection.close_if_health_check_failed)
+        connection.connect_timed = True
+
+
+# Measures how long each request waits for its database connections: a fresh
+# TCP + auth handshake (CONN_MAX_AGE = 0), a health check on a persistent
+# connection (CONN_HEALTH_CHECKS) or a pool checkout (OPTIONS['pool']). Only
+# what the request's own queries trigger is counted; a request that doesn't
+# query doesn't connect. Reported in the X-DB-Connect-Time header (ms) when
+# DEBUG is on or the user is staff, since it says something about the
+# database setup.
+class ConnectionTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        for alias in connections:
+            instrument(connections[alias])
+        state = {'connect_ms': 0.0, 'new': 0}
+        token = current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+
+        connect_ms = state['connect_ms']
+        # picked up by ServerTimingMiddleware as the "connect" phase
+        request.db_connect_ms = connect_ms
+        user = getattr(request, 'user', None)
+        if settings.DEBUG or (user is not None and user.is_staff):
+            response['X-DB-Connect-Time'] = '%.3f' % connect_ms
+        logger.debug('%s %s db connect %.3f ms (%d new)', request.method, request.path,
+                     connect_ms, state['new'])
+        return response
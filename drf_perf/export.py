@@ -0,0 +1,124 @@
+# CSV export for the admin, streamed
+#
+#   - "Export selected as CSV" action; with "Select all N students" it gets
+#     the whole filtered changelist
+#   - admin/api/student/export/?<changelist query string>: everything the
+#     changelist shows with its search / filters (the "Export CSV" button)
+#
+# Rows are read with values_list().iterator(chunk_size=...), which is a
+# server-side cursor on PostgreSQL and fetchmany() elsewhere, and written
+# out a chunk of CSV at a time by a StreamingHttpResponse. No model
+# instances, no list of rows, no buffered body: memory stays flat and the
+# first bytes go out right away, so a million rows don't hold the worker
+# until some proxy timeout.
+#
+#   class StudentAdmin(LargeTableAdminMixin, ExportCsvMixin, admin.ModelAdmin):
+#
+# (after LargeTableAdminMixin, so the keyset cursor is already out of the
+# query string the export link copies)
+import csv
+import io
+
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ERROR_FLAG
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseRedirect, StreamingHttpResponse
+from django.urls import path, reverse
+from django.utils import timezone
+
+CHUNK_SIZE = 2000
+
+
+def safe(value):
+    # =, +, - and @ at the start of a cell run as formulas in Excel
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+
+def csv_chunks(queryset, fields, chunk_size=CHUNK_SIZE):
+    # one piece of body per chunk_size rows: a yield per row would be a
+    # write() per row on the socket
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for i, row in enumerate(queryset.values_list(*fields).iterator(chunk_size=chunk_size), 1):
+        writer.writerow([safe(value) for value in row])
+        if i % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_csv(queryset, fields, name, chunk_size=CHUNK_SIZE):
+    response = StreamingHttpResponse(csv_chunks(queryset, fields, chunk_size), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="%s-%s.csv"' % (
+        name, timezone.now().strftime('%Y%m%d-%H%M%S'))
+    return response
+
+
+class ExportChangeList:
+    # mixed in front of the admin's changelist class: it still applies the
+    # search / filters / ordering, but skips get_results(), whose page and
+    # count queries an export doesn't need
+    def get_results(self, request):
+        pass
+
+
+class ExportCsvMixin:
+    export_csv_fields = None  # default: the concrete fields in list_display
+    export_chunk_size = CHUNK_SIZE
+    actions = ['export_csv']
+
+    def get_export_csv_fields(self, request):
+        if self.export_csv_fields:
+            return list(self.export_csv_fields)
+        names = {f.name for f in self.model._meta.concrete_fields} | {'pk'}
+        return [name for name in self.get_list_display(request) if name in names]
+
+    def export(self, request, queryset):
+        # pk order walks the primary key index instead of sorting the result
+        return stream_csv(queryset.order_by('pk'), self.get_export_csv_fields(request),
+                          self.model._meta.verbose_name_plural.replace(' ', '_'), self.export_chunk_size)
+
+    @admin.action(description='Export selected as CSV', permissions=['view'])
+    def export_csv(self, request, queryset):
+        return self.export(request, queryset)
+
+    def get_export_queryset(self, request):
+        # the rows the changelist would show for the same query string
+        changelist_class = self.get_changelist(request)
+        changelist_class = type('Export' + changelist_class.__name__, (ExportChangeList, changelist_class), {})
+        list_display = self.get_list_display(request)
+        changelist = changelist_class(
+            request, self.model, list_display, self.get_list_display_links(request, list_display),
+            self.get_list_filter(request), self.date_hierarchy, self.get_search_fields(request),
+            self.get_list_select_related(request), self.list_per_page, self.list_max_show_all,
+            self.list_editable, self, self.get_sortable_by(request), self.search_help_text)
+        return changelist.queryset
+
+    def export_view(self, request):
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+        try:
+            queryset = self.get_export_queryset(request)
+        except IncorrectLookupParameters:
+            # bad filter in the query string: back to the changelist, the
+            # way changelist_view handles it
+            info = self.model._meta.app_label, self.model._meta.model_name
+            return HttpResponseRedirect('%s?%s=1' % (
+                reverse('admin:%s_%s_changelist' % info, current_app=self.admin_site.name), ERROR_FLAG))
+        return self.export(request, queryset)
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        urls = [path('export/', self.admin_site.admin_view(self.export_view), name='%s_%s_export' % info)]
+        return urls + super().get_urls()
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = dict(extra_context or {})
+        query = request.GET.urlencode()
+        extra_context['export_csv_url'] = 'export/' + ('?' + query if query else '')
+        return super().changelist_view(request, extra_context)
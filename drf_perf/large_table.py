@@ -0,0 +1,179 @@
+# Admin changelist for tables with millions of rows
+#
+# What the default changelist does on a big table, and what this does instead:
+#   - COUNT(*) of the filtered rows for the paginator
+#       -> the planner's row estimate when nothing is filtered (pg_class /
+#          information_schema / rowid range on SQLite), a count that stops
+#          at COUNT_CAP when something is
+#   - a second COUNT(*) of the whole table for "N results (M total)"
+#       -> show_full_result_count = False
+#   - OFFSET pagination, which reads and throws away every row before the
+#     page (page 10000 = 1M rows read)
+#       -> keyset pages: "older" / "newer" links carry the last / first pk
+#          seen and the next page is WHERE pk < x ORDER BY pk DESC LIMIT n,
+#          an index range scan whatever the depth. Sorting by a column
+#          header falls back to the normal pages (still estimated counts).
+#   - search: icontains on every search field, a full table scan
+#       -> startswith on prefix_search_fields (LIKE 'ab%'); numbers match
+#          exact_search_fields and the pk. On PostgreSQL db_index=True on a
+#          CharField also creates a varchar_pattern_ops index (the "_like"
+#          one), which answers LIKE 'ab%' whatever the collation; a plain
+#          btree index only does under the C collation. Case-sensitive on
+#          PostgreSQL, not on SQLite / MySQL.
+#   - "Select all N" in the actions bar with N the estimated or capped count
+#       -> left out unless the count is exact; the actions still work on
+#          the ticked rows
+#
+# Add 'drf_perf' to INSTALLED_APPS for the templates.
+#
+#   @admin.register(Student)
+#   class StudentAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+#       prefix_search_fields = ['name']   # db_index=True
+#       exact_search_fields = ['roll']    # db_index=True
+from django.contrib.admin.options import ShowFacets
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+AFTER_VAR = 'after'
+BEFORE_VAR = 'before'
+
+# below this the estimate is replaced with an exact count, which is cheap
+EXACT_BELOW = 10000
+# filtered counts stop here
+COUNT_CAP = 10000
+
+
+def estimate_rows(model, using='default'):
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                           [connection.ops.quote_name(table)])
+        elif connection.vendor == 'mysql':
+            cursor.execute('SELECT table_rows FROM information_schema.tables '
+                           'WHERE table_schema = DATABASE() AND table_name = %s', [table])
+        elif connection.vendor == 'sqlite':
+            # both ends of the rowid b-tree; too high by the number of
+            # deleted rows, never too low
+            table = connection.ops.quote_name(table)
+            cursor.execute('SELECT (SELECT MAX(rowid) FROM %s) - (SELECT MIN(rowid) FROM %s) + 1' % (table, table))
+        else:
+            return None
+        row = cursor.fetchone()
+    # reltuples is -1 before the first ANALYZE, NULL on an empty sqlite table
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    # False once count turns out to be an estimate or hit COUNT_CAP
+    count_exact = True
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate >= EXACT_BELOW:
+                self.count_exact = False
+                return estimate
+        count = queryset.order_by()[:COUNT_CAP].count()
+        self.count_exact = count < COUNT_CAP
+        return count
+
+
+class KeysetChangeList(ChangeList):
+    def __init__(self, request, *args, **kwargs):
+        self.keyset_after, self.keyset_before = getattr(request, 'keyset', (None, None))
+        super().__init__(request, *args, **kwargs)
+
+    @property
+    def keyset(self):
+        # only the default newest-first order can be paged by pk
+        return ORDER_VAR not in self.params and not self.show_all
+
+    def get_ordering(self, request, queryset):
+        if ORDER_VAR in self.params:
+            return super().get_ordering(request, queryset)
+        return ['-pk']
+
+    def get_results(self, request):
+        if not self.keyset:
+            return super().get_results(request)
+
+        per_page = self.list_per_page
+        queryset = self.queryset
+        if self.keyset_before is not None:
+            rows = list(queryset.filter(pk__gt=self.keyset_before).reverse()[:per_page + 1])
+            has_newer = len(rows) > per_page
+            rows = rows[:per_page][::-1]
+            has_older = True
+        else:
+            if self.keyset_after is not None:
+                queryset = queryset.filter(pk__lt=self.keyset_after)
+            rows = list(queryset[:per_page + 1])
+            has_older = len(rows) > per_page
+            rows = rows[:per_page]
+            has_newer = self.keyset_after is not None
+
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, per_page)
+        self.result_count = self.paginator.count
+        self.show_full_result_count = False
+        self.full_result_count = None
+        self.show_admin_actions = True
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = has_older or has_newer
+        self.newer_url = self.get_query_string({BEFORE_VAR: rows[0].pk}, [PAGE_VAR, AFTER_VAR]) \
+            if has_newer and rows else None
+        self.older_url = self.get_query_string({AFTER_VAR: rows[-1].pk}, [PAGE_VAR, BEFORE_VAR]) \
+            if has_older and rows else None
+        self.first_url = self.get_query_string(remove=[PAGE_VAR, AFTER_VAR, BEFORE_VAR]) \
+            if has_newer else None
+
+
+class LargeTableAdminMixin:
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # facet counts are a COUNT per filter choice
+    show_facets = ShowFacets.NEVER
+    change_list_template = 'admin/large_table_change_list.html'
+    prefix_search_fields = []
+    exact_search_fields = []
+    search_help_text = 'Starts with, or an exact number.'
+
+    def get_search_fields(self, request):
+        # anything non-empty turns the search box on; the lookups are below
+        return list(self.prefix_search_fields) + list(self.exact_search_fields) or super().get_search_fields(request)
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        q = Q()
+        for field in self.prefix_search_fields:
+            q |= Q(**{'%s__startswith' % field: term})
+        if term.isdigit():
+            q |= Q(pk=int(term))
+            for field in self.exact_search_fields:
+                q |= Q(**{field: int(term)})
+        return queryset.filter(q), False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def changelist_view(self, request, extra_context=None):
+        # the keyset cursor isn't a field lookup, so take it out of GET
+        # before the changelist validates the query string
+        request.GET = request.GET.copy()
+        cursor = []
+        for name in (AFTER_VAR, BEFORE_VAR):
+            value = request.GET.pop(name, [None])[-1]
+            cursor.append(int(value) if value and value.isdigit() else None)
+        request.keyset = tuple(cursor)
+        return super().changelist_view(request, extra_context)
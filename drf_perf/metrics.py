@@ -0,0 +1,357 @@
+# Request metrics shared by all worker processes
+#
+# MetricsMiddleware counts every request per (view, status) and puts its
+# duration in a fixed-bucket histogram. Each process writes only to its own
+# mmap'd file, METRICS['DIR']/metrics-<pid>-<random>.db, so recording is a
+# dict lookup and a few struct writes under a thread lock, with no
+# cross-process locking. GET /metrics reads every file in the directory,
+# adds them up and returns the Prometheus text format:
+#
+#   http_requests_total{view="StudentModelViewSet-list",status="200"} 42
+#   http_request_duration_seconds_bucket{view="...",status="200",le="0.005"} 30
+#   ...
+#
+# View names: ViewSet class + action, APIView / View class name, function
+# name for plain and @api_view views.
+#
+# The counts of exited workers must not go away (counters must not go
+# down), but their files shouldn't pile up either: when a worker opens its
+# file it adds up the files of workers that are no longer running into
+# metrics-aggregate.db and deletes them. That happens under an exclusive
+# flock on DIR/.lock, and /metrics reads under a shared one, so a scrape
+# never counts a file twice or misses one. The random part of the name keeps
+# a new worker that got a dead worker's pid from overwriting its file.
+#
+# /metrics is meant for the Prometheus scraper on the internal network: it
+# answers requests from ALLOWED_NETWORKS and staff users, 403 otherwise.
+# Behind a reverse proxy REMOTE_ADDR is the proxy, so don't route /metrics
+# through a public one. A malformed ALLOWED_NETWORKS entry stops the server
+# from starting (ImproperlyConfigured) instead of failing every scrape.
+#
+# METRICS = {
+#     'DIR': '/tmp/model_view_set_metrics',
+#     'BUCKETS': [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+#     'MAX_SERIES': 1024,     # (view, status) pairs per process
+#     'ALLOWED_NETWORKS': ['127.0.0.1/32', '::1/128', '10.0.0.0/8'],
+# }
+import fcntl
+import functools
+import glob
+import ipaddress
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse, HttpResponseForbidden
+
+DEFAULTS = {
+    'DIR': os.path.join(tempfile.gettempdir(), 'django_metrics'),
+    'BUCKETS': [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+    'MAX_SERIES': 1024,
+    'ALLOWED_NETWORKS': ['127.0.0.1/32', '::1/128'],
+}
+
+MAGIC = b'STUMET01'
+# magic, number of buckets, capacity, series in use, series dropped (file full)
+HEADER = struct.Struct('<8sIIII')
+HEADER_SIZE = 64
+NAME_SIZE = 96
+AGGREGATE = 'metrics-aggregate.db'
+WORKER_FILE = re.compile(r'metrics-(\d+)-[0-9a-f]+\.db$')
+
+
+def get_setting(name):
+    return getattr(settings, 'METRICS', {}).get(name, DEFAULTS[name])
+
+
+def slot_struct(nbuckets):
+    # view name, status, count, sum of seconds, one counter per bucket + the
+    # +Inf bucket (not cumulative, summed up when exported)
+    return struct.Struct('<%dsH6xQd%dQ' % (NAME_SIZE, nbuckets + 1))
+
+
+class MetricsFile:
+    def __init__(self, path, buckets, capacity):
+        self.buckets = list(buckets)
+        self.capacity = capacity
+        self.slot = slot_struct(len(self.buckets))
+        self.slots_offset = HEADER_SIZE + 8 * len(self.buckets)
+        size = self.slots_offset + self.slot.size * capacity
+
+        # O_EXCL: never reuse (and zero) another process's file
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            self.mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        struct.pack_into('<%dd' % len(self.buckets), self.mm, HEADER_SIZE, *self.buckets)
+        self.index = {}
+        self.dropped = 0
+        self.write_header()
+        self.lock = threading.Lock()
+
+    def write_header(self):
+        HEADER.pack_into(self.mm, 0, MAGIC, len(self.buckets), self.capacity, len(self.index), self.dropped)
+
+    def observe(self, view, status, seconds):
+        key = (view, status)
+        with self.lock:
+            i = self.index.get(key)
+            if i is None:
+                if len(self.index) >= self.capacity:
+                    self.dropped += 1
+                    self.write_header()
+                    return
+                i = self.index[key] = len(self.index)
+                offset = self.slots_offset + i * self.slot.size
+                self.slot.pack_into(self.mm, offset, view.encode('utf-8')[:NAME_SIZE], status,
+                                    0, 0.0, *[0] * (len(self.buckets) + 1))
+                # the series only becomes visible to readers once it is written
+                self.write_header()
+
+            offset = self.slots_offset + i * self.slot.size
+            values = list(self.slot.unpack_from(self.mm, offset))
+            values[2] += 1
+            values[3] += seconds
+            bucket = len(self.buckets)
+            for b, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    bucket = b
+                    break
+            values[4 + bucket] += 1
+            self.slot.pack_into(self.mm, offset, *values)
+
+
+def read_file(path):
+    # -> {(view, status): [count, sum, bucket counts...]}, bucket bounds
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER_SIZE:
+        return {}, None
+    magic, nbuckets, capacity, used, dropped = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        return {}, None
+    buckets = list(struct.unpack_from('<%dd' % nbuckets, data, HEADER_SIZE))
+    slot = slot_struct(nbuckets)
+    offset = HEADER_SIZE + 8 * nbuckets
+    series = {}
+    for i in range(min(used, capacity)):
+        name, status, *values = slot.unpack_from(data, offset + i * slot.size)
+        series[(name.rstrip(b'\0').decode('utf-8', 'replace'), status)] = values
+    return series, buckets
+
+
+def write_file(path, series, buckets):
+    # same layout as a worker's file, sized for exactly these series
+    slot = slot_struct(len(buckets))
+    data = bytearray(HEADER_SIZE + 8 * len(buckets) + slot.size * len(series))
+    HEADER.pack_into(data, 0, MAGIC, len(buckets), len(series), len(series), 0)
+    struct.pack_into('<%dd' % len(buckets), data, HEADER_SIZE, *buckets)
+    offset = HEADER_SIZE + 8 * len(buckets)
+    for i, ((view, status), values) in enumerate(sorted(series.items())):
+        slot.pack_into(data, offset + i * slot.size, view.encode('utf-8')[:NAME_SIZE], status, *values)
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def add_up(merged, series):
+    for key, values in series.items():
+        total = merged.get(key)
+        if total is None:
+            merged[key] = list(values)
+        else:
+            for n, v in enumerate(values):
+                total[n] += v
+
+
+@contextmanager
+def dir_lock(directory, mode):
+    fd = os.open(os.path.join(directory, '.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, mode)
+        yield
+    finally:
+        os.close(fd)
+
+
+def running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge_dead(directory, buckets):
+    # fold the files of workers that have exited into the aggregate file
+    dead = []
+    for path in glob.glob(os.path.join(directory, 'metrics-*.db')):
+        match = WORKER_FILE.search(os.path.basename(path))
+        if match and not running(int(match.group(1))):
+            dead.append(path)
+    if not dead:
+        return
+    aggregate = os.path.join(directory, AGGREGATE)
+    merged = {}
+    for path in [aggregate] + dead:
+        try:
+            series, file_buckets = read_file(path)
+        except OSError:
+            continue
+        # files with another bucket layout aren't exported anyway
+        if file_buckets == buckets:
+            add_up(merged, series)
+    write_file(aggregate, merged, buckets)
+    for path in dead:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def collect(directory=None):
+    # sum of all worker files that use the current bucket layout
+    directory = directory or get_setting('DIR')
+    buckets = [float(b) for b in get_setting('BUCKETS')]
+    merged = {}
+    if not os.path.isdir(directory):
+        return merged, buckets
+    with dir_lock(directory, fcntl.LOCK_SH):
+        for path in glob.glob(os.path.join(directory, 'metrics-*.db')):
+            try:
+                series, file_buckets = read_file(path)
+            except OSError:
+                continue
+            if file_buckets == buckets:
+                add_up(merged, series)
+    return merged, buckets
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_text(merged, buckets):
+    lines = [
+        '# HELP http_requests_total Requests handled, by view and status.',
+        '# TYPE http_requests_total counter',
+    ]
+    keys = sorted(merged)
+    for view, status in keys:
+        lines.append('http_requests_total{view="%s",status="%d"} %d' % (escape(view), status, merged[(view, status)][0]))
+
+    lines += [
+        '# HELP http_request_duration_seconds Request duration, by view and status.',
+        '# TYPE http_request_duration_seconds histogram',
+    ]
+    for view, status in keys:
+        count, total, *counts = merged[(view, status)]
+        labels = 'view="%s",status="%d"' % (escape(view), status)
+        cumulative = 0
+        for bound, n in zip(buckets + ['+Inf'], counts):
+            cumulative += n
+            lines.append('http_request_duration_seconds_bucket{%s,le="%s"} %d' % (labels, bound, cumulative))
+        lines.append('http_request_duration_seconds_sum{%s} %r' % (labels, total))
+        lines.append('http_request_duration_seconds_count{%s} %d' % (labels, count))
+    return '\n'.join(lines) + '\n'
+
+
+_file = None
+_file_pid = None
+_file_lock = threading.Lock()
+
+
+def get_file():
+    # one file per process; a worker forked from a process that already had
+    # one opens its own
+    global _file, _file_pid
+    pid = os.getpid()
+    if _file_pid != pid:
+        with _file_lock:
+            if _file_pid != pid:
+                directory = get_setting('DIR')
+                buckets = [float(b) for b in get_setting('BUCKETS')]
+                os.makedirs(directory, exist_ok=True)
+                name = 'metrics-%d-%s.db' % (pid, uuid.uuid4().hex[:12])
+                with dir_lock(directory, fcntl.LOCK_EX):
+                    merge_dead(directory, buckets)
+                    _file = MetricsFile(os.path.join(directory, name), buckets, get_setting('MAX_SERIES'))
+                _file_pid = pid
+    return _file
+
+
+def view_name(request):
+    match = request.resolver_match
+    if match is None:
+        return 'unresolved'
+    func = match.func
+    cls = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    name = cls.__name__ if cls is not None else getattr(func, '__name__', match.view_name or 'unknown')
+    actions = getattr(func, 'actions', None)
+    if actions:
+        name = '%s-%s' % (name, actions.get(request.method.lower(), request.method.lower()))
+    return name
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        get_file().observe(view_name(request), response.status_code, time.perf_counter() - start)
+        return response
+
+
+@functools.lru_cache(maxsize=8)
+def parse_networks(entries):
+    networks = []
+    for entry in entries:
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(entry))
+        except ValueError as exc:
+            raise ImproperlyConfigured("METRICS['ALLOWED_NETWORKS']: %s" % exc)
+    return networks
+
+
+def allowed_networks():
+    return parse_networks(tuple(get_setting('ALLOWED_NETWORKS')))
+
+
+def allowed(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_staff:
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in network for network in allowed_networks())
+
+
+def metrics(request):
+    if not allowed(request):
+        return HttpResponseForbidden('metrics are internal\n', content_type='text/plain')
+    merged, buckets = collect()
+    return HttpResponse(render_text(merged, buckets), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# at import (urls.py), so a bad entry fails at startup
+allowed_networks()
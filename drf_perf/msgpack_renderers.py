@@ -0,0 +1,262 @@
+# Binary formats for service-to-service callers
+#
+#   Accept / Content-Type: application/msgpack   (?format=msgpack)
+#   Accept / Content-Type: application/cbor      (?format=cbor)
+#
+# MessagePack uses the `msgpack` package when it is installed and falls back
+# to the small pure-Python codec below otherwise (same wire format, slower).
+# CBOR needs the `cbor2` package; CBOR_AVAILABLE tells the views whether to
+# offer it.
+import datetime
+import decimal
+import struct
+import uuid
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+CBOR_AVAILABLE = cbor2 is not None
+
+
+def encode_default(obj):
+    # types serializers can return that neither format knows about
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    raise TypeError('Cannot serialize %r' % type(obj))
+
+
+# pure-Python MessagePack (only the types JSON can hold, plus bytes)
+
+def _pack(obj, out):
+    if obj is None:
+        out.append(b'\xc0')
+    elif obj is True:
+        out.append(b'\xc3')
+    elif obj is False:
+        out.append(b'\xc2')
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            out.append(struct.pack('B', obj))
+        elif -32 <= obj < 0:
+            out.append(struct.pack('b', obj))
+        elif 0 <= obj <= 0xff:
+            out.append(struct.pack('>BB', 0xcc, obj))
+        elif 0 <= obj <= 0xffff:
+            out.append(struct.pack('>BH', 0xcd, obj))
+        elif 0 <= obj <= 0xffffffff:
+            out.append(struct.pack('>BI', 0xce, obj))
+        elif 0 <= obj <= 0xffffffffffffffff:
+            out.append(struct.pack('>BQ', 0xcf, obj))
+        elif -0x80 <= obj < 0:
+            out.append(struct.pack('>Bb', 0xd0, obj))
+        elif -0x8000 <= obj < 0:
+            out.append(struct.pack('>Bh', 0xd1, obj))
+        elif -0x80000000 <= obj < 0:
+            out.append(struct.pack('>Bi', 0xd2, obj))
+        elif -0x8000000000000000 <= obj < 0:
+            out.append(struct.pack('>Bq', 0xd3, obj))
+        else:
+            raise OverflowError('Integer out of MessagePack range')
+    elif isinstance(obj, float):
+        out.append(struct.pack('>Bd', 0xcb, obj))
+    elif isinstance(obj, str):
+        data = obj.encode('utf-8')
+        n = len(data)
+        if n < 32:
+            out.append(struct.pack('B', 0xa0 | n))
+        elif n <= 0xff:
+            out.append(struct.pack('>BB', 0xd9, n))
+        elif n <= 0xffff:
+            out.append(struct.pack('>BH', 0xda, n))
+        else:
+            out.append(struct.pack('>BI', 0xdb, n))
+        out.append(data)
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        data = bytes(obj)
+        n = len(data)
+        if n <= 0xff:
+            out.append(struct.pack('>BB', 0xc4, n))
+        elif n <= 0xffff:
+            out.append(struct.pack('>BH', 0xc5, n))
+        else:
+            out.append(struct.pack('>BI', 0xc6, n))
+        out.append(data)
+    elif isinstance(obj, (list, tuple)):
+        n = len(obj)
+        if n < 16:
+            out.append(struct.pack('B', 0x90 | n))
+        elif n <= 0xffff:
+            out.append(struct.pack('>BH', 0xdc, n))
+        else:
+            out.append(struct.pack('>BI', 0xdd, n))
+        for item in obj:
+            _pack(item, out)
+    elif isinstance(obj, dict):
+        n = len(obj)
+        if n < 16:
+            out.append(struct.pack('B', 0x80 | n))
+        elif n <= 0xffff:
+            out.append(struct.pack('>BH', 0xde, n))
+        else:
+            out.append(struct.pack('>BI', 0xdf, n))
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    else:
+        _pack(encode_default(obj), out)
+
+
+def packb(obj):
+    out = []
+    _pack(obj, out)
+    return b''.join(out)
+
+
+# type byte -> (struct format, size) for fixed-width scalars
+_SCALARS = {
+    0xca: ('>f', 4), 0xcb: ('>d', 8),
+    0xcc: ('>B', 1), 0xcd: ('>H', 2), 0xce: ('>I', 4), 0xcf: ('>Q', 8),
+    0xd0: ('>b', 1), 0xd1: ('>h', 2), 0xd2: ('>i', 4), 0xd3: ('>q', 8),
+}
+# type byte -> struct format of the length prefix
+_STR = {0xd9: '>B', 0xda: '>H', 0xdb: '>I'}
+_BIN = {0xc4: '>B', 0xc5: '>H', 0xc6: '>I'}
+_ARRAY = {0xdc: '>H', 0xdd: '>I'}
+_MAP = {0xde: '>H', 0xdf: '>I'}
+
+
+def _unpack(data, pos):
+    b = data[pos]
+    pos += 1
+    if b <= 0x7f:
+        return b, pos
+    if b >= 0xe0:
+        return b - 0x100, pos
+    if 0xa0 <= b <= 0xbf:
+        n = b & 0x1f
+        return data[pos:pos + n].decode('utf-8'), pos + n
+    if 0x90 <= b <= 0x9f:
+        return _unpack_array(data, pos, b & 0x0f)
+    if 0x80 <= b <= 0x8f:
+        return _unpack_map(data, pos, b & 0x0f)
+    if b == 0xc0:
+        return None, pos
+    if b == 0xc2:
+        return False, pos
+    if b == 0xc3:
+        return True, pos
+    if b in _SCALARS:
+        fmt, size = _SCALARS[b]
+        return struct.unpack_from(fmt, data, pos)[0], pos + size
+    for table, kind in ((_STR, 'str'), (_BIN, 'bin'), (_ARRAY, 'array'), (_MAP, 'map')):
+        if b in table:
+            fmt = table[b]
+            n = struct.unpack_from(fmt, data, pos)[0]
+            pos += struct.calcsize(fmt)
+            if kind == 'str':
+                return data[pos:pos + n].decode('utf-8'), pos + n
+            if kind == 'bin':
+                return bytes(data[pos:pos + n]), pos + n
+            if kind == 'array':
+                return _unpack_array(data, pos, n)
+            return _unpack_map(data, pos, n)
+    raise ValueError('Unsupported MessagePack type 0x%02x' % b)
+
+
+def _unpack_array(data, pos, n):
+    items = []
+    for _ in range(n):
+        item, pos = _unpack(data, pos)
+        items.append(item)
+    return items, pos
+
+
+def _unpack_map(data, pos, n):
+    result = {}
+    for _ in range(n):
+        key, pos = _unpack(data, pos)
+        value, pos = _unpack(data, pos)
+        result[key] = value
+    return result, pos
+
+
+def unpackb(data):
+    try:
+        obj, pos = _unpack(data, 0)
+    except (IndexError, struct.error, UnicodeDecodeError) as e:
+        raise ValueError('Truncated or invalid MessagePack data: %s' % e)
+    if pos != len(data):
+        raise ValueError('Extra data after MessagePack object')
+    return obj
+
+
+if msgpack is not None:
+    def dumps(data):
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+    def loads(data):
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+else:
+    dumps, loads = packb, unpackb
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return dumps(data)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return loads(stream.read())
+        except Exception as exc:
+            raise ParseError('MessagePack parse error - %s' % exc)
+
+
+class CBORRenderer(BaseRenderer):
+    media_type = 'application/cbor'
+    format = 'cbor'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return cbor2.dumps(data, default=lambda encoder, obj: encoder.encode(encode_default(obj)))
+
+
+class CBORParser(BaseParser):
+    media_type = 'application/cbor'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return cbor2.loads(stream.read())
+        except Exception as exc:
+            raise ParseError('CBOR parse error - %s' % exc)
+
+
+# what the Student views register
+BINARY_RENDERERS = [MessagePackRenderer] + ([CBORRenderer] if CBOR_AVAILABLE else [])
+BINARY_PARSERS = [MessagePackParser] + ([CBORParser] if CBOR_AVAILABLE else [])
@@ -0,0 +1,172 @@
+# Serializer throughput benchmark
+#
+# The serializer shapes used across the notes, on the same data:
+#   plain        day12 StudentSerializer(serializers.Serializer)
+#   model        day2N StudentSerializer(ModelSerializer), fields="__all__"
+#   hyperlinked  BookSerializer(HyperlinkedModelSerializer) from
+#                hyperlinked_model_serializer.ipynb
+#   nested       SingerSerializer with SongSerializer(many=True) from
+#                nested_serializer.ipynb (3 songs per singer)
+#
+# For every shape and row count it measures
+#   serialize    Serializer(objects, many=True).data, objects already fetched
+#   deserialize  Serializer(data=rows, many=True).is_valid()
+# as rows/s (best of --repeat) and the peak memory of one run (tracemalloc,
+# separate run so it doesn't slow the timed ones).
+#
+# Runs on its own in-memory SQLite database, no project settings needed:
+#
+#   python -m serializer_bench
+#   python -m serializer_bench --rows 1000 --shapes plain,model
+#   python -m serializer_bench --save baseline.json
+#   python -m serializer_bench --compare baseline.json --tolerance 0.2
+#
+# --compare exits with status 1 when any rows/s dropped, or peak memory grew,
+# by more than the tolerance. Baselines are only comparable on the same
+# machine and python / django / DRF versions.
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+
+SHAPES = ['plain', 'model', 'hyperlinked', 'nested']
+
+
+def setup_django():
+    settings.configure(
+        DEBUG=False,
+        SECRET_KEY='serializer-bench',
+        ALLOWED_HOSTS=['testserver'],
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+        INSTALLED_APPS=['django.contrib.contenttypes', 'django.contrib.auth', 'rest_framework', 'serializer_bench'],
+        ROOT_URLCONF='serializer_bench.urls',
+        DEFAULT_AUTO_FIELD='django.db.models.BigAutoField',
+        USE_TZ=True,
+    )
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', run_syncdb=True, verbosity=0)
+
+
+def build(shape, rows):
+    # -> (serializer class, fetched objects, input rows, context)
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from . import models, serializers
+
+    for model in (models.Student, models.Book, models.Author, models.Song, models.Singer):
+        model.objects.all().delete()
+    context = {'request': Request(APIRequestFactory().get('/'))}
+
+    if shape in ('plain', 'model'):
+        models.Student.objects.bulk_create(
+            models.Student(name='student %d' % i, roll=1000 + i, city='karachi') for i in range(rows))
+        data = [{'name': 'student %d' % i, 'roll': 1000 + i, 'city': 'karachi'} for i in range(rows)]
+        serializer = serializers.StudentSerializer if shape == 'plain' else serializers.StudentModelSerializer
+        return serializer, list(models.Student.objects.all()), data, context
+
+    if shape == 'hyperlinked':
+        authors = models.Author.objects.bulk_create(
+            models.Author(name='author %d' % i) for i in range(max(rows // 10, 1)))
+        models.Book.objects.bulk_create(
+            models.Book(title='book %d' % i, author=authors[i % len(authors)]) for i in range(rows))
+        data = [{'title': 'book %d' % i, 'author': 'http://testserver/authors/%d/' % authors[i % len(authors)].pk}
+                for i in range(rows)]
+        return serializers.BookSerializer, list(models.Book.objects.all()), data, context
+
+    singers = models.Singer.objects.bulk_create(
+        models.Singer(name='singer %d' % i, gender='female' if i % 2 else 'male') for i in range(rows))
+    models.Song.objects.bulk_create(
+        models.Song(title='song %d.%d' % (i, n), duration=3.5, singer=singer)
+        for i, singer in enumerate(singers) for n in range(3))
+    data = [{'name': 'singer %d' % i, 'gender': 'male'} for i in range(rows)]
+    objects = list(models.Singer.objects.prefetch_related('songs'))
+    return serializers.SingerSerializer, objects, data, context
+
+
+def serialize(serializer, objects, data, context):
+    return serializer(objects, many=True, context=context).data
+
+
+def deserialize(serializer, objects, data, context):
+    s = serializer(data=data, many=True, context=context)
+    if not s.is_valid():
+        raise SystemExit('%s: validation failed: %s' % (serializer.__name__, s.errors[:1]))
+    return s.validated_data
+
+
+def measure(func, args, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for key, r in results.items():
+        b = baseline.get(key)
+        if b is None:
+            continue
+        if r['rows_per_s'] < b['rows_per_s'] * (1 - tolerance):
+            regressions.append('%s: %.0f rows/s, baseline %.0f' % (key, r['rows_per_s'], b['rows_per_s']))
+        if r['peak_kib'] > b['peak_kib'] * (1 + tolerance):
+            regressions.append('%s: peak %.0f KiB, baseline %.0f' % (key, r['peak_kib'], b['peak_kib']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m serializer_bench')
+    parser.add_argument('--rows', default='1000,100000', help='comma separated row counts')
+    parser.add_argument('--shapes', default=','.join(SHAPES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', help='write the results to this json file')
+    parser.add_argument('--compare', help='baseline json written by --save')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    shapes = [s.strip() for s in args.shapes.split(',')]
+    for shape in shapes:
+        if shape not in SHAPES:
+            parser.error('unknown shape %r, choose from %s' % (shape, ', '.join(SHAPES)))
+    row_counts = [int(n) for n in args.rows.split(',')]
+
+    setup_django()
+    results = {}
+    print('%-12s %-12s %8s %12s %12s' % ('shape', 'op', 'rows', 'rows/s', 'peak KiB'))
+    for shape in shapes:
+        for rows in row_counts:
+            built = build(shape, rows)
+            for name, func in (('serialize', serialize), ('deserialize', deserialize)):
+                best, peak = measure(func, built, args.repeat)
+                key = '%s/%s/%d' % (shape, name, rows)
+                results[key] = {'rows_per_s': rows / best, 'peak_kib': peak / 1024}
+                print('%-12s %-12s %8d %12.0f %12.0f' % (shape, name, rows, rows / best, peak / 1024))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print('\nregressions (tolerance %d%%):' % (args.tolerance * 100))
+            for line in regressions:
+                print('  ' + line)
+            sys.exit(1)
+        print('\nno regressions against %s' % args.compare)
+
+
+if __name__ == '__main__':
+    main()
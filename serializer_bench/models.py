@@ -0,0 +1,44 @@
+from django.db import models
+
+# The models behind the serializer shapes used in the notes:
+#   Student        day12 / day2N
+#   Author, Book   hyperlinked_model_serializer.ipynb
+#   Singer, Song   nested_serializer.ipynb
+
+
+class Student(models.Model):
+    name = models.CharField(max_length=100)
+    roll = models.IntegerField()
+    city = models.CharField(max_length=100)
+
+
+class Author(models.Model):
+    name = models.CharField(max_length=100)
+
+    def __str__(self):
+        return self.name
+
+
+class Book(models.Model):
+    title = models.CharField(max_length=200)
+    author = models.ForeignKey(Author, related_name='books', on_delete=models.CASCADE)
+
+    def __str__(self):
+        return self.title
+
+
+class Singer(models.Model):
+    name = models.CharField(max_length=100)
+    gender = models.CharField(max_length=10)
+
+    def __str__(self):
+        return self.name
+
+
+class Song(models.Model):
+    title = models.CharField(max_length=100)
+    duration = models.FloatField()
+    singer = models.ForeignKey(Singer, related_name="songs", on_delete=models.CASCADE)
+
+    def __str__(self):
+        return self.title
@@ -0,0 +1,58 @@
+from rest_framework import serializers
+from .models import Student, Author, Book, Singer, Song
+
+
+# day12: plain Serializer
+class StudentSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=100)
+    roll = serializers.IntegerField()
+    city = serializers.CharField(max_length=100)
+
+    def create(self, validated_data):
+        return Student(**validated_data)
+
+
+# day2N: ModelSerializer with all fields
+class StudentModelSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Student
+        fields = "__all__"
+
+
+# hyperlinked_model_serializer.ipynb
+class AuthorSerializer(serializers.HyperlinkedModelSerializer):
+    books = serializers.HyperlinkedRelatedField(
+        many=True,
+        read_only=True,
+        view_name='book-detail'
+    )
+
+    class Meta:
+        model = Author
+        fields = ['url', 'id', 'name', 'books']
+
+
+class BookSerializer(serializers.HyperlinkedModelSerializer):
+    author = serializers.HyperlinkedRelatedField(
+        queryset=Author.objects.all(),
+        view_name='author-detail'
+    )
+
+    class Meta:
+        model = Book
+        fields = ['url', 'id', 'title', 'author']
+
+
+# nested_serializer.ipynb
+class SongSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Song
+        fields = ['id', 'title', 'duration']
+
+
+class SingerSerializer(serializers.ModelSerializer):
+    songs = SongSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Singer
+        fields = ['id', 'name', 'gender', 'songs']
@@ -0,0 +1,104 @@
+import csv
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from api.models import Student
+
+COLUMNS = ['id', 'name', 'roll', 'city']
+
+
+class CountingWriter:
+    # passes COPY output through to the file, counting lines for progress
+    def __init__(self, f, report):
+        self.f = f
+        self.report = report
+        self.lines = 0
+
+    def write(self, data):
+        if isinstance(data, (bytes, memoryview)):
+            data = bytes(data).decode()
+        self.f.write(data)
+        self.lines += data.count('\n')
+        self.report(self.lines - 1)  # minus the header
+
+
+# Dump the whole Student table to CSV (same format import_students reads).
+#   PostgreSQL: COPY ... TO STDOUT streams straight into the file
+#   SQLite:     a cursor read in fetchmany(batch_size) chunks
+# Memory use stays flat whatever the table size.
+#
+#   python manage.py export_students students.csv
+#   python manage.py export_students - > students.csv
+class Command(BaseCommand):
+    help = 'Dump all students to a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file, '-' for stdout")
+        parser.add_argument('--batch-size', type=int, default=10000, help='rows fetched per round trip (SQLite)')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        self.start = time.perf_counter()
+        self.last_report = 0
+        to_stdout = options['path'] == '-'
+        f = sys.stdout if to_stdout else open(options['path'], 'w', newline='')
+        try:
+            if connection.vendor == 'postgresql':
+                total = self.copy_out(f)
+            else:
+                total = self.fetch_out(f, options['batch_size'])
+        finally:
+            if not to_stdout:
+                f.close()
+
+        elapsed = time.perf_counter() - self.start
+        if self.verbosity >= 1:
+            self.stderr.write('')
+        # keep stdout clean when the CSV itself goes there
+        out = self.stderr if to_stdout else self.stdout
+        out.write(self.style.SUCCESS(
+            'Exported %d students in %.1fs (%.0f rows/s)' % (total, elapsed, total / elapsed if elapsed else 0)
+        ))
+
+    def report(self, rows):
+        now = time.perf_counter()
+        if self.verbosity >= 1 and now - self.last_report >= 0.5:
+            self.last_report = now
+            self.stderr.write('%d rows, %.0f rows/s' % (rows, rows / (now - self.start)), ending='\r')
+
+    def columns(self):
+        return ', '.join(connection.ops.quote_name(c) for c in COLUMNS)
+
+    def copy_out(self, f):
+        sql = 'COPY (SELECT %s FROM %s ORDER BY %s) TO STDOUT WITH (FORMAT csv, HEADER)' % (
+            self.columns(), connection.ops.quote_name(Student._meta.db_table), connection.ops.quote_name('id'),
+        )
+        writer = CountingWriter(f, self.report)
+        with connection.cursor() as cursor:
+            if hasattr(cursor.cursor, 'copy_expert'):  # psycopg2
+                cursor.copy_expert(sql, writer)
+            else:  # psycopg 3
+                with cursor.copy(sql) as copy:
+                    for data in copy:
+                        writer.write(data)
+        return max(writer.lines - 1, 0)
+
+    def fetch_out(self, f, batch_size):
+        sql = 'SELECT %s FROM %s ORDER BY %s' % (
+            self.columns(), connection.ops.quote_name(Student._meta.db_table), connection.ops.quote_name('id'),
+        )
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        total = 0
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                total += len(rows)
+                self.report(total)
+        return total
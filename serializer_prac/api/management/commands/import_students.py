@@ -0,0 +1,141 @@
+import csv
+import io
+import itertools
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DatabaseError, connection, transaction
+from api.models import Student
+
+COLUMNS = ['id', 'name', 'roll', 'city']
+REQUIRED = ['name', 'roll', 'city']
+TUNE_SIZES = [1000, 5000, 20000, 50000]
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+# Bulk load students from CSV without going through the API or the ORM.
+#   PostgreSQL: each batch is streamed with COPY ... FROM STDIN
+#   SQLite:     each batch is one executemany() INSERT
+# Every batch is its own transaction, so an interrupted load keeps the
+# batches that were already committed.
+#
+#   python manage.py import_students students.csv
+#   python manage.py import_students students.csv --batch-size auto --truncate
+class Command(BaseCommand):
+    help = 'Bulk load students from a CSV file with a name,roll,city (and optionally id) header'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file, '-' for stdin")
+        parser.add_argument('--batch-size', default='10000',
+                            help="rows per batch, or 'auto' to time a few sizes on the first rows and pick the fastest")
+        parser.add_argument('--truncate', action='store_true', help='delete all existing students first')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        f = sys.stdin if options['path'] == '-' else open(options['path'], newline='')
+        try:
+            reader = csv.reader(f)
+            header = [c.strip() for c in next(reader, [])]
+            if not set(REQUIRED) <= set(header) or not set(header) <= set(COLUMNS):
+                raise CommandError('CSV header must be name,roll,city (id is optional), got %s' % ','.join(header))
+
+            table = connection.ops.quote_name(Student._meta.db_table)
+            columns = ', '.join(connection.ops.quote_name(c) for c in header)
+            if connection.vendor == 'postgresql':
+                self.sql = 'COPY %s (%s) FROM STDIN WITH (FORMAT csv)' % (table, columns)
+            else:
+                placeholders = ', '.join(['%s'] * len(header))
+                self.sql = 'INSERT INTO %s (%s) VALUES (%s)' % (table, columns, placeholders)
+
+            if options['truncate']:
+                self.truncate(table)
+
+            if options['batch_size'] == 'auto':
+                sample = list(itertools.islice(reader, max(TUNE_SIZES) * 2))
+                batch_size = self.tune(sample)
+                rows = itertools.chain(sample, reader)
+            else:
+                batch_size = int(options['batch_size'])
+                rows = reader
+
+            self.load(rows, batch_size)
+        except DatabaseError as e:
+            raise CommandError('Import failed: %s' % e)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+        if 'id' in header:
+            # explicit ids leave the id sequence behind on PostgreSQL
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [Student]):
+                    cursor.execute(sql)
+
+    def truncate(self, table):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('TRUNCATE %s RESTART IDENTITY' % table)
+            else:
+                cursor.execute('DELETE FROM %s' % table)
+
+    def write_batch(self, cursor, batch):
+        if connection.vendor != 'postgresql':
+            cursor.executemany(self.sql, batch)
+            return
+        buf = io.StringIO()
+        csv.writer(buf).writerows(batch)
+        buf.seek(0)
+        if hasattr(cursor.cursor, 'copy_expert'):  # psycopg2
+            cursor.copy_expert(self.sql, buf)
+        else:  # psycopg 3
+            with cursor.copy(self.sql) as copy:
+                copy.write(buf.getvalue())
+
+    def load(self, rows, batch_size):
+        total = 0
+        start = time.perf_counter()
+        for batch in chunks(rows, batch_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                self.write_batch(cursor, batch)
+            total += len(batch)
+            if self.verbosity >= 1:
+                elapsed = time.perf_counter() - start
+                self.stderr.write('%d rows, %.0f rows/s' % (total, total / elapsed), ending='\r')
+        elapsed = time.perf_counter() - start
+        if self.verbosity >= 1:
+            self.stderr.write('')
+        self.stdout.write(self.style.SUCCESS(
+            'Imported %d students in %.1fs (%.0f rows/s, batch size %d)'
+            % (total, elapsed, total / elapsed if elapsed else 0, batch_size)
+        ))
+
+    def tune(self, sample):
+        # insert the sample with each batch size inside a transaction that is
+        # rolled back, keep the fastest size
+        if not sample:
+            return TUNE_SIZES[0]
+        best_size, best_rate = TUNE_SIZES[0], 0
+        for size in TUNE_SIZES:
+            if size > len(sample) and size != TUNE_SIZES[0]:
+                break
+            start = time.perf_counter()
+            with transaction.atomic(), connection.cursor() as cursor:
+                for batch in chunks(sample, size):
+                    self.write_batch(cursor, batch)
+                transaction.set_rollback(True)
+            rate = len(sample) / (time.perf_counter() - start)
+            if self.verbosity >= 1:
+                self.stderr.write('batch size %6d: %.0f rows/s' % (size, rate))
+            if rate > best_rate:
+                best_size, best_rate = size, rate
+        return best_size
@@ -0,0 +1,125 @@
+import bisect
+import csv
+import itertools
+import random
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from api.models import Student
+
+FIRST_NAMES = [
+    'subhan', 'ali', 'ahmed', 'fatima', 'ayesha', 'hassan', 'hamza', 'zainab', 'usman', 'maryam',
+    'bilal', 'sana', 'umar', 'hira', 'saad', 'amna', 'faisal', 'nida', 'imran', 'rabia',
+    'kashif', 'iqra', 'asad', 'mehwish', 'danish', 'sidra', 'noman', 'komal', 'junaid', 'saba',
+]
+LAST_NAMES = [
+    'khan', 'ahmed', 'ali', 'hussain', 'shah', 'malik', 'butt', 'qureshi', 'sheikh', 'chaudhry',
+    'raza', 'iqbal', 'siddiqui', 'mirza', 'baig', 'abbasi', 'javed', 'aslam', 'anwar', 'rehman',
+]
+CITIES = [
+    'karachi', 'lahore', 'islamabad', 'rawalpindi', 'faisalabad', 'multan', 'peshawar', 'quetta',
+    'hyderabad', 'sialkot', 'gujranwala', 'sukkur', 'bahawalpur', 'abbottabad', 'mardan', 'larkana',
+]
+
+
+def zipf_weights(n, skew):
+    # skew 0: uniform; 1: the first item is twice as likely as the second,
+    # three times the third, ...
+    return list(itertools.accumulate(1 / (rank ** skew) for rank in range(1, n + 1)))
+
+
+def student_rows(count, seed=42, cities=CITIES, city_skew=1.0, name_skew=0.0, roll_start=1000):
+    # (name, roll, city) tuples; the same arguments always give the same rows
+    rng = random.Random(seed)
+    city_weights = zipf_weights(len(cities), city_skew)
+    first_weights = zipf_weights(len(FIRST_NAMES), name_skew)
+    last_weights = zipf_weights(len(LAST_NAMES), name_skew)
+    city_total, first_total, last_total = city_weights[-1], first_weights[-1], last_weights[-1]
+    random_ = rng.random
+    for i in range(count):
+        # inlined rng.choices(): this loop runs a million times
+        name = '%s %s' % (FIRST_NAMES[bisect.bisect(first_weights, random_() * first_total)],
+                          LAST_NAMES[bisect.bisect(last_weights, random_() * last_total)])
+        city = cities[bisect.bisect(city_weights, random_() * city_total)]
+        yield name, roll_start + i, city
+
+
+# Fill the Student table with reproducible synthetic data for benchmarks.
+# Cities follow a Zipf distribution (--city-skew), so the first few are hot,
+# the way real traffic is. Rows go in with bulk_create in one transaction.
+#
+#   python manage.py seed_students 1000000
+#   python manage.py seed_students 100000 --seed 7 --city-skew 2 --truncate
+#   python manage.py seed_students 100000 --output students.csv   # for import_students
+#
+# Other benchmark scripts can reuse student_rows() for the same data without
+# the database.
+class Command(BaseCommand):
+    help = 'Generate N synthetic students (seeded, reproducible)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=10000, help='objects per bulk_create call')
+        parser.add_argument('--cities', help='comma separated, hottest first (default: %d Pakistani cities)' % len(CITIES))
+        parser.add_argument('--city-skew', type=float, default=1.0, help='Zipf exponent for cities, 0 = uniform')
+        parser.add_argument('--name-skew', type=float, default=0.0, help='Zipf exponent for first / last names')
+        parser.add_argument('--roll-start', type=int, default=1000)
+        parser.add_argument('--truncate', action='store_true', help='delete all existing students first')
+        parser.add_argument('--output', help="write a CSV (name,roll,city) instead of inserting, '-' for stdout")
+
+    def handle(self, *args, **options):
+        if options['count'] < 0:
+            raise CommandError('count must be >= 0')
+        cities = CITIES
+        if options['cities']:
+            cities = [c.strip() for c in options['cities'].split(',') if c.strip()]
+            if not cities:
+                raise CommandError('--cities is empty')
+        rows = student_rows(options['count'], options['seed'], cities,
+                            options['city_skew'], options['name_skew'], options['roll_start'])
+
+        self.verbosity = options['verbosity']
+        start = time.perf_counter()
+        if options['output']:
+            self.write_csv(rows, options['output'])
+        else:
+            self.insert(rows, options['batch_size'], options['truncate'])
+        elapsed = time.perf_counter() - start
+        # keep stdout clean when the CSV itself goes there
+        out = self.stderr if options['output'] == '-' else self.stdout
+        out.write(self.style.SUCCESS(
+            'Seeded %d students in %.1fs (%.0f rows/s)'
+            % (options['count'], elapsed, options['count'] / elapsed if elapsed else 0)
+        ))
+
+    def write_csv(self, rows, path):
+        f = sys.stdout if path == '-' else open(path, 'w', newline='')
+        try:
+            writer = csv.writer(f)
+            writer.writerow(['name', 'roll', 'city'])
+            writer.writerows(rows)
+        finally:
+            if f is not sys.stdout:
+                f.close()
+
+    def insert(self, rows, batch_size, truncate):
+        total = 0
+        start = time.perf_counter()
+        with transaction.atomic():
+            if truncate:
+                Student.objects.all().delete()
+            for batch in iter(lambda: list(itertools.islice(rows, batch_size)), []):
+                Student.objects.bulk_create(
+                    [Student(name=name, roll=roll, city=city) for name, roll, city in batch],
+                    batch_size=batch_size,
+                )
+                total += len(batch)
+                if self.verbosity >= 1:
+                    elapsed = time.perf_counter() - start
+                    self.stderr.write('%d rows, %.0f rows/s' % (total, total / elapsed), ending='\r')
+        if self.verbosity >= 1:
+            self.stderr.write('')
+
@@ -2,7 +2,8 @@ from django.db import models
 
 # Create your models here.
 class Student(models.Model):
-    name = models.CharField(max_length=100)
-    roll = models.IntegerField()
+    # indexed for the admin search (drf_perf/large_table.py)
+    name = models.CharField(max_length=100, db_index=True)
+    roll = models.IntegerField(db_index=True)
     city = models.CharField(max_length=100)
 
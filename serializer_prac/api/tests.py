@@ -1,3 +1,129 @@
+import csv
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from .models import Student
 
 # Create your tests here.
+
+class LargeTableAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+        for roll, name in enumerate(['amir', 'amina', 'bilal', 'Amjad'], 1):
+            Student.objects.create(name=name, roll=roll, city='karachi')
+
+    def changelist(self, **params):
+        response = self.client.get('/admin/api/student/', params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def names(self, response):
+        return sorted(s.name for s in response.context['cl'].result_list)
+
+    def test_prefix_search(self):
+        # case-insensitive on SQLite
+        self.assertEqual(self.names(self.changelist(q='am')), ['Amjad', 'amina', 'amir'])
+        self.assertEqual(self.names(self.changelist(q='ami')), ['amina', 'amir'])
+
+    def test_number_search(self):
+        self.assertEqual(self.names(self.changelist(q='3')), ['bilal'])
+
+    def test_keyset_pages(self):
+        with mock.patch('django.contrib.admin.ModelAdmin.list_per_page', 3):
+            first = self.changelist()
+            cl = first.context['cl']
+            self.assertEqual(self.names(first), ['Amjad', 'amina', 'bilal'])
+            self.assertIsNone(cl.newer_url)
+            older = self.client.get('/admin/api/student/' + cl.older_url)
+        self.assertEqual(self.names(older), ['amir'])
+        self.assertIsNone(older.context['cl'].older_url)
+
+    def test_empty_page_links(self):
+        response = self.changelist(after=1)
+        self.assertEqual(response.context['cl'].result_list, [])
+        self.assertContains(response, '« newest')
+        self.assertNotContains(response, 'href="None"')
+
+    @mock.patch('django.contrib.admin.ModelAdmin.list_per_page', 1)
+    def test_select_all_only_with_exact_count(self):
+        self.assertContains(self.changelist(), 'Select all 4')
+        with mock.patch('drf_perf.large_table.COUNT_CAP', 2):
+            response = self.changelist(q='am')
+        self.assertFalse(response.context['cl'].paginator.count_exact)
+        self.assertNotContains(response, 'Select all 2')
+
+
+class CsvExportAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+        Student.objects.create(name='amir', roll=1, city='karachi')
+        Student.objects.create(name='bilal', roll=2, city='=cmd()')
+        Student.objects.create(name='amina', roll=3, city='lahore')
+
+    def rows(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_export_view_follows_search(self):
+        rows = self.rows(self.client.get('/admin/api/student/export/', {'q': 'am'}))
+        self.assertEqual(rows[0], ['id', 'name', 'roll', 'city'])
+        self.assertEqual([row[1] for row in rows[1:]], ['amir', 'amina'])
+
+    def test_formulas_are_escaped(self):
+        rows = self.rows(self.client.get('/admin/api/student/export/', {'q': 'bilal'}))
+        self.assertEqual(rows[1][3], "'=cmd()")
+
+    def test_bad_lookup_goes_back_to_changelist(self):
+        response = self.client.get('/admin/api/student/export/', {'nonsense__gt': '1'})
+        self.assertRedirects(response, '/admin/api/student/?e=1', fetch_redirect_response=False)
+
+    def test_action_exports_selected(self):
+        ids = list(Student.objects.filter(city='lahore').values_list('pk', flat=True))
+        response = self.client.post('/admin/api/student/', {'action': 'export_csv', '_selected_action': ids})
+        self.assertEqual([row[1] for row in self.rows(response)[1:]], ['amina'])
+
+
+class CommandTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.path = os.path.join(directory, 'students.csv')
+
+    def write(self, text):
+        with open(self.path, 'w') as f:
+            f.write(text)
+
+    def run_command(self, *args, **kwargs):
+        out, err = io.StringIO(), io.StringIO()
+        call_command(*args, stdout=out, stderr=err, **kwargs)
+        return out.getvalue()
+
+    def test_import_in_batches(self):
+        self.write('name,roll,city\n' + ''.join('s%d,%d,quetta\n' % (n, n) for n in range(25)))
+        self.assertIn('Imported 25 students', self.run_command('import_students', self.path, batch_size='10'))
+        self.assertEqual(Student.objects.count(), 25)
+
+    def test_import_rejects_bad_header(self):
+        self.write('name,age\nx,1\n')
+        with self.assertRaises(CommandError):
+            self.run_command('import_students', self.path)
+
+    def test_export_import_round_trip(self):
+        self.run_command('seed_students', 50, seed=1)
+        before = list(Student.objects.order_by('id').values_list('id', 'name', 'roll', 'city'))
+        self.run_command('export_students', self.path)
+        self.run_command('import_students', self.path, truncate=True)
+        after = list(Student.objects.order_by('id').values_list('id', 'name', 'roll', 'city'))
+        self.assertEqual(after, before)
+
+    def test_seed_is_reproducible(self):
+        self.run_command('seed_students', 20, seed=7)
+        first = list(Student.objects.order_by('id').values_list('name', 'roll', 'city'))
+        self.run_command('seed_students', 20, seed=7, truncate=True)
+        self.assertEqual(list(Student.objects.order_by('id').values_list('name', 'roll', 'city')), first)
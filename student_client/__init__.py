@@ -0,0 +1,3 @@
+from .aio import AsyncStudentClient, BatchError
+from .cache import MemoryCache, SQLiteCache
+from .client import StudentClient, StudentAPIError
@@ -0,0 +1,310 @@
+# AsyncStudentClient: many Student API calls in flight at once
+#
+# Same methods and URL styles as StudentClient, as coroutines, plus the
+# *_many helpers that fan out with at most `concurrency` requests in flight:
+#
+#   async with AsyncStudentClient('http://127.0.0.1:8000/studentapi/', concurrency=32) as client:
+#       students = await client.get_many(range(1, 5001))   # same order as the ids
+#
+# Errors in a batch don't stop the other calls. When the batch is done,
+# either the exceptions are returned in place (return_exceptions=True) or a
+# BatchError is raised that holds every (index, exception) pair and the
+# results of the calls that worked.
+#
+# HTTP: aiohttp when it is installed, otherwise a small stdlib HTTP/1.1
+# client on asyncio streams. Either way connections are kept alive and
+# pooled per host (at most `concurrency` per host).
+#
+# Retries: idempotent methods (GET, PUT, DELETE) are retried `retries`
+# times with exponential backoff on connection errors and 408/429/502/503/
+# 504, waiting at least as long as a Retry-After header asks.
+import asyncio
+import json
+import socket
+import ssl
+from urllib.parse import urlsplit
+
+from .client import StudentAPIError, retry_after
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+IDEMPOTENT = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+# safe to send again when a reused connection fails: the server may have
+# acted on the first copy
+REPLAYABLE = {'GET', 'HEAD', 'PUT', 'DELETE'}
+RETRY_STATUSES = (408, 429, 502, 503, 504)
+
+
+class BatchError(Exception):
+    def __init__(self, errors, results):
+        super().__init__('%d of %d calls failed, first: %r' % (len(errors), len(results), errors[0][1]))
+        self.errors = errors      # [(index, exception), ...]
+        self.results = results    # exceptions in place of the failed calls
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def data(self):
+        if not self.body:
+            return None
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return self.body.decode('utf-8', 'replace')
+
+
+class _Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+
+class StdlibTransport:
+    # HTTP/1.1 with keep-alive; Content-Length, chunked and read-to-close bodies
+    def __init__(self, limit_per_host):
+        self.limit_per_host = limit_per_host
+        self.idle = {}
+        self.slots = {}
+
+    async def open(self, scheme, host, port):
+        reader, writer = await asyncio.open_connection(
+            host, port, ssl=ssl.create_default_context() if scheme == 'https' else None)
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return _Connection(reader, writer)
+
+    async def request(self, method, url, headers, body):
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = (parts.scheme, parts.hostname, port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        slots = self.slots.setdefault(key, asyncio.Semaphore(self.limit_per_host))
+
+        lines = ['%s %s HTTP/1.1' % (method, path), 'Host: %s' % parts.netloc]
+        lines += ['%s: %s' % item for item in headers.items()]
+        lines.append('Content-Length: %d' % len(body or b''))
+        head = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+        async with slots:
+            idle = self.idle.setdefault(key, [])
+            conn = None
+            while idle and conn is None:
+                conn = idle.pop()
+                if conn.reader.at_eof():
+                    # closed by the server while it sat in the pool
+                    conn.close()
+                    conn = None
+            if conn is not None:
+                try:
+                    response, keep = await self.exchange(conn, head + (body or b''), method)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    # the server dropped the idle keep-alive connection: once
+                    # more on a fresh one, unless the request may have been
+                    # acted on already
+                    if method not in REPLAYABLE:
+                        raise
+                    conn = None
+            if conn is None:
+                conn = await self.open(*key)
+                response, keep = await self.exchange(conn, head + (body or b''), method)
+            if keep:
+                idle.append(conn)
+            else:
+                conn.close()
+            return response
+
+    async def exchange(self, conn, data, method):
+        try:
+            conn.writer.write(data)
+            await conn.writer.drain()
+            return await self.read_response(conn.reader, method)
+        except BaseException:
+            conn.close()
+            raise
+
+    async def read_response(self, reader, method):
+        status_line = await reader.readuntil(b'\r\n')
+        version, status = status_line.split(None, 2)[:2]
+        headers = {}
+        while True:
+            line = await reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        status = int(status)
+
+        keep = version == b'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            body = b''
+        elif 'chunked' in headers.get('transfer-encoding', '').lower():
+            chunks = []
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if size == 0:
+                    # trailers, up to the blank line
+                    while await reader.readuntil(b'\r\n') != b'\r\n':
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            body = await reader.read()
+            keep = False
+        return Response(status, headers, body), keep
+
+    async def close(self):
+        for idle in self.idle.values():
+            for conn in idle:
+                conn.close()
+        self.idle.clear()
+
+
+class AiohttpTransport:
+    def __init__(self, limit_per_host):
+        self.limit_per_host = limit_per_host
+        self.session = None
+
+    async def request(self, method, url, headers, body):
+        if self.session is None:
+            # made here, not in __init__, so it belongs to the running loop
+            # (the client may be created before asyncio.run())
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0, limit_per_host=self.limit_per_host))
+        async with self.session.request(method, url, headers=headers, data=body) as r:
+            return Response(r.status, {k.lower(): v for k, v in r.headers.items()}, await r.read())
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+class AsyncStudentClient:
+    def __init__(self, base_url='http://127.0.0.1:8000/studentapi/', id_style='path', trailing_slash=False,
+                 concurrency=16, timeout=10, retries=3, backoff=0.2, use_aiohttp=None):
+        if id_style not in ('path', 'body'):
+            raise ValueError("id_style must be 'path' or 'body'")
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.id_style = id_style
+        self.trailing_slash = trailing_slash
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.concurrency = concurrency
+        self.headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        if use_aiohttp is None:
+            use_aiohttp = aiohttp is not None
+        self.transport = AiohttpTransport(concurrency) if use_aiohttp else StdlibTransport(concurrency)
+        self.limit = asyncio.Semaphore(concurrency)
+
+    # auth, set once
+
+    def use_token(self, key):
+        self.headers['Authorization'] = 'Token %s' % key
+
+    def use_basic(self, username, password):
+        import base64
+        credentials = base64.b64encode(('%s:%s' % (username, password)).encode()).decode()
+        self.headers['Authorization'] = 'Basic %s' % credentials
+
+    def use_jwt(self, access):
+        self.headers['Authorization'] = 'Bearer %s' % access
+
+    # plumbing
+
+    def url(self, id=None):
+        if id is None or self.id_style == 'body':
+            return self.base_url
+        return '%s%s%s' % (self.base_url, id, '/' if self.trailing_slash else '')
+
+    async def request(self, method, id=None, data=None):
+        url = self.url(id)
+        if self.id_style == 'body' and id is not None:
+            data = dict(data or {}, id=id)
+        body = json.dumps(data).encode() if data is not None else None
+        attempts = self.retries + 1 if method in IDEMPOTENT else 1
+
+        async with self.limit:
+            for attempt in range(attempts):
+                last = attempt == attempts - 1
+                delay = self.backoff * (2 ** attempt)
+                try:
+                    response = await asyncio.wait_for(
+                        self.transport.request(method, url, self.headers, body), self.timeout)
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    if last:
+                        raise
+                else:
+                    if response.status not in RETRY_STATUSES or last:
+                        break
+                    delay = max(delay, retry_after(response.headers) or 0)
+                await asyncio.sleep(delay)
+
+        result = response.data()
+        if response.status >= 400:
+            raise StudentAPIError(response.status, result, method, url, retry_after(response.headers))
+        return result
+
+    # CRUD
+
+    async def list(self):
+        return await self.request('GET', data={} if self.id_style == 'body' else None)
+
+    async def get(self, id):
+        return await self.request('GET', id)
+
+    async def create(self, data):
+        return await self.request('POST', data=data)
+
+    async def update(self, id, data, partial=True):
+        return await self.request('PATCH' if partial else 'PUT', id, data)
+
+    async def delete(self, id):
+        return await self.request('DELETE', id)
+
+    # fan-out; results come back in the order of the input
+
+    async def batch(self, coros, return_exceptions=False):
+        results = await asyncio.gather(*coros, return_exceptions=True)
+        errors = [(i, r) for i, r in enumerate(results) if isinstance(r, Exception)]
+        if errors and not return_exceptions:
+            raise BatchError(errors, results)
+        return results
+
+    async def get_many(self, ids, return_exceptions=False):
+        return await self.batch([self.get(id) for id in ids], return_exceptions)
+
+    async def create_many(self, rows, return_exceptions=False):
+        return await self.batch([self.create(row) for row in rows], return_exceptions)
+
+    async def update_many(self, changes, partial=True, return_exceptions=False):
+        return await self.batch([self.update(id, data, partial) for id, data in changes], return_exceptions)
+
+    async def delete_many(self, ids, return_exceptions=False):
+        return await self.batch([self.delete(id) for id in ids], return_exceptions)
+
+    async def close(self):
+        await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,106 @@
+# Benchmark: StudentClient (one call after another) vs AsyncStudentClient
+# (bounded fan-out) against a running Student API
+#
+# Every mode does the same full cycle on its own students, so nothing is left
+# behind: create N, get N, update N, delete N, each phase timed separately.
+#
+#   python -m student_client.devserver day2N/generic_api_view_mixins --port 8001 &
+#   python -m student_client.bench_async --url http://127.0.0.1:8001/studentapi/ --put
+#   python -m student_client.bench_async --requests 2000 --concurrency 1,8,32,128 --json out.json
+#
+# Use the devserver (or a real server), not runserver: runserver stalls ~40 ms
+# on every kept-alive request (see devserver.py), which swamps everything
+# measured here. --put is for the APIs without PATCH (generic_api_view_mixins).
+import argparse
+import asyncio
+import json
+import time
+
+from .aio import AsyncStudentClient
+from .client import StudentClient
+
+PHASES = ('create', 'get', 'update', 'delete')
+
+
+def rows(n, tag):
+    return [{'name': 'bench %s %d' % (tag, i), 'roll': 900000 + i, 'city': 'karachi'} for i in range(n)]
+
+
+def check_ids(created):
+    ids = [item.get('id') if isinstance(item, dict) else None for item in created]
+    if None in ids:
+        raise SystemExit('create did not return the new id (%r); this benchmark needs an API that does' % created[0])
+    return ids
+
+
+def run_sync(args, data):
+    timings = {}
+    with StudentClient(args.url, id_style=args.id_style, trailing_slash=args.trailing_slash) as client:
+        client.list()  # open the connection
+        start = time.perf_counter()
+        ids = check_ids(client.create_many(data))
+        timings['create'] = time.perf_counter() - start
+        start = time.perf_counter()
+        client.get_many(ids)
+        timings['get'] = time.perf_counter() - start
+        start = time.perf_counter()
+        client.update_many([(id, dict(row, city='lahore')) for id, row in zip(ids, data)], partial=not args.put)
+        timings['update'] = time.perf_counter() - start
+        start = time.perf_counter()
+        client.delete_many(ids)
+        timings['delete'] = time.perf_counter() - start
+    return timings
+
+
+async def run_async(args, data, concurrency):
+    timings = {}
+    async with AsyncStudentClient(args.url, id_style=args.id_style, trailing_slash=args.trailing_slash,
+                                  concurrency=concurrency) as client:
+        await client.list()
+        start = time.perf_counter()
+        ids = check_ids(await client.create_many(data))
+        timings['create'] = time.perf_counter() - start
+        start = time.perf_counter()
+        await client.get_many(ids)
+        timings['get'] = time.perf_counter() - start
+        start = time.perf_counter()
+        await client.update_many([(id, dict(row, city='lahore')) for id, row in zip(ids, data)],
+                                 partial=not args.put)
+        timings['update'] = time.perf_counter() - start
+        start = time.perf_counter()
+        await client.delete_many(ids)
+        timings['delete'] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m student_client.bench_async')
+    parser.add_argument('--url', default='http://127.0.0.1:8000/studentapi/')
+    parser.add_argument('--id-style', default='path', choices=['path', 'body'])
+    parser.add_argument('--trailing-slash', action='store_true', help='router urls (model_view_set)')
+    parser.add_argument('--put', action='store_true', help='update with PUT instead of PATCH')
+    parser.add_argument('--requests', type=int, default=500, help='students per phase')
+    parser.add_argument('--concurrency', default='1,4,16,64', help='async concurrency levels, comma separated')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    modes = [('sync', None)] + [('async c=%s' % c, int(c)) for c in args.concurrency.split(',')]
+    results = []
+    print('%-14s' % 'mode' + ''.join('%12s' % ('%s/s' % p) for p in PHASES))
+    for name, concurrency in modes:
+        data = rows(args.requests, name)
+        if concurrency is None:
+            timings = run_sync(args, data)
+        else:
+            timings = asyncio.run(run_async(args, data, concurrency))
+        rps = {phase: args.requests / timings[phase] for phase in PHASES}
+        results.append({'mode': name, 'concurrency': concurrency, 'requests': args.requests, 'rps': rps})
+        print('%-14s' % name + ''.join('%12.0f' % rps[p] for p in PHASES))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+# Bulk import of a CSV / NDJSON roster into a Student API
+#
+#   python -m student_client.bulk_import roster.csv --url http://127.0.0.1:8000/studentapi/ \
+#       --bulk bulk/ --batch-size 1000 --window 4
+#   python manage.py seed_students 1000000 --output - | python -m student_client.bulk_import - --format csv
+#
+# The file is read row by row, never all at once: rows are grouped into
+# batches of --batch-size and at most --window batches are in flight. The
+# reader waits for a free slot before reading the next batch, so a slow
+# server slows the reading down instead of filling memory.
+#
+# How a batch is sent:
+#   --bulk PATH   one POST of the whole batch as a json list to PATH (relative
+#                 to --url; model_view_set has /studentapi/bulk/), which
+#                 creates the valid rows with one bulk_create
+#   (default)     one POST per row through AsyncStudentClient, --concurrency
+#                 requests in flight overall; works with every project
+#
+# Retries: connection errors, timeouts, 5xx, 408 (request timeout) and 429
+# (throttled) are retried --retries times with backoff, waiting at least as
+# long as the server's Retry-After header asks. In per-row mode only the
+# rows that failed are sent again. Rows the API rejects as invalid (400 with
+# field errors) are not retried; they go to --rejects (ndjson, row +
+# errors). Any other 4xx (wrong URL, token, method, batch too big) stops the
+# import right away, as does a batch that still fails after its retries;
+# the checkpoint is kept either way and the exit status is 1.
+#
+# Checkpoint (--checkpoint, default <file>.checkpoint): after each batch the
+# numbers of the finished batches are saved, and in per-row mode also which
+# rows of an unfinished batch already went in. Rerunning the same command
+# (same file, same --batch-size) skips them and sends the rest, so an
+# interrupted import picks up where it stopped. Skipped rows are still
+# parsed (cheap next to sending them). What can still be sent twice is a
+# request whose response was lost after the server committed it (a whole
+# batch in --bulk mode, one row otherwise), since Student has no unique key
+# to detect that by.
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import os
+import signal
+import sys
+import time
+
+from .aio import AsyncStudentClient
+from .client import StudentAPIError, retry_after
+
+
+def read_rows(path, format):
+    # -> generator of dicts; '-' reads stdin
+    f = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+    try:
+        if format == 'csv':
+            for row in csv.DictReader(f):
+                yield row
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def batches(rows, size):
+    for number in itertools.count():
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield number, batch
+
+
+class FatalResponse(Exception):
+    # a 4xx that isn't about the rows: retrying or skipping won't help
+    pass
+
+
+def retryable(status):
+    # the server is overloaded or gave up waiting; the same request can work later
+    return status >= 500 or status in (408, 429)
+
+
+def row_errors(status, data):
+    # 400 with field errors ({"roll": ["..."]}) is a bad row; a 400 with
+    # only a "detail" is about the request
+    return status == 400 and isinstance(data, dict) and bool(data) and set(data) != {'detail'}
+
+
+class Checkpoint:
+    # finished batch numbers, kept as "everything below done_below" + the
+    # finished ones above it (batches finish out of order), and for batches
+    # that are partly sent the positions of the rows already done
+    def __init__(self, path, source, batch_size):
+        self.path = path
+        self.source = source
+        self.batch_size = batch_size
+        self.done_below = 0
+        self.done = set()
+        self.partial = {}
+        self.rows = 0
+        if path and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if state['source'] != source:
+                raise SystemExit('%s belongs to %s; use that file or delete the checkpoint'
+                                 % (path, state['source']))
+            if state['batch_size'] != batch_size:
+                raise SystemExit('%s was written with --batch-size %d; use that or delete the checkpoint'
+                                 % (path, state['batch_size']))
+            self.done_below = state['done_below']
+            self.done = set(state['done'])
+            self.partial = {int(number): set(rows) for number, rows in state.get('partial', {}).items()}
+            self.rows = state['rows']
+
+    def is_done(self, number):
+        return number < self.done_below or number in self.done
+
+    def rows_done(self, number):
+        return self.partial.get(number, set())
+
+    def progress(self, number, positions):
+        if positions:
+            self.partial.setdefault(number, set()).update(positions)
+            self.rows += len(positions)
+            self.save()
+
+    def finish(self, number, rows):
+        self.done.add(number)
+        self.rows += rows
+        self.partial.pop(number, None)
+        while self.done_below in self.done:
+            self.done.remove(self.done_below)
+            self.done_below += 1
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'source': self.source, 'batch_size': self.batch_size, 'done_below': self.done_below,
+                       'done': sorted(self.done), 'rows': self.rows,
+                       'partial': {str(n): sorted(rows) for n, rows in self.partial.items()}}, f)
+        os.replace(tmp, self.path)
+
+
+class Importer:
+    def __init__(self, args):
+        self.args = args
+        self.client = AsyncStudentClient(args.url, concurrency=args.concurrency, timeout=args.timeout, retries=0)
+        if args.token:
+            self.client.use_token(args.token)
+        self.bulk_url = self.client.base_url + args.bulk if args.bulk else None
+        self.rejects = open(args.rejects, 'a') if args.rejects else None
+        self.created = 0
+        self.rejected = 0
+        self.failed = None
+        self.stopping = False
+
+    def reject(self, row, errors):
+        self.rejected += 1
+        if self.rejects:
+            self.rejects.write(json.dumps({'row': row, 'errors': errors}) + '\n')
+
+    async def send_bulk(self, number, pending, checkpoint):
+        # pending: [(position in the batch, row)] -> the ones still to retry
+        rows = [row for _, row in pending]
+        response = await self.client.transport.request('POST', self.bulk_url, self.client.headers,
+                                                       json.dumps(rows).encode())
+        result = response.data()
+        if retryable(response.status):
+            raise StudentAPIError(response.status, result, 'POST', self.bulk_url, retry_after(response.headers))
+        # 201, or 400 when no row was valid; both list the bad rows
+        if response.status in (201, 400) and isinstance(result, dict) and isinstance(result.get('errors'), dict):
+            self.created += result.get('created', 0)
+            for index, errors in result['errors'].items():
+                self.reject(rows[int(index)], errors)
+            return [], None
+        raise FatalResponse('POST %s -> HTTP %d: %.200s' % (self.bulk_url, response.status, result))
+
+    async def send_rows(self, number, pending, checkpoint):
+        results = await self.client.create_many([row for _, row in pending], return_exceptions=True)
+        retry = []
+        wait = None
+        done = []
+        fatal = None
+        for (position, row), result in zip(pending, results):
+            if isinstance(result, StudentAPIError) and row_errors(result.status_code, result.data):
+                self.reject(row, result.data)
+                done.append(position)
+            elif isinstance(result, StudentAPIError) and not retryable(result.status_code):
+                fatal = fatal or result
+            elif isinstance(result, Exception):
+                retry.append((position, row))
+                if getattr(result, 'retry_after', None) is not None:
+                    wait = max(wait or 0, result.retry_after)
+            else:
+                self.created += 1
+                done.append(position)
+        # so a rerun doesn't send these again if the batch never finishes
+        checkpoint.progress(number, done)
+        if fatal is not None:
+            raise FatalResponse('%.200s' % fatal)
+        return retry, wait
+
+    async def send(self, number, rows, checkpoint, window):
+        try:
+            await self.send_batch(number, rows, checkpoint)
+        except FatalResponse as exc:
+            self.failed = 'batch %d: %s' % (number, exc)
+        except Exception as exc:
+            self.failed = 'batch %d: %r' % (number, exc)
+        finally:
+            window.release()
+
+    async def send_batch(self, number, rows, checkpoint):
+        done = checkpoint.rows_done(number)
+        pending = [(position, row) for position, row in enumerate(rows) if position not in done]
+        wait = None
+        for attempt in range(self.args.retries + 1):
+            if attempt:
+                # Retry-After, when the server sent one, wins over a shorter backoff
+                await asyncio.sleep(max(self.args.backoff * (2 ** (attempt - 1)), wait or 0))
+            try:
+                if self.bulk_url:
+                    pending, wait = await asyncio.wait_for(self.send_bulk(number, pending, checkpoint),
+                                                           self.args.timeout)
+                else:
+                    pending, wait = await self.send_rows(number, pending, checkpoint)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, StudentAPIError) as exc:
+                error = exc
+                wait = getattr(exc, 'retry_after', None)
+            else:
+                if not pending:
+                    checkpoint.finish(number, len(rows) - len(checkpoint.rows_done(number)))
+                    return
+                error = '%d rows failed' % len(pending)
+        self.failed = 'batch %d: %s' % (number, error)
+
+    async def run(self, checkpoint):
+        args = self.args
+        window = asyncio.Semaphore(args.window)
+        tasks = set()
+        start = last_report = time.perf_counter()
+        skipped = 0
+
+        # first Ctrl-C: stop reading, let the batches in flight finish so the
+        # checkpoint covers everything that was sent; second Ctrl-C: abort
+        def interrupt():
+            if self.stopping:
+                for task in tasks:
+                    task.cancel()
+                return
+            self.stopping = True
+            print('finishing %d batches in flight, Ctrl-C again to abort' % len(tasks), file=sys.stderr)
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGINT, interrupt)
+        except NotImplementedError:  # windows
+            pass
+
+        try:
+            for number, rows in batches(read_rows(args.file, args.format), args.batch_size):
+                if checkpoint.is_done(number):
+                    skipped += len(rows)
+                    continue
+                await window.acquire()
+                if self.failed or self.stopping:
+                    window.release()
+                    break
+                task = asyncio.ensure_future(self.send(number, rows, checkpoint, window))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+                now = time.perf_counter()
+                if now - last_report >= args.progress:
+                    last_report = now
+                    print('%d created, %d rejected, %.0f rows/s' % (
+                        self.created, self.rejected, self.created / (now - start)), file=sys.stderr)
+            if tasks:
+                await asyncio.wait(tasks)
+        finally:
+            try:
+                loop.remove_signal_handler(signal.SIGINT)
+            except NotImplementedError:
+                pass
+            await self.client.close()
+            if self.rejects:
+                self.rejects.close()
+        return skipped, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m student_client.bulk_import')
+    parser.add_argument('file', help="csv (name,roll,city header) or ndjson file, '-' for stdin")
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help='default: from the file extension')
+    parser.add_argument('--url', default='http://127.0.0.1:8000/studentapi/')
+    parser.add_argument('--bulk', help="bulk endpoint relative to --url, e.g. 'bulk/'")
+    parser.add_argument('--token', help='DRF token')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--window', type=int, default=4, help='batches in flight')
+    parser.add_argument('--concurrency', type=int, default=16, help='requests in flight (per-row mode)')
+    parser.add_argument('--retries', type=int, default=5)
+    parser.add_argument('--backoff', type=float, default=0.5)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--checkpoint', help="default: <file>.checkpoint, none for stdin; 'off' to disable")
+    parser.add_argument('--rejects', help='append rejected rows here (ndjson)')
+    parser.add_argument('--progress', type=float, default=5, help='seconds between progress lines')
+    args = parser.parse_args()
+
+    if args.format is None:
+        if args.file.endswith('.csv'):
+            args.format = 'csv'
+        elif args.file.endswith(('.ndjson', '.jsonl', '.json')):
+            args.format = 'ndjson'
+        else:
+            parser.error('--format is needed for %s' % args.file)
+    if args.checkpoint == 'off' or (args.checkpoint is None and args.file == '-'):
+        args.checkpoint = None
+    elif args.checkpoint is None:
+        args.checkpoint = args.file + '.checkpoint'
+
+    checkpoint = Checkpoint(args.checkpoint, os.path.abspath(args.file), args.batch_size)
+    if checkpoint.rows:
+        print('resuming: %d rows already imported' % checkpoint.rows, file=sys.stderr)
+    importer = Importer(args)
+    try:
+        skipped, elapsed = asyncio.run(importer.run(checkpoint))
+    except KeyboardInterrupt:
+        print('interrupted; rerun the same command to resume', file=sys.stderr)
+        sys.exit(130)
+
+    print('%d created, %d rejected, %d skipped (checkpoint) in %.1f s, %.0f rows/s' % (
+        importer.created, importer.rejected, skipped, elapsed, importer.created / elapsed if elapsed else 0))
+    if importer.failed:
+        print('stopped: %s; rerun to resume' % importer.failed, file=sys.stderr)
+        sys.exit(1)
+    if importer.stopping:
+        print('interrupted; rerun the same command to resume', file=sys.stderr)
+        sys.exit(130)
+    if args.checkpoint and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+# Response caches for StudentClient(cache=...)
+#
+#   client = StudentClient(url, cache=MemoryCache(max_entries=256))
+#   client = StudentClient(url, cache=SQLiteCache('students-cache.sqlite3', max_bytes=50 * 1024 * 1024))
+#
+# GET responses that carry an ETag or Last-Modified are kept, keyed by URL
+# (plus the json body for the id_style='body' APIs). The next GET of the same
+# URL sends If-None-Match / If-Modified-Since, and a 304 is answered from
+# the cache. The list then isn't sent over the wire again, only the headers.
+#
+# The server has to send validators for any of this to happen; Django's
+# ConditionalGetMiddleware does that for every non-streaming response
+# (model_view_set has it on).
+#
+# Both caches are LRU, bounded by number of entries and/or total body bytes.
+# A write through the client (POST / PUT / PATCH / DELETE) drops the entries
+# for that URL and for the list, so a client never gets its own stale data
+# back.
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class Entry:
+    def __init__(self, body, etag=None, last_modified=None, content_type=None):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_type = content_type
+
+    def validators(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class MemoryCache:
+    def __init__(self, max_entries=256, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        if self.max_bytes is not None and len(entry.body) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old.body)
+            self.entries[key] = entry
+            self.size += len(entry.body)
+            self.stats['stores'] += 1
+            while self.entries and (
+                    (self.max_entries is not None and len(self.entries) > self.max_entries)
+                    or (self.max_bytes is not None and self.size > self.max_bytes)):
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted.body)
+                self.stats['evictions'] += 1
+
+    def delete(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.size -= len(entry.body)
+
+    def delete_prefix(self, prefix):
+        with self.lock:
+            for key in [k for k in self.entries if k.startswith(prefix)]:
+                self.size -= len(self.entries.pop(key).body)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+class SQLiteCache:
+    # survives restarts, and several client processes can share one file
+    def __init__(self, path, max_entries=10000, max_bytes=None):
+        self.path = os.path.abspath(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.local = threading.local()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        with self.db() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, body BLOB, etag TEXT, '
+                       'last_modified TEXT, content_type TEXT, size INTEGER, used REAL)')
+            db.execute('CREATE INDEX IF NOT EXISTS entries_used ON entries (used)')
+
+    def db(self):
+        # one connection per thread; sqlite3 connections can't be shared
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = self.local.db = sqlite3.connect(self.path, timeout=30)
+            db.execute('PRAGMA journal_mode=WAL')
+        return db
+
+    def get(self, key):
+        with self.db() as db:
+            row = db.execute('SELECT body, etag, last_modified, content_type FROM entries WHERE key = ?',
+                             (key,)).fetchone()
+            if row is None:
+                return None
+            db.execute('UPDATE entries SET used = ? WHERE key = ?', (time.time(), key))
+        return Entry(bytes(row[0]), row[1], row[2], row[3])
+
+    def set(self, key, entry):
+        if self.max_bytes is not None and len(entry.body) > self.max_bytes:
+            return
+        with self.db() as db:
+            db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                       (key, entry.body, entry.etag, entry.last_modified, entry.content_type,
+                        len(entry.body), time.time()))
+            self.stats['stores'] += 1
+            self.evict(db)
+
+    def evict(self, db):
+        count, size = db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        drop = []
+        if (self.max_entries is not None and count > self.max_entries) or \
+                (self.max_bytes is not None and size > self.max_bytes):
+            for key, entry_size in db.execute('SELECT key, size FROM entries ORDER BY used'):
+                if (self.max_entries is None or count <= self.max_entries) and \
+                        (self.max_bytes is None or size <= self.max_bytes):
+                    break
+                drop.append((key,))
+                count -= 1
+                size -= entry_size
+        if drop:
+            db.executemany('DELETE FROM entries WHERE key = ?', drop)
+            self.stats['evictions'] += len(drop)
+
+    def delete(self, key):
+        with self.db() as db:
+            db.execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def delete_prefix(self, prefix):
+        with self.db() as db:
+            db.execute('DELETE FROM entries WHERE substr(key, 1, ?) = ?', (len(prefix), prefix))
+
+    def clear(self):
+        with self.db() as db:
+            db.execute('DELETE FROM entries')
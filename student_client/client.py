@@ -0,0 +1,255 @@
+# StudentClient: the myapp.py functions on one pooled requests.Session
+#
+#   myapp.py                      StudentClient
+#   get_student()                 client.list()
+#   get_student(3)                client.get(3)
+#   post_data()                   client.create({'name': ..., 'roll': ..., 'city': ...})
+#   update_data()                 client.update(4, {'city': 'x'})          (PATCH)
+#                                 client.update(4, {...}, partial=False)   (PUT)
+#   delete_data()                 client.delete(3)
+#
+# What is set up once instead of per call: the TCP (keep-alive) connection
+# pool, the default headers, auth, and the retry policy.
+#
+# Two URL styles, like the projects in the notes:
+#   id_style='path'  /studentapi/3   (APIView, generics, viewsets; use
+#                    trailing_slash=True for router urls)
+#   id_style='body'  /studentapi/ with {"id": 3} in the json body (the
+#                    plain View / myapp.py style)
+#
+#   with StudentClient('http://127.0.0.1:8000/studentapi/') as client:
+#       client.use_token('9944b09199c62bcf9418ad846dd0e4bbdfc6ee4b')
+#       students = client.get_many(range(1, 1001))
+#
+# cache=MemoryCache() / SQLiteCache(path) (cache.py) revalidates repeated
+# GETs with ETag / Last-Modified, so polling the list costs a 304 when
+# nothing changed.
+import email.utils
+import json
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .cache import Entry
+
+
+class StudentAPIError(Exception):
+    def __init__(self, status_code, data, method=None, url=None, retry_after=None):
+        super().__init__('%s %s -> HTTP %s: %s' % (method, url, status_code, data))
+        self.status_code = status_code
+        self.data = data
+        self.method = method
+        self.url = url
+        # seconds the server asked us to wait (429 / 503), None if it didn't say
+        self.retry_after = retry_after
+
+
+def retry_after(headers):
+    # Retry-After is either a number of seconds or an HTTP date
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def decode(response):
+    return decode_body(response.content)
+
+
+def decode_body(content):
+    if not content:
+        return None
+    try:
+        return json.loads(content)
+    except ValueError:
+        return content.decode('utf-8', 'replace')
+
+
+class StudentClient:
+    def __init__(self, base_url='http://127.0.0.1:8000/studentapi/', id_style='path', trailing_slash=False,
+                 timeout=10, retries=3, backoff=0.2, retry_statuses=(502, 503, 504),
+                 retry_non_idempotent=False, pool_size=10, cache=None):
+        if id_style not in ('path', 'body'):
+            raise ValueError("id_style must be 'path' or 'body'")
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.id_style = id_style
+        self.trailing_slash = trailing_slash
+        self.timeout = timeout
+        self.refresh_token = None
+        self.refresh_url = None
+        self.cache = cache
+
+        methods = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+        if retry_non_idempotent:
+            methods |= {'POST', 'PATCH'}
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                      backoff_factor=backoff, status_forcelist=retry_statuses,
+                      allowed_methods=frozenset(methods), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json', 'Accept': 'application/json'})
+
+    # auth, set once for every later call
+
+    def use_token(self, key):
+        # DRF TokenAuthentication
+        self.session.auth = None
+        self.session.headers['Authorization'] = 'Token %s' % key
+
+    def use_basic(self, username, password):
+        self.session.headers.pop('Authorization', None)
+        self.session.auth = (username, password)
+
+    def use_jwt(self, access, refresh=None, refresh_url=None):
+        # simplejwt; with a refresh token the access token is renewed once
+        # when a call comes back 401
+        self.session.auth = None
+        self.session.headers['Authorization'] = 'Bearer %s' % access
+        self.refresh_token = refresh
+        self.refresh_url = refresh_url
+
+    def post_without_credentials(self, url, data):
+        # auth=None would let requests fall back to session.auth; a callable
+        # that leaves the request alone doesn't, and a None header value
+        # drops the session's Authorization header
+        return self.session.post(url, data=json.dumps(data), timeout=self.timeout,
+                                 auth=lambda r: r, headers={'Authorization': None})
+
+    def obtain_jwt(self, token_url, username, password, refresh_url=None):
+        # e.g. Authentication_projects/JWTAuth: gettoken/ and refreshtoken/
+        response = self.post_without_credentials(token_url, {'username': username, 'password': password})
+        data = decode(response)
+        if response.status_code != 200:
+            raise StudentAPIError(response.status_code, data, 'POST', token_url)
+        self.use_jwt(data['access'], data.get('refresh'), refresh_url)
+        return data
+
+    def refresh_jwt(self):
+        response = self.post_without_credentials(self.refresh_url, {'refresh': self.refresh_token})
+        data = decode(response)
+        if response.status_code != 200:
+            return False
+        self.session.headers['Authorization'] = 'Bearer %s' % data['access']
+        if data.get('refresh'):  # ROTATE_REFRESH_TOKENS
+            self.refresh_token = data['refresh']
+        return True
+
+    # plumbing
+
+    def url(self, id=None):
+        if id is None or self.id_style == 'body':
+            return self.base_url
+        return '%s%s%s' % (self.base_url, id, '/' if self.trailing_slash else '')
+
+    def request(self, method, id=None, data=None):
+        url = self.url(id)
+        if self.id_style == 'body' and id is not None:
+            data = dict(data or {}, id=id)
+        body = json.dumps(data) if data is not None else None
+
+        key = entry = None
+        headers = {}
+        if self.cache is not None and method == 'GET':
+            key = url if body is None else '%s %s' % (url, body)
+            entry = self.cache.get(key)
+            if entry is not None:
+                headers = entry.validators()
+
+        response = self.session.request(method, url, data=body, headers=headers, timeout=self.timeout)
+        if response.status_code == 401 and self.refresh_token and self.refresh_url and self.refresh_jwt():
+            response = self.session.request(method, url, data=body, headers=headers, timeout=self.timeout)
+
+        if self.cache is not None:
+            if entry is not None and response.status_code == 304:
+                self.cache.stats['hits'] += 1
+                return decode_body(entry.body)
+            if key is not None:
+                self.cache.stats['misses'] += 1
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+                if response.status_code == 200 and (etag or last_modified):
+                    self.cache.set(key, Entry(response.content, etag, last_modified,
+                                              response.headers.get('Content-Type')))
+            elif response.status_code < 400:
+                self.invalidate(url)
+
+        result = decode(response)
+        if response.status_code >= 400:
+            raise StudentAPIError(response.status_code, result, method, url, retry_after(response.headers))
+        return result
+
+    def invalidate(self, url):
+        # after a write: the item and the list are stale now. In the body
+        # style every key shares the base url, so all of them go.
+        if self.id_style == 'body':
+            self.cache.delete_prefix(self.base_url)
+        else:
+            self.cache.delete(url)
+            self.cache.delete(self.base_url)
+
+    # CRUD
+
+    def list(self):
+        # the body style needs an (empty) json body even for the list
+        return self.request('GET', data={} if self.id_style == 'body' else None)
+
+    def get(self, id):
+        return self.request('GET', id)
+
+    def create(self, data):
+        return self.request('POST', data=data)
+
+    def update(self, id, data, partial=True):
+        return self.request('PATCH' if partial else 'PUT', id, data)
+
+    def delete(self, id):
+        return self.request('DELETE', id)
+
+    # batches: one after another on the pooled connection. With
+    # return_exceptions=True a failed item gives its StudentAPIError /
+    # requests exception in its place instead of stopping the batch.
+
+    def batch(self, calls, return_exceptions=False):
+        results = []
+        for func, args in calls:
+            try:
+                results.append(func(*args))
+            except (StudentAPIError, requests.RequestException) as exc:
+                if not return_exceptions:
+                    raise
+                results.append(exc)
+        return results
+
+    def get_many(self, ids, return_exceptions=False):
+        return self.batch([(self.get, (id,)) for id in ids], return_exceptions)
+
+    def create_many(self, rows, return_exceptions=False):
+        return self.batch([(self.create, (row,)) for row in rows], return_exceptions)
+
+    def update_many(self, changes, partial=True, return_exceptions=False):
+        # changes: iterable of (id, data)
+        return self.batch([(self.update, (id, data, partial)) for id, data in changes], return_exceptions)
+
+    def delete_many(self, ids, return_exceptions=False):
+        return self.batch([(self.delete, (id,)) for id in ids], return_exceptions)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,62 @@
+# Django's runserver, minus the 40 ms keep-alive stall
+#
+# runserver writes the response headers and the body with two send() calls.
+# On a kept-alive connection Nagle's algorithm holds the body back until the
+# client ACKs the headers, and the client delays that ACK (~40 ms on Linux).
+# So with a pooled client (StudentClient, the async client, the load
+# harness) every request against runserver takes 40+ ms, while one
+# connection per request happens to be fast because the close flushes.
+#
+# This runs the same WSGI app with Django's own dev server classes and only
+# turns on TCP_NODELAY for each connection:
+#
+#   python -m student_client.devserver day2N/generic_api_view_mixins
+#   python -m student_client.devserver day2N/model_view_set --port 8001
+import argparse
+import os
+import socket
+import socketserver
+import sys
+
+from django.core.servers.basehttp import WSGIRequestHandler, WSGIServer
+
+
+class NoDelayWSGIRequestHandler(WSGIRequestHandler):
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class ThreadedWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m student_client.devserver')
+    parser.add_argument('project', help='directory with manage.py')
+    parser.add_argument('--settings', help='default: <project dir name>.settings')
+    parser.add_argument('--addr', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    project = os.path.abspath(args.project)
+    sys.path.insert(0, project)
+    os.chdir(project)
+    if args.settings:
+        os.environ['DJANGO_SETTINGS_MODULE'] = args.settings
+    else:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', '%s.settings' % os.path.basename(project))
+
+    from django.core.wsgi import get_wsgi_application
+    app = get_wsgi_application()
+    httpd = ThreadedWSGIServer((args.addr, args.port), NoDelayWSGIRequestHandler)
+    httpd.set_app(app)
+    print('Serving %s on http://%s:%d/ (TCP_NODELAY)' % (os.environ['DJANGO_SETTINGS_MODULE'], args.addr, args.port))
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,383 @@
+# Load generator: replay recorded requests or a synthetic read/write mix
+# against any of the Student APIs, at a fixed arrival rate
+#
+#   # 200 req/s for 30 s, 90% reads / 10% writes
+#   python -m student_client.load --url http://127.0.0.1:8001 --rate 200 --duration 30 \
+#       --mix get=80,list=10,create=5,update=3,delete=2 --report run1.json
+#
+#   # replay a log, e.g. model_view_set's SERVER_TIMING LOG lines
+#   python -m student_client.load --url http://127.0.0.1:8001 --replay requests.log --rate 100
+#
+#   # compare with an earlier run
+#   python -m student_client.load ... --report run2.json --compare run1.json
+#
+# Replay files are JSON lines with "method" and "path", and optionally "body"
+# (json), "headers" and "at" (seconds from the start of the recording). Text
+# before the first "{" on a line (log prefixes) is ignored, so are lines that
+# don't parse. With "at" in the records and no --rate, the recording's own
+# timing is replayed (--speed 2 = twice as fast).
+#
+# Open loop: requests are sent when the schedule says, whether or not the
+# earlier ones have come back. Latency is measured from the scheduled time,
+# not from when the request actually went out, so a slow server can't hide
+# its queueing by slowing the load down (coordinated omission). The time
+# from send to response is reported separately as "service".
+#
+# The synthetic mix only writes to students it created itself. update and
+# delete fall back to create until there are some, and whatever is left is
+# deleted at the end (unless --keep).
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urljoin
+
+from .aio import AiohttpTransport, StdlibTransport, aiohttp
+
+OPS = ('list', 'get', 'create', 'update', 'delete')
+
+
+class Histogram:
+    # 3 significant digits of microseconds per bucket, so percentiles are
+    # within 1% and the json stays small however many requests were made
+    def __init__(self, counts=None):
+        self.counts = counts or {}
+        self.count = sum(self.counts.values())
+        self.total = 0.0
+        self.max = 0
+
+    def record(self, seconds):
+        us = max(int(seconds * 1000000), 1)
+        scale = 10 ** max(len(str(us)) - 3, 0)
+        bucket = -(-us // scale) * scale
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, us)
+
+    def percentile(self, p):
+        if not self.count:
+            return 0
+        wanted = self.count * p / 100
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= wanted:
+                return min(bucket, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0,
+            'p50_ms': self.percentile(50) / 1000,
+            'p90_ms': self.percentile(90) / 1000,
+            'p99_ms': self.percentile(99) / 1000,
+            'p999_ms': self.percentile(99.9) / 1000,
+            'max_ms': self.max / 1000,
+            'buckets_us': {str(k): v for k, v in sorted(self.counts.items())},
+        }
+
+
+class OpStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.service = Histogram()
+        self.statuses = {}
+        self.errors = 0
+
+    def report(self):
+        return {'latency': self.latency.summary(), 'service': self.service.summary(),
+                'statuses': self.statuses, 'errors': self.errors}
+
+
+# where requests come from: (offset seconds, callable building the request
+# when it is due -> (op name, method, path, body, headers))
+
+def read_replay(path):
+    records = []
+    with open(path) as f:
+        for line in f:
+            start = line.find('{')
+            if start < 0:
+                continue
+            try:
+                record = json.loads(line[start:])
+            except ValueError:
+                continue
+            if isinstance(record, dict) and 'method' in record and 'path' in record:
+                records.append(record)
+    if not records:
+        raise SystemExit('%s: no records with "method" and "path"' % path)
+    return records
+
+
+def replay_schedule(records, rate, speed, count, duration):
+    timed = rate is None and all('at' in r for r in records)
+    if rate is None and not timed:
+        raise SystemExit('--rate is needed unless every record has "at"')
+    i = 0
+    offset = 0.0
+    while True:
+        record = records[i % len(records)]
+        if timed:
+            lap = (i // len(records)) * (records[-1]['at'] - records[0]['at'] + 1)
+            offset = (record['at'] - records[0]['at'] + lap) / speed
+        if (count and i >= count) or (duration and offset >= duration) or (not count and not duration and i >= len(records)):
+            return
+        body = record.get('body')
+        yield offset, lambda r=record, body=body: (
+            '%s %s' % (r['method'].upper(), r['path']), r['method'].upper(), r['path'], body, r.get('headers'))
+        i += 1
+        if not timed:
+            offset += 1 / rate
+
+
+class Mix:
+    def __init__(self, args, rng):
+        self.args = args
+        self.rng = rng
+        self.known = []      # ids already in the table, for reads
+        self.created = []    # ids this run created, for writes
+        self.serial = 0
+        weights = dict((k, float(v)) for k, v in (part.split('=') for part in args.mix.split(',')))
+        for op in weights:
+            if op not in OPS:
+                raise SystemExit('unknown op %r in --mix, choose from %s' % (op, ', '.join(OPS)))
+        self.ops = list(weights)
+        self.weights = [weights[op] for op in self.ops]
+
+    def path(self, id=None):
+        base = self.args.api if self.args.api.endswith('/') else self.args.api + '/'
+        if id is None or self.args.id_style == 'body':
+            return base
+        return '%s%s%s' % (base, id, '/' if self.args.trailing_slash else '')
+
+    def body(self, id, data):
+        if self.args.id_style == 'body' and id is not None:
+            return dict(data or {}, id=id)
+        return data
+
+    def new_row(self):
+        self.serial += 1
+        return {'name': 'load %d' % self.serial, 'roll': 800000 + self.serial, 'city': self.rng.choice(['karachi', 'lahore'])}
+
+    def build(self, op):
+        if op in ('update', 'delete') and not self.created:
+            op = 'create'
+        if op == 'get' and not (self.known or self.created):
+            op = 'list'
+        if op == 'list':
+            return op, 'GET', self.path(), {} if self.args.id_style == 'body' else None, None
+        if op == 'get':
+            id = self.rng.choice(self.known or self.created)
+            return op, 'GET', self.path(id), self.body(id, None), None
+        if op == 'create':
+            return op, 'POST', self.path(), self.new_row(), None
+        if op == 'update':
+            id = self.rng.choice(self.created)
+            data = dict(self.new_row(), city='quetta') if self.args.put else {'city': 'quetta'}
+            return op, 'PUT' if self.args.put else 'PATCH', self.path(id), self.body(id, data), None
+        id = self.created.pop(self.rng.randrange(len(self.created)))
+        return op, 'DELETE', self.path(id), self.body(id, None), None
+
+    def schedule(self, rate, count, duration):
+        i = 0
+        offset = 0.0
+        while not ((count and i >= count) or (duration and offset >= duration)):
+            op = self.rng.choices(self.ops, self.weights)[0]
+            yield offset, lambda op=op: self.build(op)
+            i += 1
+            offset += self.rng.expovariate(rate) if self.args.arrival == 'poisson' else 1 / rate
+
+    def seen(self, method, path, status, data):
+        if method == 'POST' and status == 201 and isinstance(data, dict) and 'id' in data:
+            self.created.append(data['id'])
+
+
+def ids_from(data):
+    if isinstance(data, dict):
+        data = data.get('results', [])
+    if isinstance(data, list):
+        return [item['id'] for item in data if isinstance(item, dict) and 'id' in item]
+    return []
+
+
+class Runner:
+    def __init__(self, args, transport, headers, mix=None):
+        self.args = args
+        self.transport = transport
+        self.headers = headers
+        self.mix = mix
+        self.stats = {}
+        self.inflight = asyncio.Semaphore(args.max_inflight)
+        self.max_lag = 0.0
+
+    async def send(self, method, path, body, headers=None):
+        data = json.dumps(body).encode() if body is not None else None
+        return await asyncio.wait_for(
+            self.transport.request(method, urljoin(self.args.url, path), dict(self.headers, **(headers or {})), data),
+            self.args.timeout)
+
+    async def fire(self, build, due):
+        async with self.inflight:
+            name, method, path, body, headers = build()
+            stats = self.stats.setdefault(name, OpStats())
+            sent = time.perf_counter()
+            try:
+                response = await self.send(method, path, body, headers)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as exc:
+                stats.errors += 1
+                key = type(exc).__name__
+                stats.statuses[key] = stats.statuses.get(key, 0) + 1
+                return
+            finally:
+                done = time.perf_counter()
+                stats.latency.record(done - due)
+                stats.service.record(done - sent)
+        status = str(response.status)
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        if response.status >= 400:
+            stats.errors += 1
+        if self.mix is not None:
+            self.mix.seen(method, path, response.status, response.data() if method == 'POST' else None)
+
+    async def run(self, schedule):
+        start = time.perf_counter() + 0.05
+        pending = set()
+        for offset, build in schedule:
+            due = start + offset
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.max_lag = max(self.max_lag, time.perf_counter() - due)
+            task = asyncio.ensure_future(self.fire(build, due))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.wait(pending)
+        return time.perf_counter() - start
+
+
+def compare(report, baseline):
+    print('\nvs %s' % baseline['_path'])
+    print('%-28s %12s %12s %12s' % ('op', 'p50 ms', 'p99 ms', 'max ms'))
+    for name, stats in sorted(report['ops'].items()) + [('total', report['total'])]:
+        old = baseline['total'] if name == 'total' else baseline['ops'].get(name)
+        if old is None:
+            continue
+        cells = []
+        for key in ('p50_ms', 'p99_ms', 'max_ms'):
+            a, b = stats['latency'][key], old['latency'][key]
+            cells.append('%+.0f%%' % ((a - b) / b * 100) if b else '-')
+        print('%-28s %12s %12s %12s' % ((name,) + tuple(cells)))
+
+
+async def main_async(args):
+    headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+    for header in args.header:
+        name, _, value = header.partition(':')
+        headers[name.strip()] = value.strip()
+    use_aiohttp = aiohttp is not None and not args.stdlib
+    transport = AiohttpTransport(args.max_inflight) if use_aiohttp else StdlibTransport(args.max_inflight)
+
+    runner = Runner(args, transport, headers)
+    try:
+        if args.replay:
+            schedule = replay_schedule(read_replay(args.replay), args.rate, args.speed, args.requests, args.duration)
+        else:
+            runner.mix = Mix(args, random.Random(args.seed))
+            response = await runner.send(*runner.mix.build('list')[1:])
+            runner.mix.known = ids_from(response.data())
+            schedule = runner.mix.schedule(args.rate, args.requests, args.duration)
+
+        elapsed = await runner.run(schedule)
+
+        if runner.mix is not None and not args.keep:
+            for id in runner.mix.created:
+                await runner.send('DELETE', runner.mix.path(id), runner.mix.body(id, None))
+    finally:
+        await transport.close()
+
+    total = OpStats()
+    for stats in runner.stats.values():
+        for a, b in ((total.latency, stats.latency), (total.service, stats.service)):
+            for bucket, n in b.counts.items():
+                a.counts[bucket] = a.counts.get(bucket, 0) + n
+            a.count += b.count
+            a.total += b.total
+            a.max = max(a.max, b.max)
+        total.errors += stats.errors
+        for status, n in stats.statuses.items():
+            total.statuses[status] = total.statuses.get(status, 0) + n
+
+    report = {
+        'config': {'url': args.url, 'replay': args.replay, 'mix': None if args.replay else args.mix,
+                   'rate': args.rate, 'arrival': args.arrival, 'duration': args.duration,
+                   'requests': args.requests, 'max_inflight': args.max_inflight, 'seed': args.seed,
+                   'http': 'aiohttp' if use_aiohttp else 'stdlib'},
+        'elapsed_s': elapsed,
+        'achieved_rps': total.latency.count / elapsed if elapsed else 0,
+        'max_schedule_lag_ms': runner.max_lag * 1000,
+        'ops': {name: stats.report() for name, stats in runner.stats.items()},
+        'total': total.report(),
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m student_client.load')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='server root, replay paths are joined to it')
+    parser.add_argument('--replay', help='JSON lines file of recorded requests')
+    parser.add_argument('--mix', default='get=80,list=10,create=5,update=3,delete=2',
+                        help='synthetic op weights: ' + ', '.join(OPS))
+    parser.add_argument('--api', default='/studentapi/', help='student api path for --mix')
+    parser.add_argument('--id-style', default='path', choices=['path', 'body'])
+    parser.add_argument('--trailing-slash', action='store_true', help='router urls (model_view_set)')
+    parser.add_argument('--put', action='store_true', help='update with PUT instead of PATCH')
+    parser.add_argument('--rate', type=float, help='requests per second (default 50 for --mix)')
+    parser.add_argument('--arrival', default='uniform', choices=['uniform', 'poisson'])
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed-up for recordings with "at"')
+    parser.add_argument('--duration', type=float, help='seconds of schedule')
+    parser.add_argument('--requests', type=int, help='number of requests')
+    parser.add_argument('--max-inflight', type=int, default=256, help='connections / requests in flight')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--header', action='append', default=[], help="e.g. 'Authorization: Token abc'")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--keep', action='store_true', help='keep the students the mix created')
+    parser.add_argument('--stdlib', action='store_true', help="don't use aiohttp even if installed")
+    parser.add_argument('--report', help='write the json report here')
+    parser.add_argument('--compare', help='earlier --report to compare latencies with')
+    args = parser.parse_args()
+    if not args.replay:
+        args.rate = args.rate or 50.0
+        if not args.duration and not args.requests:
+            args.duration = 10.0
+
+    report = asyncio.run(main_async(args))
+
+    print('%-28s %7s %6s %9s %9s %9s %9s' % ('op', 'count', 'errors', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms'))
+    for name, stats in sorted(report['ops'].items()) + [('total', report['total'])]:
+        lat = stats['latency']
+        print('%-28s %7d %6d %9.2f %9.2f %9.2f %9.2f' % (
+            name, lat['count'], stats['errors'], lat['p50_ms'], lat['p90_ms'], lat['p99_ms'], lat['max_ms']))
+    print('%.0f req/s over %.1f s' % (report['achieved_rps'], report['elapsed_s']), end='')
+    if args.rate:
+        print(' (target %.0f)' % args.rate, end='')
+    print(', max schedule lag %.1f ms' % report['max_schedule_lag_ms'])
+    if report['max_schedule_lag_ms'] > 50:
+        print('warning: the load generator itself fell behind the schedule')
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        baseline['_path'] = args.compare
+        compare(report, baseline)
+
+
+if __name__ == '__main__':
+    main()
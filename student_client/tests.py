@@ -0,0 +1,348 @@
+# Tests for the client library, against a small in-process fake of the
+# Student API (no Django needed)
+#
+#   python -m unittest student_client.tests
+import argparse
+import asyncio
+import email.utils
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from . import aio
+from .aio import AsyncStudentClient, BatchError, StdlibTransport
+from .bulk_import import Checkpoint, Importer
+from .cache import MemoryCache
+from .client import StudentAPIError, StudentClient, retry_after
+from .load import Histogram
+
+
+class FakeAPI(BaseHTTPRequestHandler):
+    # /studentapi/ and /studentapi/<id> like model_view_set's router, plus
+    # /studentapi/bulk/. server.script holds (status, headers) pairs that are
+    # answered, in order, before the real thing.
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, status, data=None, headers=None):
+        body = json.dumps(data).encode() if data is not None else b''
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_one(self, method):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        data = json.loads(self.rfile.read(length)) if length else None
+        server.requests.append((method, self.path))
+        if server.script:
+            status, headers = server.script.pop(0)
+            return self.send(status, {'detail': 'scripted'}, headers)
+
+        parts = [p for p in self.path.split('/') if p]
+        students = server.students
+        if parts == ['studentapi', 'bulk'] and method == 'POST':
+            errors = {}
+            for i, row in enumerate(data):
+                if {'name', 'roll', 'city'} <= set(row):
+                    server.add(row)
+                else:
+                    errors[i] = {'roll': ['This field is required.']}
+            return self.send(201 if len(errors) < len(data) else 400,
+                             {'created': len(data) - len(errors), 'errors': errors})
+        if parts == ['studentapi']:
+            if method == 'GET':
+                etag = '"%d"' % server.version
+                if self.headers.get('If-None-Match') == etag:
+                    return self.send(304)
+                return self.send(200, list(students.values()), {'ETag': etag})
+            if method == 'POST':
+                if not {'name', 'roll', 'city'} <= set(data):
+                    return self.send(400, {'roll': ['This field is required.']})
+                return self.send(201, server.add(data))
+        if len(parts) == 2 and parts[0] == 'studentapi' and parts[1].isdigit():
+            student = students.get(int(parts[1]))
+            if student is None:
+                return self.send(404, {'detail': 'No Student matches the given query.'})
+            if method == 'GET':
+                return self.send(200, student)
+            if method in ('PATCH', 'PUT'):
+                student.update(data)
+                server.version += 1
+                return self.send(200, student)
+            if method == 'DELETE':
+                del students[student['id']]
+                server.version += 1
+                return self.send(204)
+        self.send(405, {'detail': 'Method not allowed.'})
+
+    def do_GET(self):
+        self.handle_one('GET')
+
+    def do_POST(self):
+        self.handle_one('POST')
+
+    def do_PATCH(self):
+        self.handle_one('PATCH')
+
+    def do_PUT(self):
+        self.handle_one('PUT')
+
+    def do_DELETE(self):
+        self.handle_one('DELETE')
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeAPI)
+        self.students = {}
+        self.version = 0
+        self.script = []
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def add(self, row):
+        with self.lock:
+            student = dict(row, id=len(self.students) + 1)
+            self.students[student['id']] = student
+            self.version += 1
+            return student
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d/studentapi/' % self.server_address[1]
+
+
+class ServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeServer()
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+
+class StudentClientTests(ServerTestCase):
+    def client(self, **kwargs):
+        client = StudentClient(self.server.url, **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_crud(self):
+        client = self.client()
+        created = client.create({'name': 'amir', 'roll': 1, 'city': 'karachi'})
+        self.assertEqual(client.get(created['id'])['name'], 'amir')
+        self.assertEqual(client.update(created['id'], {'city': 'lahore'})['city'], 'lahore')
+        self.assertEqual(len(client.list()), 1)
+        client.delete(created['id'])
+        with self.assertRaises(StudentAPIError) as raised:
+            client.get(created['id'])
+        self.assertEqual(raised.exception.status_code, 404)
+
+    def test_batch_return_exceptions(self):
+        client = self.client()
+        results = client.create_many([{'name': 'a', 'roll': 1, 'city': 'x'}, {'name': 'b'}],
+                                     return_exceptions=True)
+        self.assertEqual(results[0]['name'], 'a')
+        self.assertEqual(results[1].status_code, 400)
+
+    def test_cache_revalidates_and_writes_invalidate(self):
+        cache = MemoryCache()
+        client = self.client(cache=cache)
+        client.create({'name': 'a', 'roll': 1, 'city': 'x'})
+        client.list()
+        self.assertEqual(len(client.list()), 1)
+        self.assertEqual(cache.stats['hits'], 1)
+        client.create({'name': 'b', 'roll': 2, 'city': 'y'})
+        self.assertEqual(len(client.list()), 2)
+        self.assertEqual(cache.stats['hits'], 1)
+
+    def test_error_carries_retry_after(self):
+        self.server.script.append((429, {'Retry-After': '7'}))
+        with self.assertRaises(StudentAPIError) as raised:
+            self.client(retries=0).create({'name': 'a', 'roll': 1, 'city': 'x'})
+        self.assertEqual(raised.exception.retry_after, 7)
+
+    def test_retry_after_as_date(self):
+        later = email.utils.formatdate(time.time() + 30, usegmt=True)
+        self.assertAlmostEqual(retry_after({'retry-after': later}), 30, delta=2)
+        self.assertIsNone(retry_after({'retry-after': 'soon'}))
+        self.assertIsNone(retry_after({}))
+
+
+class AsyncClientTests(ServerTestCase):
+    def run_client(self, func, **kwargs):
+        async def main():
+            async with AsyncStudentClient(self.server.url, use_aiohttp=False, **kwargs) as client:
+                return await func(client)
+        return asyncio.run(main())
+
+    def test_get_many_keeps_order(self):
+        for n in range(20):
+            self.server.add({'name': 's%d' % n, 'roll': n, 'city': 'x'})
+        students = self.run_client(lambda client: client.get_many(range(20, 0, -1)), concurrency=4)
+        self.assertEqual([s['id'] for s in students], list(range(20, 0, -1)))
+
+    def test_batch_error(self):
+        self.server.add({'name': 'a', 'roll': 1, 'city': 'x'})
+        with self.assertRaises(BatchError) as raised:
+            self.run_client(lambda client: client.get_many([1, 99]))
+        self.assertEqual([index for index, _ in raised.exception.errors], [1])
+        self.assertEqual(raised.exception.results[0]['name'], 'a')
+
+    def test_throttled_get_waits_retry_after(self):
+        self.server.add({'name': 'a', 'roll': 1, 'city': 'x'})
+        self.server.script.append((429, {'Retry-After': '3'}))
+        sleeps = []
+
+        async def sleep(seconds):
+            sleeps.append(seconds)
+        with mock.patch.object(aio.asyncio, 'sleep', sleep):
+            student = self.run_client(lambda client: client.get(1), backoff=0.01)
+        self.assertEqual(student['name'], 'a')
+        self.assertEqual(sleeps, [3])
+
+    def test_post_is_not_retried(self):
+        self.server.script.append((503, {}))
+        with self.assertRaises(StudentAPIError):
+            self.run_client(lambda client: client.create({'name': 'a', 'roll': 1, 'city': 'x'}))
+        self.assertEqual(len(self.server.requests), 1)
+
+    @unittest.skipIf(aio.aiohttp is None, 'aiohttp is not installed')
+    def test_aiohttp_client_made_outside_the_loop(self):
+        self.server.add({'name': 'a', 'roll': 1, 'city': 'x'})
+        client = AsyncStudentClient(self.server.url, use_aiohttp=True)
+
+        async def main():
+            try:
+                return await client.get(1)
+            finally:
+                await client.close()
+        self.assertEqual(asyncio.run(main())['name'], 'a')
+
+
+class StaleConnectionTests(unittest.TestCase):
+    # a server that answers with keep-alive and then closes the connection
+    def exchange(self, methods, pause):
+        async def handle(reader, writer):
+            await reader.readuntil(b'\r\n\r\n')
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok')
+            await writer.drain()
+            writer.close()
+
+        async def main():
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            url = 'http://127.0.0.1:%d/' % server.sockets[0].getsockname()[1]
+            transport = StdlibTransport(1)
+            try:
+                results = []
+                for method in methods:
+                    try:
+                        results.append((await transport.request(method, url, {}, b'{}')).status)
+                    except (ConnectionError, asyncio.IncompleteReadError):
+                        results.append('error')
+                    if pause:
+                        await asyncio.sleep(0.05)
+                return results
+            finally:
+                await transport.close()
+                server.close()
+        return asyncio.run(main())
+
+    def test_closed_idle_connection_is_skipped(self):
+        self.assertEqual(self.exchange(['GET', 'POST', 'POST'], pause=True), [200, 200, 200])
+
+    def test_get_replayed_post_not(self):
+        # no pause: the close isn't noticed before the connection is reused
+        self.assertEqual(self.exchange(['GET', 'GET', 'POST'], pause=False), [200, 200, 'error'])
+
+
+class BulkImportTests(ServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, True)
+
+    def args(self, **kwargs):
+        defaults = dict(url=self.server.url, bulk=None, token=None, concurrency=4, timeout=10, retries=2,
+                        backoff=0.01, rejects=None, window=2, progress=60, format='ndjson', batch_size=2)
+        defaults.update(kwargs)
+        return argparse.Namespace(**defaults)
+
+    def run_import(self, rows, **kwargs):
+        path = os.path.join(self.dir, 'rows.ndjson')
+        with open(path, 'w') as f:
+            for row in rows:
+                f.write(json.dumps(row) + '\n')
+        importer = Importer(self.args(file=path, **kwargs))
+        checkpoint = Checkpoint(os.path.join(self.dir, 'checkpoint'), path, 2)
+        asyncio.run(importer.run(checkpoint))
+        return importer, checkpoint
+
+    def rows(self, count):
+        return [{'name': 's%d' % n, 'roll': n, 'city': 'x'} for n in range(count)]
+
+    def test_bulk_mode_rejects_bad_rows(self):
+        rows = self.rows(3) + [{'name': 'bad'}]
+        importer, checkpoint = self.run_import(rows, bulk='bulk/', rejects=os.path.join(self.dir, 'rejects'))
+        self.assertEqual((importer.created, importer.rejected, importer.failed), (3, 1, None))
+        self.assertEqual(checkpoint.done_below, 2)
+
+    def test_throttled_batch_is_retried(self):
+        self.server.script.append((429, {'Retry-After': '0'}))
+        importer, _ = self.run_import(self.rows(2), bulk='bulk/')
+        self.assertIsNone(importer.failed)
+        self.assertEqual(importer.created, 2)
+
+    def test_auth_error_stops_the_import(self):
+        self.server.script.append((401, {}))
+        importer, checkpoint = self.run_import(self.rows(2), bulk='bulk/', window=1)
+        self.assertIn('401', importer.failed)
+        self.assertEqual(checkpoint.done_below, 0)
+
+    def test_per_row_mode(self):
+        importer, _ = self.run_import(self.rows(5))
+        self.assertEqual(importer.created, 5)
+        self.assertEqual(len(self.server.students), 5)
+
+    def test_checkpoint_resumes(self):
+        path = os.path.join(self.dir, 'checkpoint')
+        checkpoint = Checkpoint(path, '/data/rows.csv', 100)
+        checkpoint.finish(1, 100)
+        checkpoint.progress(0, [0, 1, 2])
+        resumed = Checkpoint(path, '/data/rows.csv', 100)
+        self.assertFalse(resumed.is_done(0))
+        self.assertTrue(resumed.is_done(1))
+        self.assertEqual(resumed.rows_done(0), {0, 1, 2})
+        resumed.finish(0, 97)
+        self.assertEqual(Checkpoint(path, '/data/rows.csv', 100).done_below, 2)
+        with self.assertRaises(SystemExit):
+            Checkpoint(path, '/data/other.csv', 100)
+
+
+class HistogramTests(unittest.TestCase):
+    def test_percentiles_within_one_percent(self):
+        histogram = Histogram()
+        for us in range(1, 10001):
+            histogram.record(us / 1000000)
+        for p in (50, 90, 99):
+            self.assertAlmostEqual(histogram.percentile(p), 100 * p, delta=100 * p / 100)
+        self.assertEqual(histogram.count, 10000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -81,6 +82,10 @@ WSGI_APPLICATION = 'token1.wsgi.application'
 #         'NAME': BASE_DIR / 'db.sqlite3',
 #     }
 # }
+# Connection reuse (DB_CONN_MAX_AGE, DB_POOL, DB_POOL_SIZE), see drf_perf/db_instrumentation.py
+DB_POOL = os.environ.get('DB_POOL') == '1'
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 4))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -88,7 +93,12 @@ DATABASES = {
         'USER': 'postgres',
         'PASSWORD': '123',
         'HOST': 'localhost',
-        'PORT': '5432'
+        'PORT': '5432',
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': not DB_POOL,
+        'OPTIONS': {
+            'pool': {'min_size': 1, 'max_size': DB_POOL_SIZE, 'timeout': 10},
+        } if DB_POOL else {},
     }
 }
 
@@ -0,0 +1,217 @@
+# Cross-process throttle storage
+#
+# With LocMemCache every worker process has its own throttle counters, so 8
+# workers let a client through 8x the configured rate. This cache backend keeps
+# the counters in an mmap'd file (put it on /dev/shm) that all workers on the
+# host map into memory, so no Redis / memcached server is needed.
+#
+# It only stores what api/throttling.py needs: integers (sliding window
+# counters, locks) and (float, float) pairs (token bucket state).
+#
+# Layout: a fixed array of 48-byte slots, split into groups of GROUP_SIZE.
+# A key hashes to one group and lives in any slot of it. Each group is guarded
+# by an fcntl byte-range lock on its region of the file (between processes)
+# plus a striped threading.Lock (between threads of one process, which fcntl
+# locks don't separate). When a group is full the entry closest to expiry is
+# evicted, as with any cache.
+#
+#   CACHES = {
+#       'throttle': {
+#           'BACKEND': 'api.shared_cache.SharedMemoryCache',
+#           'LOCATION': '/dev/shm/token2_throttle',
+#           'OPTIONS': {'SLOTS': 65536},
+#       }
+#   }
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+# key hash, expiry, kind, int value, float pair
+SLOT = struct.Struct('<QdB7xqdd')
+HEADER = struct.Struct('<8sQQ')
+HEADER_SIZE = 64
+MAGIC = b'THRTL001'
+
+EMPTY, INT, PAIR = 0, 1, 2
+GROUP_SIZE = 8
+THREAD_LOCK_STRIPES = 256
+
+# one mapping per file per process, shared by the per-thread cache instances
+_maps = {}
+_maps_lock = threading.Lock()
+
+
+class SharedMemoryMap:
+    def __init__(self, path, slots):
+        if slots % GROUP_SIZE:
+            raise ImproperlyConfigured('SLOTS must be a multiple of %d' % GROUP_SIZE)
+        size = HEADER_SIZE + slots * SLOT.size
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(self.fd, fcntl.LOCK_EX, HEADER_SIZE, 0)
+        try:
+            if os.fstat(self.fd).st_size == 0:
+                os.ftruncate(self.fd, size)
+                os.pwrite(self.fd, HEADER.pack(MAGIC, slots, GROUP_SIZE), 0)
+            magic, file_slots, group_size = HEADER.unpack(os.pread(self.fd, HEADER.size, 0))
+            if magic != MAGIC or file_slots != slots or group_size != GROUP_SIZE:
+                raise ImproperlyConfigured(
+                    '%s was created with a different layout, delete it or change LOCATION' % path
+                )
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, HEADER_SIZE, 0)
+        self.buf = mmap.mmap(self.fd, size)
+        self.groups = slots // GROUP_SIZE
+        self.thread_locks = [threading.Lock() for _ in range(THREAD_LOCK_STRIPES)]
+
+
+class GroupLock:
+    def __init__(self, shm, group):
+        self.shm = shm
+        self.thread_lock = shm.thread_locks[group % THREAD_LOCK_STRIPES]
+        self.start = HEADER_SIZE + group * GROUP_SIZE * SLOT.size
+        self.length = GROUP_SIZE * SLOT.size
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        fcntl.lockf(self.shm.fd, fcntl.LOCK_EX, self.length, self.start)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.lockf(self.shm.fd, fcntl.LOCK_UN, self.length, self.start)
+        self.thread_lock.release()
+
+
+class SharedMemoryCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        slots = options.get('SLOTS', 65536)
+        with _maps_lock:
+            if location not in _maps:
+                _maps[location] = SharedMemoryMap(location, slots)
+            self._shm = _maps[location]
+
+    # slots
+
+    def _locate(self, key, version):
+        key = self.make_and_validate_key(key, version=version)
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        key_hash = int.from_bytes(digest, 'little') or 1  # 0 marks an empty slot
+        group = key_hash % self._shm.groups
+        return key_hash, group
+
+    def _slots(self, group):
+        start = HEADER_SIZE + group * GROUP_SIZE * SLOT.size
+        return range(start, start + GROUP_SIZE * SLOT.size, SLOT.size)
+
+    def _find(self, key_hash, group, now):
+        # offset of the live slot holding key_hash, or None
+        for offset in self._slots(group):
+            slot_hash, expiry, kind, _, _, _ = SLOT.unpack_from(self._shm.buf, offset)
+            if slot_hash == key_hash and kind != EMPTY and expiry > now:
+                return offset
+        return None
+
+    def _free(self, key_hash, group, now):
+        # slot to write key_hash into: its own, an empty/expired one, or the
+        # one that expires first
+        victim, victim_expiry = None, math.inf
+        for offset in self._slots(group):
+            slot_hash, expiry, kind, _, _, _ = SLOT.unpack_from(self._shm.buf, offset)
+            if slot_hash == key_hash or kind == EMPTY or expiry <= now:
+                return offset
+            if victim is None or expiry < victim_expiry:
+                victim, victim_expiry = offset, expiry
+        return victim
+
+    def _write(self, offset, key_hash, value, timeout):
+        expiry = self.get_backend_timeout(timeout)
+        if expiry is None:
+            expiry = math.inf
+        if isinstance(value, bool) or not isinstance(value, (int, tuple)):
+            raise TypeError('SharedMemoryCache only stores ints and (float, float) pairs')
+        if isinstance(value, int):
+            SLOT.pack_into(self._shm.buf, offset, key_hash, expiry, INT, value, 0.0, 0.0)
+        else:
+            first, second = value
+            SLOT.pack_into(self._shm.buf, offset, key_hash, expiry, PAIR, 0, first, second)
+
+    def _read(self, offset):
+        _, _, kind, number, first, second = SLOT.unpack_from(self._shm.buf, offset)
+        if kind == INT:
+            return number
+        return (first, second)
+
+    # cache API
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key_hash, group = self._locate(key, version)
+        with GroupLock(self._shm, group):
+            now = time.time()
+            if self._find(key_hash, group, now) is not None:
+                return False
+            self._write(self._free(key_hash, group, now), key_hash, value, timeout)
+            return True
+
+    def get(self, key, default=None, version=None):
+        key_hash, group = self._locate(key, version)
+        with GroupLock(self._shm, group):
+            offset = self._find(key_hash, group, time.time())
+            if offset is None:
+                return default
+            return self._read(offset)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key_hash, group = self._locate(key, version)
+        with GroupLock(self._shm, group):
+            self._write(self._free(key_hash, group, time.time()), key_hash, value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key_hash, group = self._locate(key, version)
+        with GroupLock(self._shm, group):
+            offset = self._find(key_hash, group, time.time())
+            if offset is None:
+                return False
+            self._write(offset, key_hash, self._read(offset), timeout)
+            return True
+
+    def incr(self, key, delta=1, version=None):
+        key_hash, group = self._locate(key, version)
+        with GroupLock(self._shm, group):
+            offset = self._find(key_hash, group, time.time())
+            if offset is None:
+                raise ValueError("Key '%s' not found" % key)
+            slot_hash, expiry, kind, number, _, _ = SLOT.unpack_from(self._shm.buf, offset)
+            if kind != INT:
+                raise TypeError("Key '%s' does not hold an integer" % key)
+            number += delta
+            SLOT.pack_into(self._shm.buf, offset, slot_hash, expiry, INT, number, 0.0, 0.0)
+            return number
+
+    def delete(self, key, version=None):
+        key_hash, group = self._locate(key, version)
+        with GroupLock(self._shm, group):
+            offset = self._find(key_hash, group, time.time())
+            if offset is None:
+                return False
+            SLOT.pack_into(self._shm.buf, offset, 0, 0.0, EMPTY, 0, 0.0, 0.0)
+            return True
+
+    def has_key(self, key, version=None):
+        key_hash, group = self._locate(key, version)
+        with GroupLock(self._shm, group):
+            return self._find(key_hash, group, time.time()) is not None
+
+    def clear(self):
+        for group in range(self._shm.groups):
+            with GroupLock(self._shm, group):
+                start = HEADER_SIZE + group * GROUP_SIZE * SLOT.size
+                self._shm.buf[start:start + GROUP_SIZE * SLOT.size] = bytes(GROUP_SIZE * SLOT.size)
@@ -1,3 +1,115 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import caches
 from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.throttling import UserRateThrottle
+from rest_framework.views import APIView
+from .shared_cache import SharedMemoryCache
+from .throttling import SlidingWindowUserRateThrottle, TokenBucketUserRateThrottle
 
 # Create your tests here.
+
+class View(APIView):
+    pass
+
+
+def throttle_class(base, rate='3/min'):
+    # the shared-memory cache of the settings, with its own rate
+    return type(base.__name__, (base,), {'cache': caches['throttle'], 'rate': rate})
+
+
+class ThrottleTests(TestCase):
+    def setUp(self):
+        caches['throttle'].clear()
+        self.user = User.objects.create_user('alice')
+
+    def request(self):
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, self.user)
+        # authenticates the request like a real view would
+        return View().initialize_request(request)
+
+    def allowed(self, throttle_cls, calls):
+        throttle = throttle_cls()
+        return [throttle.allow_request(self.request(), View()) for _ in range(calls)]
+
+    def test_sliding_window_limits(self):
+        self.assertEqual(self.allowed(throttle_class(SlidingWindowUserRateThrottle), 5),
+                         [True, True, True, False, False])
+
+    def test_token_bucket_limits(self):
+        throttle = throttle_class(TokenBucketUserRateThrottle)()
+        results = [throttle.allow_request(self.request(), View()) for _ in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+        # one token back every 20 seconds
+        self.assertAlmostEqual(throttle.wait(), 20, delta=1)
+
+    def test_token_bucket_next_to_drf_throttle(self):
+        # same scope and cache: DRF's history list and the bucket must not
+        # overwrite each other
+        drf = type('Drf', (UserRateThrottle,), {'cache': caches['default'], 'rate': '3/min'})
+        bucket = type('Bucket', (TokenBucketUserRateThrottle,), {'cache': caches['default'], 'rate': '3/min'})
+        caches['default'].clear()
+        for _ in range(2):
+            self.assertTrue(drf().allow_request(self.request(), View()))
+            self.assertTrue(bucket().allow_request(self.request(), View()))
+        self.assertTrue(drf().allow_request(self.request(), View()))
+        self.assertFalse(drf().allow_request(self.request(), View()))
+
+
+def add_many(cache, key, times):
+    for _ in range(times):
+        cache.incr(key)
+
+
+class SharedMemoryCacheTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.location = os.path.join(directory, 'throttle')
+        self.cache = SharedMemoryCache(self.location, {'OPTIONS': {'SLOTS': 1024}})
+
+    def test_ints_and_pairs(self):
+        self.cache.set('n', 5)
+        self.cache.set('bucket:x', (2.5, 1000.0))
+        self.assertEqual(self.cache.get('n'), 5)
+        self.assertEqual(self.cache.get('bucket:x'), (2.5, 1000.0))
+        self.assertIsNone(self.cache.get('missing'))
+        with self.assertRaises(TypeError):
+            self.cache.set('s', 'text')
+
+    def test_add_incr_delete(self):
+        self.assertTrue(self.cache.add('n', 0))
+        self.assertFalse(self.cache.add('n', 10))
+        self.assertEqual(self.cache.incr('n'), 1)
+        self.assertTrue(self.cache.delete('n'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('n')
+
+    def test_expiry(self):
+        self.cache.set('n', 1, 10)
+        with mock.patch('time.time', return_value=time.time() + 11):
+            self.assertIsNone(self.cache.get('n'))
+            self.assertTrue(self.cache.add('n', 2))
+
+    def test_full_group_evicts_soonest_expiry(self):
+        for n in range(2000):
+            self.cache.set('k%d' % n, n, 1000 + n)
+        # the last write always finds a slot
+        self.assertEqual(self.cache.get('k1999'), 1999)
+
+    def test_counts_across_processes(self):
+        self.cache.set('n', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=add_many, args=(self.cache, 'n', 200)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('n'), 800)
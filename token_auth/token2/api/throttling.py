@@ -0,0 +1,156 @@
+# Constant-memory throttles
+#
+# DRF's AnonRateThrottle / UserRateThrottle keep a list with one timestamp per
+# request in the cache and rewrite the whole list on every call (up to 1000
+# floats for a '1000/day' rate). The classes below read the same scope /
+# DEFAULT_THROTTLE_RATES settings, but keep a fixed-size state per key:
+#
+#   SlidingWindow*  -> two integer counters (current and previous window),
+#                      updated atomically with cache.incr
+#   TokenBucket*    -> one (tokens, timestamp) pair, updated under a short
+#                      per-key lock taken with cache.add. Stored under
+#                      'bucket:<key>', since DRF's throttles keep their
+#                      history list under the bare key and the two can
+#                      share a cache and a scope.
+#
+# The state goes to the cache named by the THROTTLE_CACHE setting ('default'
+# if unset), e.g. the cross-process SharedMemoryCache in api/shared_cache.py.
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+from rest_framework.throttling import SimpleRateThrottle, AnonRateThrottle, UserRateThrottle, ScopedRateThrottle
+
+throttle_cache = ConnectionProxy(caches, getattr(settings, 'THROTTLE_CACHE', 'default'))
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    # Counts requests in fixed windows of `duration` seconds and weights the
+    # previous window by how much of it still overlaps the sliding window.
+    cache = throttle_cache
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        self.elapsed = self.now - window * self.duration
+        current_key = '%s_%d' % (self.key, window)
+        previous_key = '%s_%d' % (self.key, window - 1)
+
+        # add() does nothing if the counter already exists. A counter is read
+        # as "previous" during the next window, so it lives for two windows.
+        self.cache.add(current_key, 0, self.duration * 2)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            # expired between add() and incr()
+            self.cache.set(current_key, 1, self.duration * 2)
+            current = 1
+        self.previous = self.cache.get(previous_key, 0)
+
+        weight = 1 - self.elapsed / self.duration
+        self.estimate = self.previous * weight + current
+        if self.estimate > self.num_requests:
+            # give the slot back, rejected requests don't count
+            self.cache.decr(current_key)
+            return self.throttle_failure()
+        return self.throttle_success()
+
+    def throttle_success(self):
+        return True
+
+    def wait(self):
+        remaining_window = self.duration - self.elapsed
+        if not self.previous:
+            return remaining_window
+        # time until enough of the previous window has slid out
+        excess = self.estimate - self.num_requests
+        return min(excess * self.duration / self.previous, remaining_window)
+
+
+class TokenBucketRateThrottle(SimpleRateThrottle):
+    # Bucket of `num_requests` tokens refilled evenly over `duration`
+    # ('100/day' -> one token every 864 seconds). Allows short bursts up to
+    # the full rate, then one request per refill interval.
+    cache = throttle_cache
+    lock_timeout = 1
+    lock_retries = 50
+    lock_sleep = 0.001
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        bucket_key = 'bucket:' + self.key
+        lock_key = bucket_key + '_lock'
+        for _ in range(self.lock_retries):
+            # add() is atomic on every cache backend, only one caller wins
+            if self.cache.add(lock_key, 1, self.lock_timeout):
+                break
+            time.sleep(self.lock_sleep)
+        else:
+            # could not get the lock: fail closed
+            self.tokens = 0
+            return self.throttle_failure()
+
+        try:
+            self.now = self.timer()
+            tokens, stamp = self.cache.get(bucket_key, (self.num_requests, self.now))
+            refill = (self.now - stamp) * self.num_requests / self.duration
+            tokens = min(self.num_requests, tokens + refill)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # an untouched bucket is full again after `duration`
+            self.cache.set(bucket_key, (tokens, self.now), self.duration)
+        finally:
+            self.cache.delete(lock_key)
+
+        self.tokens = tokens
+        if allowed:
+            return self.throttle_success()
+        return self.throttle_failure()
+
+    def throttle_success(self):
+        return True
+
+    def wait(self):
+        return (1 - self.tokens) * self.duration / self.num_requests
+
+
+# Drop-in replacements for the classes in throttling.ipynb
+
+class SlidingWindowAnonRateThrottle(SlidingWindowRateThrottle, AnonRateThrottle):
+    pass
+
+
+class SlidingWindowUserRateThrottle(SlidingWindowRateThrottle, UserRateThrottle):
+    pass
+
+
+# ScopedRateThrottle.allow_request picks the rate from the view first,
+# so it has to come before the algorithm in the MRO
+class SlidingWindowScopedRateThrottle(ScopedRateThrottle, SlidingWindowRateThrottle):
+    pass
+
+
+class TokenBucketAnonRateThrottle(TokenBucketRateThrottle, AnonRateThrottle):
+    pass
+
+
+class TokenBucketUserRateThrottle(TokenBucketRateThrottle, UserRateThrottle):
+    pass
+
+
+class TokenBucketScopedRateThrottle(ScopedRateThrottle, TokenBucketRateThrottle):
+    pass
@@ -0,0 +1,89 @@
+# Benchmark: throttle accuracy and overhead across worker processes
+#
+# Forks N processes that all hit the same client key as fast as they can and
+# counts how many requests got through. With LocMemCache each process has its
+# own counters (N x the limit gets through); with SharedMemoryCache the limit
+# holds for the whole host.
+#
+#   python bench_shared_throttle.py
+#   python bench_shared_throttle.py --processes 16 --calls 5000 --rate 1000/hour
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'token2.settings')
+import django
+django.setup()
+
+from django.core.cache.backends.locmem import LocMemCache
+from api.shared_cache import SharedMemoryCache
+from api.throttling import SlidingWindowAnonRateThrottle, TokenBucketAnonRateThrottle
+
+REQUEST = SimpleNamespace(
+    user=SimpleNamespace(is_authenticated=False),
+    META={'REMOTE_ADDR': '10.0.0.1'},
+    headers={},
+)
+
+
+def make_cache(backend, path):
+    if backend == 'locmem':
+        return LocMemCache('bench', {})
+    return SharedMemoryCache(path, {'OPTIONS': {'SLOTS': 4096}})
+
+
+def worker(backend, path, throttle_class, rate, calls, start, results):
+    throttle_class = type(throttle_class.__name__, (throttle_class,), {
+        'rate': rate,
+        'cache': make_cache(backend, path),
+    })
+    while time.time() < start:
+        pass
+    allowed = 0
+    began = time.perf_counter()
+    for _ in range(calls):
+        if throttle_class().allow_request(REQUEST, None):
+            allowed += 1
+    results.put((allowed, time.perf_counter() - began))
+
+
+def run(backend, throttle_class, rate, processes, calls):
+    path = os.path.join(tempfile.mkdtemp(), 'throttle')
+    results = multiprocessing.Queue()
+    start = time.time() + 0.5
+    workers = [
+        multiprocessing.Process(target=worker, args=(backend, path, throttle_class, rate, calls, start, results))
+        for _ in range(processes)
+    ]
+    for p in workers:
+        p.start()
+    outcome = [results.get() for _ in workers]
+    for p in workers:
+        p.join()
+    allowed = sum(a for a, _ in outcome)
+    us_per_call = sum(t for _, t in outcome) / (processes * calls) * 1e6
+    return allowed, us_per_call
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--rate', default='1000/hour')
+    args = parser.parse_args()
+
+    limit = int(args.rate.split('/')[0])
+    print('%d processes x %d calls, limit %s' % (args.processes, args.calls, args.rate))
+    print('%-32s %-8s %10s %10s %10s' % ('throttle', 'cache', 'allowed', 'x limit', 'us/call'))
+    for throttle_class in [SlidingWindowAnonRateThrottle, TokenBucketAnonRateThrottle]:
+        for backend in ['locmem', 'shared']:
+            allowed, us = run(backend, throttle_class, args.rate, args.processes, args.calls)
+            print('%-32s %-8s %10d %10.2f %10.1f' % (throttle_class.__name__, backend, allowed, allowed / limit, us))
+
+
+if __name__ == '__main__':
+    multiprocessing.set_start_method('fork')
+    main()
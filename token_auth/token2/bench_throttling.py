@@ -0,0 +1,74 @@
+# Benchmark: DRF history-list throttles vs api/throttling.py
+#
+# Runs allow_request() in-process against the configured cache (LocMem by
+# default) at a few high rates and prints time per call and the size of the
+# state kept per client.
+#
+#   python bench_throttling.py
+#   python bench_throttling.py --calls 20000 --clients 50
+import argparse
+import os
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'token2.settings')
+import django
+django.setup()
+
+from django.core.cache import cache
+from rest_framework.throttling import AnonRateThrottle
+from api.throttling import SlidingWindowAnonRateThrottle, TokenBucketAnonRateThrottle
+
+RATES = ['1000/day', '10000/hour', '100000/day']
+CLASSES = [AnonRateThrottle, SlidingWindowAnonRateThrottle, TokenBucketAnonRateThrottle]
+
+
+def make_request(client):
+    return SimpleNamespace(
+        user=SimpleNamespace(is_authenticated=False),
+        META={'REMOTE_ADDR': '10.0.%d.%d' % (client // 256, client % 256)},
+        headers={},
+    )
+
+
+def state_size(throttle_class, rate, request):
+    # bytes the cache holds for one client after the run (LocMem only)
+    if not hasattr(cache, '_cache'):
+        return -1
+    throttle = type('T', (throttle_class,), {'rate': rate})()
+    key = throttle.get_cache_key(request, None)
+    keys = [k for k in cache._cache if key in k and not k.endswith('_lock')]
+    return sum(len(cache._cache[k]) for k in keys)
+
+
+def run(throttle_class, rate, calls, clients):
+    cache.clear()
+    # all classes on the same LocMem cache, whatever THROTTLE_CACHE says
+    throttle_class = type(throttle_class.__name__, (throttle_class,), {'rate': rate, 'cache': cache})
+    requests = [make_request(c) for c in range(clients)]
+    allowed = 0
+    start = time.perf_counter()
+    for i in range(calls):
+        # a new throttle instance per request, like DRF's APIView.get_throttles()
+        if throttle_class().allow_request(requests[i % clients], None):
+            allowed += 1
+    elapsed = time.perf_counter() - start
+    return elapsed / calls * 1e6, allowed, state_size(throttle_class, rate, requests[0])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=50000)
+    parser.add_argument('--clients', type=int, default=10)
+    args = parser.parse_args()
+
+    print('%-32s %-12s %10s %10s %12s' % ('throttle', 'rate', 'us/call', 'allowed', 'state bytes'))
+    for rate in RATES:
+        for throttle_class in CLASSES:
+            us, allowed, size = run(throttle_class, rate, args.calls, args.clients)
+            print('%-32s %-12s %10.1f %10d %12d' % (throttle_class.__name__, rate, us, allowed, size))
+        print()
+
+
+if __name__ == '__main__':
+    main()
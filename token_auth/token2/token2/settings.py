@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -82,6 +83,10 @@ WSGI_APPLICATION = 'token2.wsgi.application'
 #         'NAME': BASE_DIR / 'db.sqlite3',
 #     }
 # }
+# Connection reuse (DB_CONN_MAX_AGE, DB_POOL, DB_POOL_SIZE), see drf_perf/db_instrumentation.py
+DB_POOL = os.environ.get('DB_POOL') == '1'
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 4))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -89,7 +94,12 @@ DATABASES = {
         'USER': 'postgres',
         'PASSWORD': '123',
         'HOST': 'localhost',
-        'PORT': '5432'
+        'PORT': '5432',
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': not DB_POOL,
+        'OPTIONS': {
+            'pool': {'min_size': 1, 'max_size': DB_POOL_SIZE, 'timeout': 10},
+        } if DB_POOL else {},
     }
 }
 
@@ -135,3 +145,29 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # throttle counters shared by all worker processes on this host (api/shared_cache.py)
+    'throttle': {
+        'BACKEND': 'api.shared_cache.SharedMemoryCache',
+        'LOCATION': '/dev/shm/token2_throttle',
+        'OPTIONS': {'SLOTS': 65536},
+    },
+}
+
+THROTTLE_CACHE = 'throttle'
+
+REST_FRAMEWORK = {
+    # constant-memory versions of AnonRateThrottle / UserRateThrottle (api/throttling.py)
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.SlidingWindowAnonRateThrottle',
+        'api.throttling.SlidingWindowUserRateThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': '100/day',
+        'user': '1000/day'
+    }
+}